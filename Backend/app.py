@@ -1,12 +1,14 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 import os
 import uuid
 import json
+import hashlib
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import traceback
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,8 +18,15 @@ load_dotenv()
 from database import (
     db, init_database, Upload, AnalysisResult, ArchivedFile,
     get_upload_by_id, get_results_by_upload_id, get_all_uploads,
-    get_archived_files, archive_upload, restore_upload, update_archive_access
+    get_archived_files, archive_upload, restore_upload, update_archive_access,
+    get_analysis_result_by_id, find_reusable_result,
+    get_cached_analysis, store_cached_analysis, get_degraded_results,
+    get_unfinished_results, claim_unfinished_result
 )
+from job_queue import AnalysisJobQueue
+from load_policy import IdleRunner
+from pdf_document import extract_document, extraction_workers, page_store, start_extraction_pool
+from progress_events import ProgressBroker, format_sse
 
 # Import DPR analysis modules
 try:
@@ -53,6 +62,10 @@ UPLOAD_FOLDER = 'Uploads'
 RESULTS_FOLDER = 'Results'
 ALLOWED_EXTENSIONS = {'pdf'}
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
+ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', '2'))  # Background analysis threads
+HASH_CHUNK_SIZE = 1024 * 1024  # Read uploads in 1MB chunks while hashing
+ANALYSIS_CACHE_VERSION = 2  # Bump to invalidate all cached /api/analyze/* results
+UPGRADE_POLL_SECONDS = float(os.getenv('UPGRADE_POLL_SECONDS', '30'))  # Idle check for re-running degraded results
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
@@ -62,6 +75,25 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
+# The process that serves requests: the debug reloader's child under `python app.py`, or a
+# WSGI worker started with DPR_SERVER_PROCESS=true. Scripts that import app are not.
+SERVER_PROCESS = (os.getenv('DPR_SERVER_PROCESS', 'false').lower() == 'true'
+                  or (__name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'))
+
+# Fork the PDF extraction workers while this is still the only thread, before the job
+# queue, risk threads and models start; otherwise extraction runs serially
+if SERVER_PROCESS and start_extraction_pool():
+    print(f"Started {extraction_workers()} PDF extraction worker processes")
+
+# Background worker pool for upload analysis
+job_queue = AnalysisJobQueue(app, max_workers=ANALYSIS_WORKERS)
+
+# Per-upload stage events streamed to the Dashboard over SSE
+progress_broker = ProgressBroker()
+
+# Threads for the network-bound risk branch, overlapped with local scoring
+risk_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS + 2, thread_name_prefix='dpr-risk')
+
 # Initialize analyzers
 risk_analyzer = None
 dpr_scorer = None
@@ -102,6 +134,99 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_file_with_hash(file, file_path):
+    """Stream an uploaded file to disk and return its SHA-256 hex digest"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'wb') as out:
+        while True:
+            chunk = file.stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            out.write(chunk)
+    return sha256.hexdigest()
+
+def current_analyzer_version(tier='full'):
+    """
+    Version of the active scoring system, recorded on results for reuse checks.
+    Degraded tiers get a suffix (e.g. 'enhanced-2.0-reduced') so they are never reused as full results.
+    """
+    if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
+        version = dpr_analyzer.get_version()
+        return version if tier == 'full' else f"{version}-{tier}"
+    if dpr_scorer:
+        return 'basic'
+    return None
+
+def get_file_hash(upload):
+    """Return the upload's SHA-256, computing and saving it for older uploads"""
+    if not upload.file_hash:
+        sha256 = hashlib.sha256()
+        with open(upload.file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        upload.file_hash = sha256.hexdigest()
+        db.session.commit()
+    return upload.file_hash
+
+def score_cache_signature():
+    """Cache signature of the active scoring system"""
+    if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
+        return dpr_analyzer.get_cache_signature()
+    if dpr_scorer:
+        return {'version': 'basic', **dpr_scorer.get_cache_signature()}
+    return None
+
+def analysis_cache_key(file_hash, analysis_type):
+    """
+    Cache key for an analyze result: file content hash, analysis type, and the
+    model name, thresholds and code version of every analyzer involved.
+    """
+    signature = {
+        'fileHash': file_hash,
+        'analysisType': analysis_type,
+        'cacheVersion': ANALYSIS_CACHE_VERSION
+    }
+    if analysis_type in ('risk', 'complete'):
+        signature['risk'] = risk_analyzer.get_cache_signature() if risk_analyzer else None
+    if analysis_type in ('score', 'complete'):
+        signature['score'] = score_cache_signature()
+    encoded = json.dumps(signature, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def cache_analysis_results(file_hash, upload_id, risk_analysis=None, score_analysis=None, analysis_type=None):
+    """Cache error-free results under their risk, score and complete keys"""
+    risk_ok = bool(risk_analysis) and 'error' not in risk_analysis
+    score_ok = bool(score_analysis) and 'error' not in score_analysis
+    try:
+        if risk_ok:
+            store_cached_analysis(analysis_cache_key(file_hash, 'risk'), upload_id, 'risk',
+                                  {'riskAnalysis': risk_analysis})
+        if score_ok:
+            store_cached_analysis(analysis_cache_key(file_hash, 'score'), upload_id, 'score',
+                                  {'scoreAnalysis': score_analysis, 'analysisType': analysis_type})
+        if risk_ok and score_ok:
+            store_cached_analysis(analysis_cache_key(file_hash, 'complete'), upload_id, 'complete',
+                                  {'riskAnalysis': risk_analysis, 'scoreAnalysis': score_analysis,
+                                   'analysisType': analysis_type})
+    except Exception as e:
+        print(f"Warning: Failed to cache analysis results: {e}")
+        db.session.rollback()
+
+def cached_analysis_response(upload_id, file_hash, analysis_type):
+    """Return a JSON response for a cached result, or None on a miss or ?force=true"""
+    if request.args.get('force', 'false').lower() == 'true':
+        return None
+    entry = get_cached_analysis(analysis_cache_key(file_hash, analysis_type))
+    if not entry:
+        return None
+    return jsonify({
+        'uploadId': upload_id,
+        **entry.result,
+        'analyzedAt': entry.created_at.isoformat() if entry.created_at else None,
+        'cached': True
+    }), 200
+
 def find_uploaded_file(upload_id):
     """Find uploaded file by upload ID using database"""
     upload = get_upload_by_id(upload_id)
@@ -109,54 +234,143 @@ def find_uploaded_file(upload_id):
         return upload.file_path
     return None
 
-def process_and_store_results(upload_id, pdf_file_path, original_filename):
-    """Process PDF with both analyzers and store results in database"""
+def extract_shared_document(pdf_file_path, original_filename, progress_callback=None):
+    """
+    Extract the PDF once for the enhanced scorer, which holds every page in
+    memory, and share it with the risk branch. Returns None for the basic
+    scorer, which streams pages through iter_pages; the risk analyzer then
+    extracts only its summary pages.
+    """
+    if not (INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer and dpr_analyzer.use_enhanced):
+        return None
+    document = extract_document(pdf_file_path)
+    print(f"Extracted {document.page_count} pages from {original_filename} using {document.extractor} "
+          f"in {document.extraction_seconds:.1f}s ({document.workers} workers)")
+    if progress_callback:
+        progress_callback('extracted', {'pageCount': document.page_count, 'extractor': document.extractor})
+    return document
+
+def run_risk_branch(pdf_file_path, document, original_filename):
+    """Risk analysis branch; returns (risk_analysis, elapsed_seconds)"""
+    start_time = time.time()
+    if RISK_ANALYZER_AVAILABLE and risk_analyzer:
+        try:
+            print(f"Running risk analysis for {original_filename}...")
+            risk_analysis = risk_analyzer.analyze_dpr_pdf(pdf_file_path, document=document)
+            print("Risk analysis completed successfully")
+        except Exception as e:
+            print(f"Risk analysis failed: {e}")
+            risk_analysis = {'error': str(e)}
+    else:
+        risk_analysis = {'error': 'Risk analyzer not available'}
+    return risk_analysis, time.time() - start_time
+
+def run_score_branch(pdf_file_path, document, original_filename, progress_callback=None, upload_id=None,
+                     tier='full'):
+    """Scoring branch; returns (score_analysis, analysis_type, elapsed_seconds)"""
+    start_time = time.time()
+    if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
+        analysis_type = 'enhanced'
+        try:
+            print(f"Running enhanced DPR analysis ({tier} tier) for {original_filename}...")
+            score_analysis = dpr_analyzer.analyze_dpr(pdf_file_path, document=document,
+                                                      progress_callback=progress_callback,
+                                                      upload_id=upload_id, tier=tier)
+            analysis_type = score_analysis.get('analysis_type', analysis_type)
+            print(f"Enhanced DPR analysis completed successfully - Score: {score_analysis.get('percentage', 0):.1f}%")
+        except Exception as e:
+            print(f"Enhanced DPR analysis failed: {e}")
+            score_analysis = {'error': str(e)}
+    elif dpr_scorer:
+        analysis_type = 'basic'
+        try:
+            print(f"Running basic DPR scoring for {original_filename}...")
+            score_analysis = dpr_scorer.calculate_total_score(pdf_file_path, document=document)
+            print("Basic DPR scoring completed successfully")
+        except Exception as e:
+            print(f"Basic DPR scoring failed: {e}")
+            score_analysis = {'error': str(e)}
+    else:
+        analysis_type = 'none'
+        score_analysis = {'error': 'No DPR analysis system available'}
+    return score_analysis, analysis_type, time.time() - start_time
+
+def run_analysis_branches(pdf_file_path, document, original_filename, progress_callback=None, upload_id=None,
+                          tier='full'):
+    """
+    Run risk analysis and scoring concurrently.
+    
+    The Gemini-bound risk branch runs on risk_executor while scoring runs on the
+    calling thread, so latency is roughly the slower of the two. Each branch
+    catches its own errors. Returns (risk_analysis, score_analysis, analysis_type, timings).
+    
+    Degraded tiers skip the risk branch: the full re-analysis that replaces
+    their result runs it, so Gemini is called once per upload.
+    """
+    def risk_branch():
+        risk_analysis, risk_time = run_risk_branch(pdf_file_path, document, original_filename)
+        if progress_callback:
+            progress_callback('risk', {
+                'overallRiskScore': risk_analysis.get('overallRiskScore'),
+                'error': risk_analysis.get('error')
+            })
+        return risk_analysis, risk_time
+    
+    risk_future = risk_executor.submit(risk_branch) if tier == 'full' else None
+    score_analysis, analysis_type, score_time = run_score_branch(
+        pdf_file_path, document, original_filename, progress_callback, upload_id, tier
+    )
+    
+    if risk_future is None:
+        risk_analysis, risk_time = {'error': 'Risk analysis deferred under load', 'deferred': True}, None
+    else:
+        try:
+            risk_analysis, risk_time = risk_future.result()
+        except Exception as e:
+            print(f"Risk analysis branch failed: {e}")
+            risk_analysis, risk_time = {'error': str(e)}, None
+    
+    timings = {'risk': risk_time, 'score': score_time}
+    print(f"Analysis branch timings for {original_filename}: {timings}")
+    return risk_analysis, score_analysis, analysis_type, timings
+
+def process_and_store_results(upload_id, pdf_file_path, original_filename, job_id=None, tier=None):
+    """Process PDF with both analyzers and store results in database
+    
+    When job_id is given, the existing pending AnalysisResult row is used as the
+    job record; otherwise a new row is created. Without a tier, the load policy
+    picks one from the current queue depth and scoring latency.
+    """
     start_time = time.time()
+    analysis_result = None
     
     try:
-        # Create analysis result record
-        analysis_result = AnalysisResult(
-            upload_id=upload_id,
-            analysis_type='complete',
-            status='pending'
-        )
-        db.session.add(analysis_result)
+        if job_id is not None:
+            analysis_result = get_analysis_result_by_id(job_id)
+        
+        if analysis_result is None:
+            # Create analysis result record
+            analysis_result = AnalysisResult(
+                upload_id=upload_id,
+                analysis_type='complete',
+                status='pending',
+                analyzer_version=current_analyzer_version()
+            )
+            db.session.add(analysis_result)
+        
+        analysis_result.status = 'processing'
         db.session.commit()
         
-        risk_analysis = None
-        score_analysis = None
+        progress_callback = progress_broker.callback_for(upload_id)
+        if tier is None:
+            tier = dpr_analyzer.choose_tier(job_queue.backlog) if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer else 'full'
         
-        # Risk analysis
-        if RISK_ANALYZER_AVAILABLE and risk_analyzer:
-            try:
-                print(f"Running risk analysis for {original_filename}...")
-                risk_analysis = risk_analyzer.analyze_dpr_pdf(pdf_file_path)
-                print("Risk analysis completed successfully")
-            except Exception as e:
-                print(f"Risk analysis failed: {e}")
-                risk_analysis = {'error': str(e)}
-        else:
-            risk_analysis = {'error': 'Risk analyzer not available'}
+        document = extract_shared_document(pdf_file_path, original_filename, progress_callback)
         
-        # Score analysis using enhanced system
-        if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
-            try:
-                print(f"Running enhanced DPR analysis for {original_filename}...")
-                score_analysis = dpr_analyzer.analyze_dpr(pdf_file_path)
-                print(f"Enhanced DPR analysis completed successfully - Score: {score_analysis.get('percentage', 0):.1f}%")
-            except Exception as e:
-                print(f"Enhanced DPR analysis failed: {e}")
-                score_analysis = {'error': str(e)}
-        elif hasattr(globals(), 'dpr_scorer') and dpr_scorer:
-            try:
-                print(f"Running basic DPR scoring for {original_filename}...")
-                score_analysis = dpr_scorer.calculate_total_score(pdf_file_path)
-                print("Basic DPR scoring completed successfully")
-            except Exception as e:
-                print(f"Basic DPR scoring failed: {e}")
-                score_analysis = {'error': str(e)}
-        else:
-            score_analysis = {'error': 'No DPR analysis system available'}
+        risk_analysis, score_analysis, score_type, branch_timings = run_analysis_branches(
+            pdf_file_path, document, original_filename, progress_callback, upload_id, tier
+        )
+        scored_tier = (score_analysis.get('processing_info') or {}).get('analysis_tier', 'full')
         
         # Update analysis result in database
         analysis_result.risk_analysis = risk_analysis
@@ -164,15 +378,32 @@ def process_and_store_results(upload_id, pdf_file_path, original_filename):
         analysis_result.status = 'completed'
         analysis_result.processing_time = time.time() - start_time
         analysis_result.processed_at = datetime.utcnow()
+        if scored_tier != 'full':
+            # Marks the result for a full re-analysis once the queue is idle
+            analysis_result.analyzer_version = current_analyzer_version(scored_tier)
+            print(f"Scored {original_filename} with the {scored_tier} tier under load")
         
         db.session.commit()
         
+        upload = get_upload_by_id(upload_id)
+        if upload and scored_tier == 'full':
+            cache_analysis_results(get_file_hash(upload), upload_id, risk_analysis, score_analysis, score_type)
+        
+        progress_callback('stored', {
+            'status': 'completed',
+            'analysisType': score_type,
+            'totalScore': score_analysis.get('total_score'),
+            'percentage': score_analysis.get('percentage'),
+            'processingTime': analysis_result.processing_time
+        })
+        
         # Also store in JSON file for backward compatibility
         results = {
             'uploadId': upload_id,
             'originalFilename': original_filename,
             'processedAt': datetime.utcnow().isoformat(),
             'status': 'completed',
+            'branchTimings': branch_timings,
             'riskAnalysis': risk_analysis,
             'scoreAnalysis': score_analysis
         }
@@ -189,6 +420,7 @@ def process_and_store_results(upload_id, pdf_file_path, original_filename):
         
         # Update database with error
         try:
+            db.session.rollback()
             analysis_result.status = 'error'
             analysis_result.error_message = str(e)
             analysis_result.processing_time = time.time() - start_time
@@ -196,6 +428,7 @@ def process_and_store_results(upload_id, pdf_file_path, original_filename):
             db.session.commit()
         except:
             db.session.rollback()
+        progress_broker.publish(upload_id, 'error', {'error': str(e)})
         
         error_results = {
             'uploadId': upload_id,
@@ -215,6 +448,51 @@ def process_and_store_results(upload_id, pdf_file_path, original_filename):
         
         return error_results
 
+def requeue_degraded_result():
+    """Queue a full re-analysis of the oldest result scored with a degraded tier"""
+    with app.app_context():
+        analyzer_version = current_analyzer_version()
+        degraded = get_degraded_results(analyzer_version, limit=1) if analyzer_version else []
+        for result in degraded:
+            upload = get_upload_by_id(result.upload_id)
+            if not upload or not os.path.exists(upload.file_path):
+                continue
+            print(f"Queue idle, re-running full analysis of {upload.original_filename} ({result.analyzer_version})")
+            job_queue.submit(process_and_store_results, upload.upload_id, upload.file_path,
+                             upload.original_filename, None, 'full')
+
+def recover_interrupted_jobs():
+    """
+    Re-queue jobs a previous process left 'pending' or 'processing': the job
+    queue is in memory, so they would otherwise never finish. Jobs whose
+    upload file is gone are marked as errors. Each row is claimed atomically
+    first, so concurrently starting server processes don't run a job twice.
+    """
+    with app.app_context():
+        try:
+            for result in get_unfinished_results():
+                upload = get_upload_by_id(result.upload_id)
+                if upload and os.path.exists(upload.file_path):
+                    if claim_unfinished_result(result, 'pending'):
+                        print(f"Re-queueing interrupted analysis job {result.id} for {upload.original_filename}")
+                        job_queue.submit(process_and_store_results, upload.upload_id, upload.file_path,
+                                         upload.original_filename, result.id)
+                else:
+                    claim_unfinished_result(result, 'error',
+                                            'Analysis interrupted by a server restart; uploaded file not found')
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to recover interrupted analysis jobs: {e}")
+
+# Background work only runs in serving processes, never in scripts that import app
+idle_runner = None
+if SERVER_PROCESS:
+    recover_interrupted_jobs()
+    
+    # Re-run degraded results in full whenever the job queue is empty
+    if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer and dpr_analyzer.load_policy.enabled:
+        idle_runner = IdleRunner(lambda: job_queue.depth == 0, requeue_degraded_result, UPGRADE_POLL_SECONDS).start()
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload from frontend"""
@@ -240,9 +518,9 @@ def upload_file():
             file_extension = original_filename.rsplit('.', 1)[1].lower()
             unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
             
-            # Save file
+            # Save file, hashing it on the way to disk
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(file_path)
+            file_hash = save_file_with_hash(file, file_path)
             
             # Generate upload ID
             upload_id = Upload.generate_upload_id()
@@ -255,7 +533,8 @@ def upload_file():
                 file_path=file_path,
                 file_size=os.path.getsize(file_path),
                 language=language,
-                mime_type='application/pdf'
+                mime_type='application/pdf',
+                file_hash=file_hash
             )
             
             db.session.add(upload_record)
@@ -269,7 +548,8 @@ def upload_file():
                 'uploadedAt': datetime.utcnow().isoformat(),
                 'language': language,
                 'filePath': file_path,
-                'sizeBytes': os.path.getsize(file_path)
+                'sizeBytes': os.path.getsize(file_path),
+                'fileHash': file_hash
             }
             
             metadata_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_filename}.meta.json")
@@ -278,9 +558,52 @@ def upload_file():
             
             print(f"Upload stored in database with ID: {upload_id}")
             
-            # Automatically process the PDF with both analyzers
-            print(f"Starting automatic analysis for {original_filename}...")
-            analysis_results = process_and_store_results(upload_id, file_path, original_filename)
+            analyzer_version = current_analyzer_version()
+            reusable_result = find_reusable_result(file_hash, analyzer_version)
+            
+            if reusable_result:
+                # Byte-identical file already analyzed by this analyzer version
+                print(f"Reusing analysis of upload {reusable_result.upload_id} for identical file {original_filename}")
+                analysis_job = AnalysisResult(
+                    upload_id=upload_id,
+                    analysis_type='complete',
+                    status='completed',
+                    risk_analysis=reusable_result.risk_analysis,
+                    score_analysis=reusable_result.score_analysis,
+                    processing_time=0.0,
+                    analyzer_version=analyzer_version
+                )
+                db.session.add(analysis_job)
+                db.session.commit()
+                
+                results_file = os.path.join(app.config['RESULTS_FOLDER'], f"{upload_id}_results.json")
+                with open(results_file, 'w') as f:
+                    json.dump({
+                        'uploadId': upload_id,
+                        'originalFilename': original_filename,
+                        'processedAt': datetime.utcnow().isoformat(),
+                        'status': 'completed',
+                        'reusedFrom': reusable_result.upload_id,
+                        'riskAnalysis': reusable_result.risk_analysis,
+                        'scoreAnalysis': reusable_result.score_analysis
+                    }, f, indent=2)
+                progress_broker.publish(upload_id, 'stored', {
+                    'status': 'completed',
+                    'reusedFrom': reusable_result.upload_id
+                })
+            else:
+                # Queue the analysis job; the AnalysisResult row tracks its state
+                analysis_job = AnalysisResult(
+                    upload_id=upload_id,
+                    analysis_type='complete',
+                    status='pending',
+                    analyzer_version=analyzer_version
+                )
+                db.session.add(analysis_job)
+                db.session.commit()
+                
+                print(f"Queueing analysis job {analysis_job.id} for {original_filename}...")
+                job_queue.submit(process_and_store_results, upload_id, file_path, original_filename, analysis_job.id)
             
             response_data = {
                 'uploadId': upload_id,
@@ -289,7 +612,7 @@ def upload_file():
                     'filename': original_filename,
                     'uploadedAt': upload_record.uploaded_at.isoformat(),
                     'language': language,
-                    'status': 'analyzed',
+                    'status': 'analyzed' if reusable_result else 'processing',
                     'sizeBytes': upload_record.file_size,
                     'storedAs': unique_filename,
                     'filePath': file_path,
@@ -299,18 +622,86 @@ def upload_file():
                         'score': f'/api/analyze/score/{upload_id}',
                         'complete': f'/api/analyze/complete/{upload_id}',
                         'results': f'/api/results/{upload_id}',
+                        'progress': f'/api/progress/{upload_id}',
                         'archive': f'/api/archive/{upload_id}',
                         'download': f'/api/download/{upload_id}'
                     }
                 },
-                'analysisResults': analysis_results
+                'job': {
+                    'jobId': analysis_job.id,
+                    'status': analysis_job.status,
+                    'statusUrl': f'/api/jobs/{analysis_job.id}',
+                    'reusedFrom': reusable_result.upload_id if reusable_result else None
+                }
             }
             
-            return jsonify(response_data), 200
+            return jsonify(response_data), 200 if reusable_result else 202
     
     except Exception as e:
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Report the state of a background analysis job"""
+    try:
+        analysis_job = get_analysis_result_by_id(job_id)
+        if not analysis_job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        response_data = {
+            'jobId': analysis_job.id,
+            'uploadId': analysis_job.upload_id,
+            'status': analysis_job.status,
+            'processedAt': analysis_job.processed_at.isoformat() if analysis_job.processed_at else None,
+            'processingTime': analysis_job.processing_time,
+            'queueDepth': job_queue.depth
+        }
+        
+        if analysis_job.status == 'completed':
+            response_data['resultsUrl'] = f'/api/results/{analysis_job.upload_id}'
+        elif analysis_job.status == 'error':
+            response_data['error'] = analysis_job.error_message
+        
+        return jsonify(response_data), 200
+        
+    except Exception as e:
+        print(f"Error retrieving job status: {e}")
+        return jsonify({'error': f'Failed to retrieve job status: {str(e)}'}), 500
+
+@app.route('/api/progress/<upload_id>', methods=['GET'])
+def stream_progress(upload_id):
+    """Stream analysis stage events for an upload as server-sent events"""
+    upload = get_upload_by_id(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found for the given upload ID'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('lastEventId', '0'))
+    last_event_id = int(last_event_id) if str(last_event_id).isdigit() else 0
+    
+    if not progress_broker.has_events(upload_id):
+        # Nothing in flight in this process; report the stored state once
+        results = get_results_by_upload_id(upload_id)
+        latest_result = results[-1] if results else None
+        if latest_result and latest_result.status in ('completed', 'error'):
+            stage = 'stored' if latest_result.status == 'completed' else 'error'
+            event = {
+                'id': 1,
+                'stage': stage,
+                'data': {'status': latest_result.status, 'error': latest_result.error_message},
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            return Response(format_sse(event), mimetype='text/event-stream')
+    
+    def generate():
+        for event in progress_broker.subscribe(upload_id, last_event_id):
+            yield format_sse(event)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/files', methods=['GET'])
 def list_files():
     """List all uploaded files from database"""
@@ -357,13 +748,20 @@ def analyze_risk(upload_id):
         if not pdf_file or not os.path.exists(pdf_file):
             return jsonify({'error': 'File not found for the given upload ID'}), 404
         
+        file_hash = get_file_hash(get_upload_by_id(upload_id))
+        cached = cached_analysis_response(upload_id, file_hash, 'risk')
+        if cached:
+            return cached
+        
         # Perform risk analysis
         risk_analysis = risk_analyzer.analyze_dpr_pdf(pdf_file)
+        cache_analysis_results(file_hash, upload_id, risk_analysis=risk_analysis)
         
         return jsonify({
             'uploadId': upload_id,
             'riskAnalysis': risk_analysis,
-            'analyzedAt': datetime.now().isoformat()
+            'analyzedAt': datetime.now().isoformat(),
+            'cached': False
         }), 200
         
     except Exception as e:
@@ -384,19 +782,26 @@ def analyze_score(upload_id):
         if not pdf_file or not os.path.exists(pdf_file):
             return jsonify({'error': 'File not found for the given upload ID'}), 404
         
+        file_hash = get_file_hash(get_upload_by_id(upload_id))
+        cached = cached_analysis_response(upload_id, file_hash, 'score')
+        if cached:
+            return cached
+        
         # Perform scoring analysis with enhanced system
         if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
-            score_analysis = dpr_analyzer.analyze_dpr(pdf_file)
+            score_analysis = dpr_analyzer.analyze_dpr(pdf_file, upload_id=upload_id)
             analysis_type = "enhanced"
         else:
             score_analysis = dpr_scorer.calculate_total_score(pdf_file)
             analysis_type = "basic"
+        cache_analysis_results(file_hash, upload_id, score_analysis=score_analysis, analysis_type=analysis_type)
         
         return jsonify({
             'uploadId': upload_id,
             'scoreAnalysis': score_analysis,
             'analysisType': analysis_type,
-            'analyzedAt': datetime.now().isoformat()
+            'analyzedAt': datetime.now().isoformat(),
+            'cached': False
         }), 200
         
     except Exception as e:
@@ -413,39 +818,29 @@ def analyze_complete(upload_id):
         if not pdf_file or not os.path.exists(pdf_file):
             return jsonify({'error': 'File not found for the given upload ID'}), 404
         
+        file_hash = get_file_hash(get_upload_by_id(upload_id))
+        cached = cached_analysis_response(upload_id, file_hash, 'complete')
+        if cached:
+            return cached
+        
         results = {
             'uploadId': upload_id,
-            'analyzedAt': datetime.now().isoformat()
+            'analyzedAt': datetime.now().isoformat(),
+            'cached': False
         }
         
-        # Risk analysis
-        if RISK_ANALYZER_AVAILABLE and risk_analyzer:
-            try:
-                risk_analysis = risk_analyzer.analyze_dpr_pdf(pdf_file)
-                results['riskAnalysis'] = risk_analysis
-            except Exception as e:
-                results['riskAnalysis'] = {'error': str(e)}
-        else:
-            results['riskAnalysis'] = {'error': 'Risk analyzer not available'}
+        document = extract_shared_document(pdf_file, os.path.basename(pdf_file))
         
-        # Score analysis using enhanced system
-        if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
-            try:
-                score_analysis = dpr_analyzer.analyze_dpr(pdf_file)
-                results['scoreAnalysis'] = score_analysis
-                results['analysisType'] = 'enhanced'
-            except Exception as e:
-                results['scoreAnalysis'] = {'error': str(e)}
-        elif hasattr(globals(), 'dpr_scorer') and dpr_scorer:
-            try:
-                score_analysis = dpr_scorer.calculate_total_score(pdf_file)
-                results['scoreAnalysis'] = score_analysis
-                results['analysisType'] = 'basic'
-            except Exception as e:
-                results['scoreAnalysis'] = {'error': str(e)}
-        else:
-            results['scoreAnalysis'] = {'error': 'No DPR analysis system available'}
-            results['analysisType'] = 'none'
+        risk_analysis, score_analysis, analysis_type, branch_timings = run_analysis_branches(
+            pdf_file, document, os.path.basename(pdf_file), upload_id=upload_id
+        )
+        results.update({
+            'riskAnalysis': risk_analysis,
+            'scoreAnalysis': score_analysis,
+            'analysisType': analysis_type,
+            'branchTimings': branch_timings
+        })
+        cache_analysis_results(file_hash, upload_id, risk_analysis, score_analysis, analysis_type)
         
         return jsonify(results), 200
         
@@ -468,8 +863,10 @@ def get_results(upload_id):
         if not results:
             return jsonify({'error': 'Results not found for the given upload ID'}), 404
         
-        # Get the latest/most complete result
-        latest_result = results[-1]
+        # Get the latest/most complete result; a completed one is kept visible
+        # while a newer job (e.g. a full re-analysis of a degraded result) runs
+        completed_results = [result for result in results if result.status == 'completed']
+        latest_result = completed_results[-1] if completed_results else results[-1]
         
         # Update archive access tracking if archived
         if upload.is_archived:
@@ -668,6 +1065,12 @@ def delete_results(upload_id):
         db.session.delete(upload)
         db.session.commit()
         
+        if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
+            try:
+                dpr_analyzer.remove_from_project_index(upload_id)
+            except Exception as e:
+                print(f"Warning: Failed to remove upload from project index: {e}")
+        
         return jsonify({'message': 'Upload and all associated data deleted successfully'}), 200
         
     except Exception as e:
@@ -692,9 +1095,14 @@ def get_system_capabilities():
             }
         }
         
+        store = page_store()
+        capabilities['pdf_extraction'] = {'page_store': store.stats() if store else {'enabled': False}}
+        
         if INTEGRATED_ANALYSIS_AVAILABLE and dpr_analyzer:
             analysis_caps = dpr_analyzer.get_capabilities()
             capabilities['score_analysis']['features'] = analysis_caps.get('features', [])
+            capabilities['score_analysis']['embedding_cache'] = analysis_caps.get('embedding_cache')
+            capabilities['score_analysis']['load_policy'] = dpr_analyzer.load_policy.status(job_queue.backlog)
             capabilities['score_analysis']['enhanced_features'] = {
                 'nlp_available': True,
                 'semantic_analysis': True,
@@ -881,7 +1289,7 @@ def export_pdf(upload_id):
                 story.append(Spacer(1, 10))
         
         # Enhanced Analysis Section
-        if 'analysis_type' in (latest_result.score_analysis or {}) and latest_result.score_analysis['analysis_type'] == 'enhanced':
+        if 'analysis_type' in (latest_result.score_analysis or {}) and latest_result.score_analysis['analysis_type'].startswith('enhanced'):
             story.append(PageBreak())
             story.append(Paragraph("Enhanced AI Analysis", heading_style))
             
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Criteria Matrix Benchmark
+Times the fused CriteriaMatrix scan against the scorer's previous
+per-criteria cos_sim loops, on the scorer's real criteria embeddings and
+the segments of real DPRs, and checks that both find the same matches
+"""
+
+import os
+import time
+import argparse
+
+import torch
+from sentence_transformers import util
+
+from pdf_document import extract_document
+from enhanced_dpr_scorer import GATISHAKTI_RELEVANCE_THRESHOLD, EnhancedDPRScorer
+
+def previous_references(scorer):
+    """Criteria embeddings by key, as the scorer's _reference_embeddings() built them"""
+    references = {f"section:{section}": emb for section, emb in scorer.section_embeddings_dict.items()}
+    references.update({f"impact:{criterion}": emb for criterion, emb in scorer.impact_embeddings_dict.items()})
+    references["ndc"] = scorer.ndc_embeddings
+    references["gatishakti"] = scorer.gatishakti_embedding
+    return references
+
+def scan_per_criteria(references, chunks, pages):
+    """The previous _scan_segments loop: one cos_sim call and reduction per criteria set and chunk"""
+    max_similarity = {key: torch.full((len(ref),), -1.0, device=ref.device) for key, ref in references.items()}
+    best_segment = {key: torch.zeros(len(ref), dtype=torch.long, device=ref.device) for key, ref in references.items()}
+    gatishakti_pages, gatishakti_similarity_sum = [], 0.0
+    start = 0
+    for chunk_embeddings in chunks:
+        for key, ref in references.items():
+            similarities = util.cos_sim(ref, chunk_embeddings)
+            chunk_max, chunk_best = similarities.max(dim=1)
+            improved = chunk_max > max_similarity[key]
+            max_similarity[key] = torch.where(improved, chunk_max, max_similarity[key])
+            best_segment[key] = torch.where(improved, chunk_best + start, best_segment[key])
+            if key == "gatishakti":
+                row = similarities[0]
+                gatishakti_similarity_sum += row.sum().item()
+                relevant = torch.nonzero(row > GATISHAKTI_RELEVANCE_THRESHOLD).flatten().tolist()
+                gatishakti_pages.extend(pages[start + i] for i in relevant)
+        start += len(chunk_embeddings)
+    row_max = torch.cat([max_similarity[key] for key in references])
+    row_best = torch.cat([best_segment[key] for key in references])
+    return row_max, row_best, gatishakti_similarity_sum
+
+def scan_fused(criteria, chunks, pages):
+    """The current _scan_segments similarity work: one matmul per chunk over every criteria row"""
+    row_max = torch.full((len(criteria),), -1.0, device=criteria.device)
+    row_best = torch.zeros(len(criteria), dtype=torch.long, device=criteria.device)
+    gatishakti_row = criteria.slices["gatishakti"].start
+    gatishakti_pages, gatishakti_similarity_sum = [], 0.0
+    start = 0
+    for chunk_embeddings in chunks:
+        similarities = criteria.similarities(chunk_embeddings)
+        chunk_max, chunk_best = similarities.max(dim=1)
+        improved = chunk_max > row_max
+        row_max = torch.where(improved, chunk_max, row_max)
+        row_best = torch.where(improved, chunk_best + start, row_best)
+        gatishakti = similarities[gatishakti_row]
+        gatishakti_similarity_sum += gatishakti.sum().item()
+        relevant = torch.nonzero(gatishakti > GATISHAKTI_RELEVANCE_THRESHOLD).flatten().tolist()
+        gatishakti_pages.extend(pages[start + i] for i in relevant)
+        start += len(chunk_embeddings)
+    criteria.group_max(row_max)
+    return row_max, row_best, gatishakti_similarity_sum
+
+def time_it(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="+", help="DPR PDF files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scorer = EnhancedDPRScorer(verbose=False)
+    if scorer.criteria_matrix is None:
+        parser.error("the semantic model is not available")
+    references = previous_references(scorer)
+    criteria = scorer.criteria_matrix
+    if list(references) != criteria.keys:
+        parser.error("criteria keys of the previous and fused paths differ")
+
+    print(f"{scorer.semantic_model_name}, {len(criteria)} criteria rows, {scorer.encode_chunk_size} segments per chunk\n")
+    print(f"{'document':<30}{'segments':>10}{'loops ms':>10}{'fused ms':>10}{'speedup':>9}"
+          f"{'max diff':>10}{'same best':>11}{'same found':>12}")
+    for pdf_path in args.pdfs:
+        document = extract_document(pdf_path)
+        segments = scorer.segment_document(document.pages)
+        if not len(segments):
+            print(f"{os.path.basename(pdf_path)}: no segments")
+            continue
+        # Encode once; both paths score the same embeddings
+        chunks = [scorer._encode(segments.texts[start:start + scorer.encode_chunk_size])
+                  for start in range(0, len(segments), scorer.encode_chunk_size)]
+
+        loop_time, (loop_max, loop_best, loop_sum) = time_it(
+            lambda: scan_per_criteria(references, chunks, segments.pages), args.repeat)
+        fused_time, (fused_max, fused_best, fused_sum) = time_it(
+            lambda: scan_fused(criteria, chunks, segments.pages), args.repeat)
+
+        max_diff = max((loop_max - fused_max).abs().max().item(), abs(loop_sum - fused_sum) / len(segments))
+        same_best = (loop_best == fused_best).float().mean().item()
+        threshold = scorer.semantic_threshold
+        same_found = ((loop_max > threshold) == (fused_max > threshold)).float().mean().item()
+        print(f"{os.path.basename(pdf_path)[:29]:<30}{len(segments):>10}{loop_time * 1000:>10.1f}{fused_time * 1000:>10.1f}"
+              f"{loop_time / fused_time:>8.1f}x{max_diff:>10.1e}{same_best:>11.1%}{same_found:>12.1%}")
+
+if __name__ == "__main__":
+    main()
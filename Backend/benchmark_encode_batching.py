@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Encode Batching Benchmark
+Measures tokens/second of the previous single encode() call with a fixed
+batch size against length-bucketed batches under a token budget, on
+sentences from real DPRs
+"""
+
+import re
+import time
+import argparse
+
+import numpy as np
+
+from pdf_document import extract_document
+from encoder_backends import bucketed_encode, create_encoder, padding_efficiency, plan_batches, token_lengths
+
+def load_segments(pdf_paths, limit):
+    """Sentence segments of the DPRs, split the way the scorer splits them"""
+    segments = []
+    for pdf_path in pdf_paths:
+        document = extract_document(pdf_path)
+        for page in document.pages:
+            segments.extend(piece.strip() for piece in re.split(r'\n+|(?<=[.!?])\s+', page or "") if len(piece.strip()) > 10)
+    return segments[:limit] if limit else segments
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="+", help="DPR PDF files to take sentences from")
+    parser.add_argument("--model", default="intfloat/e5-large-v2")
+    parser.add_argument("--backend", default=None, help="torch, onnx or onnx-int8 (default: DPR_ENCODER_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Fixed batch size of the baseline")
+    parser.add_argument("--token-budget", type=int, default=4096)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=1000, help="Max sentences (0 for all)")
+    args = parser.parse_args()
+
+    encoder = create_encoder(args.model, backend=args.backend)
+    if getattr(encoder, "tokenizer", None) is None:
+        parser.error("length bucketing needs a local encoder backend")
+
+    segments = load_segments(args.pdfs, args.limit)
+    lengths = token_lengths(encoder.tokenizer, segments, encoder.max_length)
+    total_tokens = sum(lengths)
+    print(f"{len(segments)} sentences, {total_tokens} tokens "
+          f"(min {min(lengths)}, median {int(np.median(lengths))}, max {max(lengths)}) on {encoder.name}")
+
+    encoder.encode(segments[:args.batch_size], batch_size=args.batch_size)  # Warm up
+
+    # Baseline: the previous production call, one encode() with a fixed batch size
+    start = time.perf_counter()
+    baseline = encoder.encode(segments, batch_size=args.batch_size)
+    baseline_time = time.perf_counter() - start
+
+    # SentenceTransformer.encode sorts texts by length before batching; ONNX batches in document order
+    baseline_order = (sorted(range(len(segments)), key=lambda i: -len(segments[i]))
+                      if encoder.backend == "torch" else list(range(len(segments))))
+    fixed_batches = [baseline_order[i:i + args.batch_size] for i in range(0, len(segments), args.batch_size)]
+
+    bucketed_batches = plan_batches(lengths, args.token_budget, args.max_batch_size)
+    start = time.perf_counter()
+    bucketed = bucketed_encode(encoder, segments, args.token_budget, args.max_batch_size)
+    bucketed_time = time.perf_counter() - start
+
+    cosine = np.sum(baseline * bucketed, axis=1) / (
+        np.linalg.norm(baseline, axis=1) * np.linalg.norm(bucketed, axis=1))
+
+    print(f"\n{'batching':<30}{'batches':>9}{'padding eff.':>14}{'tokens/s':>12}")
+    print(f"{f'encode() batch_size={args.batch_size}':<30}{len(fixed_batches):>9}"
+          f"{padding_efficiency(lengths, fixed_batches):>14.1%}{total_tokens / baseline_time:>12.0f}")
+    print(f"{f'bucketed budget={args.token_budget}':<30}{len(bucketed_batches):>9}"
+          f"{padding_efficiency(lengths, bucketed_batches):>14.1%}{total_tokens / bucketed_time:>12.0f}")
+    print(f"\nSpeedup: {baseline_time / bucketed_time:.2f}x, min cosine vs baseline: {cosine.min():.5f} "
+          f"(order restored correctly if ~1.0)")
+
+if __name__ == "__main__":
+    main()
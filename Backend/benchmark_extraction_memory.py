@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Extraction Memory Benchmark
+Peak memory of keyword scoring over a materialized document (every page
+plus the joined text) against the streaming page iterator, for growing
+page counts, each run in a fresh forked process
+"""
+
+import os
+import time
+import argparse
+import resource
+import tracemalloc
+import multiprocessing as mp
+
+# Parse the PDF in every run instead of reading stored pages
+os.environ.setdefault("PAGE_STORE_MAX_MB", "0")
+
+from pdf_document import extract_document, iter_pages
+from dpr_scorer import DPRScorer
+
+def score_materialized(scorer, pdf_path, max_pages):
+    document = extract_document(pdf_path, max_pages=max_pages, workers=1)
+    return document.page_count, scorer.scan_pages([document.text])
+
+def score_streaming(scorer, pdf_path, max_pages):
+    page_count = 0
+    def page_texts():
+        nonlocal page_count
+        for page in iter_pages(pdf_path, max_pages=max_pages):
+            page_count += 1
+            yield page.text
+    scanner = scorer.scan_pages(page_texts())
+    return page_count, scanner
+
+MODES = {"materialized": score_materialized, "streaming": score_streaming}
+
+def _measure(mode, scorer, pdf_path, max_pages, queue):
+    # ru_maxrss (KiB on Linux) starts at the RSS inherited from the parent
+    baseline_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    page_count, scanner = MODES[mode](scorer, pdf_path, max_pages)
+    seconds = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    queue.put({
+        "pages": page_count,
+        "terms": sorted(scanner.found),
+        "seconds": seconds,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kib) / 1024,
+        "python_peak_mb": python_peak / (1024 * 1024)
+    })
+
+def measure(mode, scorer, pdf_path, max_pages):
+    """Run one mode in a forked child so every run starts from the same heap"""
+    context = mp.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(mode, scorer, pdf_path, max_pages, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="+", help="DPR PDF files")
+    parser.add_argument("--pages", default="10,50,100,0",
+                        help="Comma-separated page limits (0 for the whole document)")
+    args = parser.parse_args()
+
+    scorer = DPRScorer()
+    limits = [int(limit) for limit in args.pages.split(",")]
+
+    print(f"{'document':<30}{'pages':>7}{'mode':>14}{'seconds':>9}{'peak RSS +MB':>14}{'peak Python MB':>16}{'terms':>7}")
+    for pdf_path in args.pdfs:
+        for limit in limits:
+            results = {mode: measure(mode, scorer, pdf_path, limit or None) for mode in MODES}
+            pages = results["materialized"]["pages"]
+            if results["streaming"]["terms"] != results["materialized"]["terms"]:
+                print(f"{'':<30}warning: streaming and materialized scoring found different terms")
+            for mode, result in results.items():
+                print(f"{os.path.basename(pdf_path)[:29]:<30}{pages:>7}{mode:>14}{result['seconds']:>9.2f}"
+                      f"{result['rss_growth_mb']:>14.1f}{result['python_peak_mb']:>16.1f}{len(result['terms']):>7}")
+            if limit and pages < limit:
+                break  # The document is shorter than the remaining limits
+
+if __name__ == "__main__":
+    main()
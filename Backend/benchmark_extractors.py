@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Extractor Benchmark
+Compares speed and output quality of pdfplumber, PyMuPDF, pypdf and the
+PyMuPDF fast path (with pdfplumber escalation) over a local corpus of DPRs
+"""
+
+import os
+import re
+import glob
+import time
+import argparse
+from collections import Counter, defaultdict
+
+from pdf_document import (OCR_MAX_TEXT_CHARS, QUALITY_MAX_GARBAGE_RATIO, QUALITY_MIN_WORDS,
+                          available_extractors, extract_pages, page_text_quality)
+
+def corpus_files(paths):
+    """PDF files given directly or found under the given directories"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+def word_set(page_text):
+    return set(re.findall(r'[^\W\d_]{2,}', page_text.lower()))
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="DPR PDF files or directories of them")
+    parser.add_argument("--max-pages", type=int, default=None, help="Pages per document (default all)")
+    parser.add_argument("--reference", default="pdfplumber",
+                        help="Extractor whose words the others are compared against (the previous default)")
+    args = parser.parse_args()
+
+    files = corpus_files(args.paths)
+    if not files:
+        parser.error("no PDF files found")
+    extractors = available_extractors()
+    reference = args.reference if args.reference in extractors else None
+
+    totals = defaultdict(Counter)
+    page_extractors = defaultdict(Counter)
+    for pdf_path in files:
+        results = {}
+        for name in extractors:
+            start = time.perf_counter()
+            try:
+                results[name] = extract_pages(pdf_path, name, args.max_pages)
+            except Exception as e:
+                print(f"{os.path.basename(pdf_path)}: {name} failed: {e}")
+                totals[name]["failed_documents"] += 1
+                continue
+            totals[name]["seconds"] += time.perf_counter() - start
+            totals[name]["documents"] += 1
+
+        reference_words = [word_set(text) for text, _, _ in results.get(reference, [])]
+        for name, pages in results.items():
+            for page_num, (text, _, page_extractor) in enumerate(pages):
+                totals[name]["pages"] += 1
+                page_extractors[name][page_extractor] += 1
+                if len(text.strip()) <= OCR_MAX_TEXT_CHARS:
+                    continue  # Image-only or blank: left to OCR, not a text quality signal
+                garbage_ratio, words = page_text_quality(text)
+                totals[name]["text_pages"] += 1
+                totals[name]["garbage_ratio"] += garbage_ratio
+                totals[name]["words"] += words
+                totals[name]["failing_pages"] += garbage_ratio > QUALITY_MAX_GARBAGE_RATIO or words < QUALITY_MIN_WORDS
+                if page_num < len(reference_words):
+                    totals[name]["agreement"] += jaccard(word_set(text), reference_words[page_num])
+                    totals[name]["compared_pages"] += 1
+
+    print(f"{len(files)} documents; quality checks: garbage ratio <= {QUALITY_MAX_GARBAGE_RATIO}, "
+          f"words >= {QUALITY_MIN_WORDS} per text page\n")
+    print(f"{'extractor':<22}{'seconds':>9}{'pages/s':>9}{'speedup':>9}{'garbage':>9}{'words/page':>12}"
+          f"{'failing':>9}{f'vs {reference}' if reference else '':>16}")
+    baseline = totals[reference]["seconds"] if reference else 0
+    for name in extractors:
+        total = totals[name]
+        text_pages = total["text_pages"] or 1
+        agreement = f"{total['agreement'] / total['compared_pages']:.1%}" if total["compared_pages"] else "-"
+        speedup = f"{baseline / total['seconds']:.1f}x" if baseline and total["seconds"] else "-"
+        print(f"{name:<22}{total['seconds']:>9.2f}{total['pages'] / (total['seconds'] or 1):>9.1f}{speedup:>9}"
+              f"{total['garbage_ratio'] / text_pages:>9.2%}{total['words'] / text_pages:>12.0f}"
+              f"{total['failing_pages'] / text_pages:>9.1%}{agreement:>16}")
+        if total["failed_documents"]:
+            print(f"{'':<22}failed on {total['failed_documents']} documents")
+        if len(page_extractors[name]) > 1:
+            print(f"{'':<22}pages by extractor: "
+                  + ", ".join(f"{extractor} {count}" for extractor, count in page_extractors[name].most_common()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Retrieval Mode Benchmark
+Compares coarse-to-fine (page then sentence) semantic retrieval against the
+full sentence-level pass: latency, sub-score differences and agreement of
+requirement matches
+"""
+
+import os
+import time
+import argparse
+
+# Measure model work, not embedding cache hits
+os.environ.setdefault("EMBEDDING_CACHE_MAX_MB", "0")
+
+import torch
+
+from pdf_document import extract_document
+from enhanced_dpr_scorer import EnhancedDPRScorer
+
+def run_mode(scorer, document, mode):
+    scorer.retrieval_mode = mode
+    start = time.perf_counter()
+    segments = scorer.segment_document(document.pages)
+    _, completeness = scorer.validate_dpr_completeness(document.text, segments)
+    gatishakti = scorer.get_gatishakti_score(document.text, segments).score
+    impact = scorer.get_impact_sustainability_score(document.text, segments).score
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "segments": len(segments),
+        "pages": len(segments.candidate_pages) if segments.candidate_pages is not None else document.page_count,
+        "scores": {"completeness": completeness, "gatishakti": gatishakti, "impact": impact},
+        "scan": segments.scan
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="+", help="DPR PDF files")
+    parser.add_argument("--top-pages", type=int, default=None, help="Candidate pages per criterion")
+    args = parser.parse_args()
+
+    scorer = EnhancedDPRScorer(verbose=False)
+    if scorer.criteria_matrix is None:
+        parser.error("a semantic model is required")
+    if args.top_pages:
+        scorer.coarse_top_pages = args.top_pages
+
+    print(f"{'document':<30}{'pages':>7}{'full s':>9}{'coarse s':>10}{'speedup':>9}"
+          f"{'match agree':>13}{'max sim diff':>14}  score diffs")
+    for pdf_path in args.pdfs:
+        document = extract_document(pdf_path)
+        full = run_mode(scorer, document, "full")
+        coarse = run_mode(scorer, document, "coarse_to_fine")
+
+        if full["scan"] is None or coarse["scan"] is None:
+            print(f"{os.path.basename(pdf_path)[:29]:<30} no semantic segments")
+            continue
+        full_hits = full["scan"].row_max > scorer.semantic_threshold
+        coarse_hits = coarse["scan"].row_max > scorer.semantic_threshold
+        agreement = (full_hits == coarse_hits).float().mean().item()
+        sim_diff = torch.max(torch.abs(full["scan"].criterion_max - coarse["scan"].criterion_max)).item()
+        score_diffs = ", ".join(f"{name} {coarse['scores'][name] - value:+.2f}" for name, value in full["scores"].items())
+
+        print(f"{os.path.basename(pdf_path)[:29]:<30}{document.page_count:>7}{full['seconds']:>9.2f}"
+              f"{coarse['seconds']:>10.2f}{full['seconds'] / coarse['seconds']:>9.1f}"
+              f"{agreement:>13.1%}{sim_diff:>14.3f}  {score_diffs}")
+        print(f"{'':<30}sentences {full['segments']} -> {coarse['segments']}, "
+              f"pages {document.page_count} -> {coarse['pages']}")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import os
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import JSON, LargeBinary, Text
+from sqlalchemy.exc import IntegrityError
 import uuid
 import json
 
@@ -24,6 +25,7 @@ class Upload(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_archived = db.Column(db.Boolean, default=False)
     mime_type = db.Column(db.String(100), default='application/pdf')
+    file_hash = db.Column(db.String(64), index=True)  # SHA-256 of the file contents
     
     # Relationship with results
     results = db.relationship('AnalysisResult', backref='upload', cascade='all, delete-orphan')
@@ -31,6 +33,9 @@ class Upload(db.Model):
     # Relationship with archived files
     archived_files = db.relationship('ArchivedFile', backref='upload', cascade='all, delete-orphan')
     
+    # Relationship with cached analyze endpoint results
+    cached_analyses = db.relationship('CachedAnalysis', backref='upload', cascade='all, delete-orphan')
+    
     def to_dict(self):
         """Convert model to dictionary"""
         return {
@@ -43,7 +48,8 @@ class Upload(db.Model):
             'language': self.language,
             'uploadedAt': self.uploaded_at.isoformat() if self.uploaded_at else None,
             'isArchived': self.is_archived,
-            'mimeType': self.mime_type
+            'mimeType': self.mime_type,
+            'fileHash': self.file_hash
         }
     
     @staticmethod
@@ -58,7 +64,7 @@ class AnalysisResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     upload_id = db.Column(db.String(36), db.ForeignKey('uploads.upload_id'), nullable=False, index=True)
     analysis_type = db.Column(db.String(50), nullable=False)  # 'risk', 'score', 'complete'
-    status = db.Column(db.String(20), default='pending')  # 'pending', 'completed', 'error'
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'processing', 'completed', 'error'
     processed_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Store analysis results as JSON
@@ -68,6 +74,7 @@ class AnalysisResult(db.Model):
     
     # Additional metadata
     processing_time = db.Column(db.Float)  # Time taken for analysis in seconds
+    analyzer_version = db.Column(db.String(50))  # Analyzer that produced the result, e.g. 'enhanced-2.0'
     
     def to_dict(self):
         """Convert model to dictionary"""
@@ -80,7 +87,33 @@ class AnalysisResult(db.Model):
             'riskAnalysis': self.risk_analysis,
             'scoreAnalysis': self.score_analysis,
             'errorMessage': self.error_message,
-            'processingTime': self.processing_time
+            'processingTime': self.processing_time,
+            'analyzerVersion': self.analyzer_version
+        }
+
+class CachedAnalysis(db.Model):
+    """Model for caching /api/analyze/* results by file hash and analyzer settings"""
+    __tablename__ = 'analysis_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    upload_id = db.Column(db.String(36), db.ForeignKey('uploads.upload_id', ondelete='CASCADE'), nullable=False, index=True)
+    analysis_type = db.Column(db.String(50), nullable=False)  # 'risk', 'score', 'complete'
+    result = db.Column(JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    hit_count = db.Column(db.Integer, default=0)
+    last_hit_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id': self.id,
+            'cacheKey': self.cache_key,
+            'uploadId': self.upload_id,
+            'analysisType': self.analysis_type,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'hitCount': self.hit_count,
+            'lastHitAt': self.last_hit_at.isoformat() if self.last_hit_at else None
         }
 
 class ArchivedFile(db.Model):
@@ -144,6 +177,117 @@ def get_results_by_upload_id(upload_id):
     """Get all analysis results for a specific upload"""
     return AnalysisResult.query.filter_by(upload_id=upload_id).all()
 
+def get_analysis_result_by_id(result_id):
+    """Get a single analysis result (job) by its primary key"""
+    return db.session.get(AnalysisResult, result_id)
+
+def find_reusable_result(file_hash, analyzer_version):
+    """Find a completed, error-free complete analysis of a byte-identical file"""
+    if not file_hash or not analyzer_version:
+        return None
+    
+    candidates = (
+        AnalysisResult.query.join(Upload)
+        .filter(
+            Upload.file_hash == file_hash,
+            AnalysisResult.analysis_type == 'complete',
+            AnalysisResult.analyzer_version == analyzer_version,
+            AnalysisResult.status == 'completed'
+        )
+        .order_by(AnalysisResult.processed_at.desc())
+        .all()
+    )
+    
+    for result in candidates:
+        if result.risk_analysis and 'error' in result.risk_analysis:
+            continue
+        if result.score_analysis and 'error' in result.score_analysis:
+            continue
+        return result
+    return None
+
+def get_degraded_results(analyzer_version, limit=1):
+    """
+    Oldest completed results scored by a degraded tier of analyzer_version
+    (e.g. 'enhanced-2.0-reduced') whose upload has no live or completed
+    full-tier job; a full re-run that failed leaves the result eligible again
+    """
+    full_tier_uploads = db.session.query(AnalysisResult.upload_id).filter(
+        AnalysisResult.analyzer_version == analyzer_version,
+        AnalysisResult.status.in_(['pending', 'processing', 'completed'])
+    )
+    return (
+        AnalysisResult.query.join(Upload)
+        .filter(
+            AnalysisResult.analyzer_version.like(f"{analyzer_version}-%"),
+            AnalysisResult.status == 'completed',
+            Upload.is_archived == False,
+            ~AnalysisResult.upload_id.in_(full_tier_uploads)
+        )
+        .order_by(AnalysisResult.processed_at.asc())
+        .limit(limit)
+        .all()
+    )
+
+def get_unfinished_results():
+    """Jobs still 'pending' or 'processing', oldest first"""
+    return (
+        AnalysisResult.query
+        .filter(AnalysisResult.status.in_(['pending', 'processing']))
+        .order_by(AnalysisResult.id.asc())
+        .all()
+    )
+
+def claim_unfinished_result(result, status, error_message=None):
+    """
+    Atomically move an interrupted job read by get_unfinished_results() to
+    status ('pending' to re-queue it, or 'error'). The update only applies if
+    the row still has the status and timestamp it was read with, so when
+    several processes recover at once exactly one of them gets each job.
+    Returns True when this caller claimed it.
+    """
+    values = {'status': status, 'processed_at': datetime.utcnow()}
+    if error_message is not None:
+        values['error_message'] = error_message
+    claimed = (
+        AnalysisResult.query
+        .filter(AnalysisResult.id == result.id,
+                AnalysisResult.status == result.status,
+                AnalysisResult.processed_at == result.processed_at)
+        .update(values, synchronize_session=False)
+    )
+    db.session.commit()
+    return claimed == 1
+
+def get_cached_analysis(cache_key):
+    """Return a cached analysis result by key and record the hit"""
+    entry = CachedAnalysis.query.filter_by(cache_key=cache_key).first()
+    if entry:
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.session.commit()
+    return entry
+
+def store_cached_analysis(cache_key, upload_id, analysis_type, result):
+    """Insert or refresh a cached analysis result"""
+    try:
+        entry = CachedAnalysis.query.filter_by(cache_key=cache_key).first()
+        if entry:
+            entry.result = result
+            entry.upload_id = upload_id
+            entry.created_at = datetime.utcnow()
+        else:
+            db.session.add(CachedAnalysis(
+                cache_key=cache_key,
+                upload_id=upload_id,
+                analysis_type=analysis_type,
+                result=result
+            ))
+        db.session.commit()
+    except IntegrityError:
+        # Another request cached the same key concurrently
+        db.session.rollback()
+
 def get_all_uploads(include_archived=True):
     """Get all uploads, optionally excluding archived ones"""
     query = Upload.query
@@ -6,12 +6,18 @@ Extracted from DPR_risk/risk_prediction.ipynb
 import os
 import json
 import sys
-from pypdf import PdfReader
+import hashlib
+from typing import Optional
 from pypdf.errors import PdfReadError
 from google import genai
 from google.genai import types
 from google.genai.errors import APIError
 
+from pdf_document import ExtractedDocument, extract_document
+
+# Only the opening pages (project summary) are sent to the model
+RISK_SUMMARY_PAGES = 5
+
 class DPRRiskAnalyzer:
     def __init__(self, api_key=None):
         self.model_name = "gemini-2.5-flash"
@@ -86,22 +92,25 @@ You MUST return the assessment as a single JSON object conforming to the provide
             }
         )
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def get_cache_signature(self) -> dict:
+        """Settings that change the risk assessment; used to key cached results"""
+        return {
+            "model_name": self.model_name,
+            "summary_pages": RISK_SUMMARY_PAGES,
+            "prompt_hash": hashlib.sha256(self.system_instruction.encode("utf-8")).hexdigest()
+        }
+
+    def extract_text_from_pdf(self, pdf_path: str, document: Optional[ExtractedDocument] = None) -> str:
         """
-        Extracts all readable text from a PDF file.
+        Extracts the project summary text (first pages) from a PDF file.
+        Uses the already extracted document when one is provided.
         """
         print(f"Attempting to extract text from: {pdf_path}...")
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
+            if document is None:
+                document = extract_document(pdf_path, max_pages=RISK_SUMMARY_PAGES)
 
-            for i, page in enumerate(reader.pages):
-                if i < 5:  # Only process first 5 pages
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n\n"
-                else:
-                    break
+            text = "".join(page + "\n\n" for page in document.pages[:RISK_SUMMARY_PAGES] if page)
 
             if not text.strip():
                 print("WARNING: Extracted text is empty or only whitespace.")
@@ -154,11 +163,11 @@ You MUST return the assessment as a single JSON object conforming to the provide
             print(f"An unexpected error occurred during API call: {e}")
             raise Exception(f"Analysis error: {e}")
 
-    def analyze_dpr_pdf(self, pdf_file_path: str) -> dict:
+    def analyze_dpr_pdf(self, pdf_file_path: str, document: Optional[ExtractedDocument] = None) -> dict:
         """
         Main function to analyze a DPR PDF file for risks.
         """
-        dpr_text = self.extract_text_from_pdf(pdf_file_path)
+        dpr_text = self.extract_text_from_pdf(pdf_file_path, document)
         if not dpr_text:
             raise Exception("Failed to extract text from PDF.")
 
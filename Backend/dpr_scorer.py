@@ -4,7 +4,6 @@ Simplified version extracted from DPR_score/score.ipynb
 """
 
 import os
-import fitz  # PyMuPDF
 import torch
 from sentence_transformers import SentenceTransformer, util
 from rapidfuzz import fuzz
@@ -12,7 +11,9 @@ import pytesseract
 from pdf2image import convert_from_path
 import json
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Optional
+
+from pdf_document import ExtractedDocument, PageTermScanner, extract_document, iter_pages
 
 class DPRScorer:
     def __init__(self):
@@ -76,29 +77,78 @@ class DPRScorer:
             "Statutory Clearances": 5,
             "Required Certificates": 5
         }
+        
+        # Keywords of the technical, sustainability and compliance sub-scores
+        self.tech_keywords = [
+            "technical specification", "design", "engineering", "construction",
+            "materials", "methodology", "standards", "quality", "testing"
+        ]
+        self.sustainability_keywords = [
+            "sustainability", "environmental", "maintenance", "operation",
+            "long-term", "lifecycle", "renewable", "green", "eco-friendly"
+        ]
+        self.compliance_keywords = [
+            "compliance", "regulation", "guideline", "standard", "approval",
+            "clearance", "certificate", "authorization", "permission"
+        ]
+
+    def get_cache_signature(self) -> Dict:
+        """Settings that change scoring output; used to key cached results"""
+        return {
+            "semantic_threshold": self.semantic_threshold,
+            "fuzzy_threshold": self.fuzzy_threshold,
+            "section_score_threshold": self.section_score_threshold,
+            "marks_distribution": self.marks_distribution
+        }
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
-        Extract text from PDF using PyMuPDF
+        Extract text from PDF using the shared extractor
         """
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-            doc.close()
-            return text
+            return extract_document(pdf_path).text
         except Exception as e:
             print(f"Error extracting text from PDF: {e}")
             return ""
 
-    def validate_dpr_with_marks(self, pdf_path: str) -> Tuple[Dict, float]:
+    def iter_page_texts(self, pdf_path: str) -> Iterator[str]:
+        """
+        Page texts of a PDF, extracted one page at a time
+        """
+        try:
+            for page in iter_pages(pdf_path):
+                yield page.text
+        except Exception as e:
+            print(f"Error extracting text from PDF: {e}")
+
+    def _key_terms(self, requirement: str) -> List[str]:
+        return requirement.lower().replace("(", "").replace(")", "").split()
+
+    def scan_pages(self, pages: Iterable[str]) -> PageTermScanner:
+        """
+        Find every term the sub-scores look for in a single pass over the
+        pages, holding one page at a time
+        """
+        terms = set(self.tech_keywords) | set(self.sustainability_keywords) | set(self.compliance_keywords)
+        for requirements in self.mandatory_sections.values():
+            for requirement in requirements:
+                terms.update(self._key_terms(requirement))
+        scanner = PageTermScanner(terms)
+        for page_text in pages:
+            scanner.add(page_text)
+        return scanner
+
+    def _scan(self, pdf_path: str, text: Optional[str]) -> PageTermScanner:
+        return self.scan_pages([text] if text is not None else self.iter_page_texts(pdf_path))
+
+    def validate_dpr_with_marks(self, pdf_path: str, text: Optional[str] = None,
+                                scanner: Optional[PageTermScanner] = None) -> Tuple[Dict, float]:
         """
         Validate DPR against mandatory sections and calculate marks
         """
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        if scanner is None:
+            scanner = self._scan(pdf_path, text)
+        if not scanner.characters:
             return {}, 0.0
         
         results = {}
@@ -111,7 +161,7 @@ class DPRScorer:
             
             for requirement in requirements:
                 # Simple keyword matching for now
-                if self._check_requirement_in_text(requirement, text):
+                if self._check_requirement_in_text(requirement, scanner.found):
                     found_requirements += 1
             
             section_score = (found_requirements / len(requirements)) * section_marks
@@ -126,93 +176,80 @@ class DPRScorer:
         
         return results, total_marks
 
-    def _check_requirement_in_text(self, requirement: str, text: str) -> bool:
+    def _check_requirement_in_text(self, requirement: str, found: Set[str]) -> bool:
         """
-        Check if a requirement is mentioned in the text using fuzzy matching
+        Check if a requirement is mentioned, given the terms found in the text
         """
-        # Convert to lowercase for matching
-        text_lower = text.lower()
-        requirement_lower = requirement.lower()
-        
         # Extract key terms from requirement
-        key_terms = requirement_lower.replace("(", "").replace(")", "").split()
+        key_terms = self._key_terms(requirement)
         
         # Check if most key terms are present
-        found_terms = sum(1 for term in key_terms if term in text_lower)
+        found_terms = sum(1 for term in key_terms if term in found)
         return found_terms >= len(key_terms) * 0.6  # 60% of terms should be present
 
-    def get_tech_score(self, pdf_path: str) -> float:
+    def get_tech_score(self, pdf_path: str, text: Optional[str] = None,
+                       scanner: Optional[PageTermScanner] = None) -> float:
         """
         Calculate technical score (simplified version)
         """
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        if scanner is None:
+            scanner = self._scan(pdf_path, text)
+        if not scanner.characters:
             return 0.0
         
-        # Technical keywords to look for
-        tech_keywords = [
-            "technical specification", "design", "engineering", "construction",
-            "materials", "methodology", "standards", "quality", "testing"
-        ]
-        
-        text_lower = text.lower()
-        found_keywords = sum(1 for keyword in tech_keywords if keyword in text_lower)
+        found_keywords = sum(1 for keyword in self.tech_keywords if keyword in scanner)
         
         # Score out of 25 (max technical score)
         return min(25, found_keywords * 3)
 
-    def get_sustainability_score(self, pdf_path: str) -> float:
+    def get_sustainability_score(self, pdf_path: str, text: Optional[str] = None,
+                                 scanner: Optional[PageTermScanner] = None) -> float:
         """
         Calculate sustainability score (simplified version)
         """
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        if scanner is None:
+            scanner = self._scan(pdf_path, text)
+        if not scanner.characters:
             return 0.0
         
-        # Sustainability keywords
-        sustainability_keywords = [
-            "sustainability", "environmental", "maintenance", "operation",
-            "long-term", "lifecycle", "renewable", "green", "eco-friendly"
-        ]
-        
-        text_lower = text.lower()
-        found_keywords = sum(1 for keyword in sustainability_keywords if keyword in text_lower)
+        found_keywords = sum(1 for keyword in self.sustainability_keywords if keyword in scanner)
         
         # Score out of 15 (max sustainability score)
         return min(15, found_keywords * 2)
 
-    def analyze_dpr(self, pdf_path: str) -> Tuple[Dict, float]:
+    def analyze_dpr(self, pdf_path: str, text: Optional[str] = None,
+                    scanner: Optional[PageTermScanner] = None) -> Tuple[Dict, float]:
         """
         Analyze DPR compliance (simplified version)
         """
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
+        if scanner is None:
+            scanner = self._scan(pdf_path, text)
+        if not scanner.characters:
             return {}, 0.0
         
-        # Compliance keywords
-        compliance_keywords = [
-            "compliance", "regulation", "guideline", "standard", "approval",
-            "clearance", "certificate", "authorization", "permission"
-        ]
-        
-        text_lower = text.lower()
-        found_keywords = sum(1 for keyword in compliance_keywords if keyword in text_lower)
+        found_keywords = sum(1 for keyword in self.compliance_keywords if keyword in scanner)
         
         # Score out of 15 (max compliance score)
         compliance_score = min(15, found_keywords * 2)
         
         return {"compliance_indicators": found_keywords}, compliance_score
 
-    def calculate_total_score(self, pdf_path: str) -> Dict:
+    def calculate_total_score(self, pdf_path: str, document: Optional[ExtractedDocument] = None) -> Dict:
         """
         Calculate total DPR score
+        
+        All sub-scores share one pass over the pages of document, or over the
+        PDF's pages streamed one at a time, so the full text is never built.
         """
         try:
+            pages = document.pages if document is not None else self.iter_page_texts(pdf_path)
+            scanner = self.scan_pages(pages)
+            
             # Get individual scores
-            completeness_result, comp_score = self.validate_dpr_with_marks(pdf_path)
-            tech_score = self.get_tech_score(pdf_path)
-            sustain_score = self.get_sustainability_score(pdf_path)
-            compliance_result, compliance_score = self.analyze_dpr(pdf_path)
+            completeness_result, comp_score = self.validate_dpr_with_marks(pdf_path, scanner=scanner)
+            tech_score = self.get_tech_score(pdf_path, scanner=scanner)
+            sustain_score = self.get_sustainability_score(pdf_path, scanner=scanner)
+            compliance_result, compliance_score = self.analyze_dpr(pdf_path, scanner=scanner)
             
             total_score = comp_score + tech_score + sustain_score + compliance_score
             max_total_score = 100  # Assuming max score is 100
@@ -0,0 +1,208 @@
+"""
+Disk-backed Sentence Embedding Cache
+Stores float16 sentence embeddings in a memory-mapped file indexed by SQLite,
+so boilerplate shared across DPRs is only encoded once
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so reflowed copies of a sentence share one entry"""
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """
+    LRU cache of sentence embeddings for one model.
+
+    Vectors live in <cache_dir>/<model>.f16, a memory-mapped float16 array of
+    fixed capacity; <model>.sqlite maps sha256(model, normalized text) to a
+    slot and its last-use time. When the size limit is reached the least
+    recently used slots are overwritten. Hit/miss counters are kept in the
+    index, so they cover every process sharing the cache (e.g. forked
+    scoring workers).
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int, max_bytes: int):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.capacity = max(1, max_bytes // (dimension * 2))
+
+        os.makedirs(cache_dir, exist_ok=True)
+        slug = model_name.replace("/", "__")
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.f16")
+        self.index_path = os.path.join(cache_dir, f"{slug}.sqlite")
+
+        self._pid = None
+        self._conn = None
+        self._vectors = None
+        self._open()
+
+    def _open(self):
+        """(Re)open the index and vector file; connections and locks must not cross fork()"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_used ON entries (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        shape = (self.capacity, self.dimension)
+        stored = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        if stored and (int(stored.get("capacity", 0)), int(stored.get("dimension", 0))) != shape:
+            # Size limit or model changed: start from an empty cache
+            logger.warning(f"⚠️ Embedding cache layout changed for {self.model_name}; clearing it")
+            self._conn.execute("DELETE FROM entries")
+            if os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('capacity', ?), ('dimension', ?)",
+                           (str(self.capacity), str(self.dimension)))
+
+        mode = "r+" if os.path.exists(self.vectors_path) else "w+"
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode=mode, shape=shape)
+
+    def _ensure_open(self):
+        if self._pid != os.getpid():
+            self._open()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _bump(self, name: str, amount: int):
+        if amount:
+            self._conn.execute(
+                "INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    def _lookup_slots(self, keys: List[str]) -> Dict[str, int]:
+        """Map the cached subset of keys to their slots"""
+        slots: Dict[str, int] = {}
+        unique_keys = list(set(keys))
+        for start in range(0, len(unique_keys), 500):  # Stay under SQLite's variable limit
+            batch = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            slots.update(self._conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return slots
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached float32 vector for each text, or None on a miss"""
+        self._ensure_open()
+        with self._lock:
+            keys = [self._key(text) for text in texts]
+
+            # Look up and copy the rows under the write lock: put_many in another
+            # process could otherwise reassign a slot between lookup and read
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = self._lookup_slots(keys)
+                results = [np.asarray(self._vectors[slots[key]], dtype=np.float32) if key in slots else None
+                           for key in keys]
+
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in slots])
+                hits = sum(1 for result in results if result is not None)
+                self._bump("hits", hits)
+                self._bump("misses", len(results) - hits)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store vectors for texts, evicting least recently used entries when full"""
+        self._ensure_open()
+        with self._lock:
+            entries = {self._key(text): vector for text, vector in zip(texts, vectors)}
+            now = time.time()
+            evicted = 0
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._lookup_slots(list(entries))
+                new_keys = [key for key in entries if key not in existing][:self.capacity]
+
+                used = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                free_slots = list(range(used, min(self.capacity, used + len(new_keys))))
+                needed = len(new_keys) - len(free_slots)
+                if needed > 0:
+                    # Reuse the slots of the least recently used entries
+                    victims = self._conn.execute(
+                        "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (needed,)
+                    ).fetchall()
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+                    free_slots.extend(slot for _, slot in victims)
+                    evicted = len(victims)
+
+                for key, slot in zip(new_keys, free_slots):
+                    self._vectors[slot] = entries[key].astype(np.float16)
+                self._vectors.flush()
+                self._conn.executemany("INSERT INTO entries VALUES (?, ?, ?)",
+                                       [(key, slot, now) for key, slot in zip(new_keys, free_slots)])
+                self._bump("evictions", evicted)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, entry count and size of the cache"""
+        self._ensure_open()
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "model": self.model_name,
+            "entries": entries,
+            "capacity": self.capacity,
+            "size_bytes": entries * self.dimension * 2,
+            "max_bytes": self.capacity * self.dimension * 2,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+def embedding_cache_dir() -> str:
+    """Directory for on-disk embeddings (EMBEDDING_CACHE_DIR, default Backend/embedding_cache)"""
+    return os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache"))
+
+def create_embedding_cache(model_name: str, dimension: int) -> Optional[EmbeddingCache]:
+    """
+    Build the cache from EMBEDDING_CACHE_DIR / EMBEDDING_CACHE_MAX_MB;
+    returns None when the cache is disabled (EMBEDDING_CACHE_MAX_MB=0) or unusable
+    """
+    max_mb = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+    if max_mb <= 0:
+        return None
+    cache_dir = embedding_cache_dir()
+    try:
+        cache = EmbeddingCache(cache_dir, model_name, dimension, int(max_mb * 1024 * 1024))
+        logger.info(f"✅ Embedding cache enabled at {cache_dir} ({max_mb:g} MB)")
+        return cache
+    except Exception as e:
+        logger.warning(f"⚠️ Embedding cache disabled: {e}")
+        return None
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Local Embedding Server
+Holds one sentence encoder and serves all API / scoring workers over a Unix
+socket, merging concurrent requests into dynamically sized batches
+"""
+
+import os
+import json
+import time
+import struct
+import signal
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+from encoder_backends import bucketed_encode, create_encoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/dpr-embedding.sock"
+_HEADER = struct.Struct("!I")
+
+def send_message(sock, header: dict, payload: bytes = b""):
+    """Frame: 4-byte length + JSON header, 4-byte length + raw payload"""
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(encoded)) + encoded + _HEADER.pack(len(payload)) + payload)
+
+def _recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock):
+    header = json.loads(_recv_exact(sock, _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0]))
+    payload = _recv_exact(sock, _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0])
+    return header, payload
+
+class _PendingRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.vectors: Optional[np.ndarray] = None
+        self.error: Optional[str] = None
+
+class DynamicBatcher:
+    """
+    Collects texts from concurrent requests and encodes them together.
+
+    A batch is flushed once it holds max_batch_size texts or max_wait_ms has
+    passed since its first request arrived, whichever comes first, so a lone
+    request waits at most max_wait_ms and a burst shares one forward pass.
+    """
+
+    def __init__(self, encoder, max_batch_size: int = 64, max_wait_ms: float = 10.0, token_budget: int = 4096):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.token_budget = token_budget
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.stats = {"requests": 0, "batches": 0, "texts": 0}
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        request = _PendingRequest(texts)
+        with self._condition:
+            self._pending.append(request)
+            self._condition.notify()
+        request.done.wait()
+        if request.error:
+            raise RuntimeError(request.error)
+        return request.vectors
+
+    def _take_batch(self) -> List[_PendingRequest]:
+        with self._condition:
+            while not self._pending and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return []
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(r.texts) for r in self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            # Always take at least one request, even if it alone exceeds the batch size
+            batch = [self._pending.popleft()]
+            size = len(batch[0].texts)
+            while self._pending and size + len(self._pending[0].texts) <= self.max_batch_size:
+                request = self._pending.popleft()
+                batch.append(request)
+                size += len(request.texts)
+            return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = bucketed_encode(self.encoder, texts, self.token_budget, self.max_batch_size)
+                offset = 0
+                for request in batch:
+                    request.vectors = vectors[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"❌ Batch encode failed: {e}")
+                for request in batch:
+                    request.error = str(e)
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["texts"] += len(texts)
+            for request in batch:
+                request.done.set()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except ConnectionError:
+                return
+
+            op = header.get("op")
+            try:
+                if op == "info":
+                    send_message(self.request, {
+                        "name": server.encoder.name,
+                        "model_name": server.encoder.model_name,
+                        "backend": server.encoder.backend,
+                        "dimension": server.encoder.dimension,
+                        "stats": server.batcher.stats
+                    })
+                elif op == "encode":
+                    vectors = server.batcher.encode(header.get("texts", []))
+                    send_message(self.request, {"shape": list(vectors.shape)}, vectors.tobytes())
+                else:
+                    send_message(self.request, {"error": f"Unknown op: {op}"})
+            except Exception as e:
+                send_message(self.request, {"error": str(e)})
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, encoder, batcher: DynamicBatcher):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.encoder = encoder
+        self.batcher = batcher
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+class RemoteEncoder:
+    """
+    Encoder backend that forwards encode() calls to a running embedding
+    server, with the same interface as the local encoders
+    """
+    backend = "remote"
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 300.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        info = self._call({"op": "info"})[0]
+        self.name = info["name"]
+        self.model_name = info["model_name"]
+        self.dimension = info["dimension"]
+        self.server_backend = info["backend"]
+        self.tokenizer = None  # Tokenization happens on the server
+
+    def _connection(self):
+        # One connection per thread and process; sockets must not cross fork()
+        sock = getattr(self._local, "sock", None)
+        if sock is None or getattr(self._local, "pid", None) != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _call(self, header: dict):
+        try:
+            sock = self._connection()
+            send_message(sock, header)
+            response, payload = recv_message(sock)
+        except (OSError, ConnectionError):
+            self._local.sock = None
+            raise
+        if response.get("error"):
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        return response, payload
+
+    def encode(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        response, payload = self._call({"op": "encode", "texts": list(texts)})
+        return np.frombuffer(payload, dtype=np.float32).reshape(response["shape"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--socket", default=os.getenv("DPR_EMBEDDING_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument("--model", default="intfloat/e5-large-v2")
+    parser.add_argument("--backend", default=None, help="torch, onnx or onnx-int8 (default: DPR_ENCODER_BACKEND)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--max-batch-size", type=int, default=int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "64")))
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "10")),
+                        help="Longest a request waits for others to share its batch")
+    parser.add_argument("--token-budget", type=int, default=int(os.getenv("ENCODE_TOKEN_BUDGET", "4096")),
+                        help="Max padded tokens per forward pass")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    encoder = create_encoder(args.model, device=args.device, backend=args.backend)
+    batcher = DynamicBatcher(encoder, args.max_batch_size, args.max_wait_ms, args.token_budget)
+    server = EmbeddingServer(args.socket, encoder, batcher)
+
+    def shutdown(*_):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, shutdown)
+
+    logger.info(f"✅ Serving {encoder.name} on {args.socket} "
+                f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.stop()
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
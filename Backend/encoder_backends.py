@@ -0,0 +1,176 @@
+"""
+Sentence Encoder Backends
+PyTorch fp32, ONNX Runtime and dynamically quantized int8 ONNX encoders
+behind one encode() interface
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoConfig, AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8", "remote")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+
+def default_onnx_dir(model_name: str) -> str:
+    """Where export_onnx_encoder.py writes a model by default"""
+    base_dir = os.getenv("DPR_ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models"))
+    return os.path.join(base_dir, model_name.replace("/", "__"))
+
+class TorchEncoder:
+    """SentenceTransformer in fp32 PyTorch (the reference backend)"""
+    backend = "torch"
+
+    def __init__(self, model_name: str, device: str = "cpu"):
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_name = model_name
+        self.name = model_name
+        self.device = device
+        self.tokenizer = self.model.tokenizer
+        self.max_length = self.model.max_seq_length
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, device=self.device)
+
+class OnnxEncoder:
+    """
+    Transformer exported to ONNX and run with ONNX Runtime on CPU, optionally
+    with int8 dynamically quantized weights. Mean pooling and L2 normalization
+    match the SentenceTransformer pipeline of e5 / MiniLM models.
+    """
+
+    def __init__(self, model_name: str, model_dir: Optional[str] = None, quantized: bool = False,
+                 num_threads: Optional[int] = None, max_length: int = 512):
+        model_dir = model_dir or default_onnx_dir(model_name)
+        model_path = os.path.join(model_dir, ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run export_onnx_encoder.py first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self.dimension = AutoConfig.from_pretrained(model_dir).hidden_size
+        self.backend = "onnx-int8" if quantized else "onnx"
+        self.model_name = model_name
+        self.name = f"{model_name}:{self.backend}"
+
+    def encode(self, texts: List[str], batch_size: int = 16) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="np")
+            feeds = {name: value.astype(np.int64) for name, value in tokens.items() if name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        if not batches:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32)
+
+def token_lengths(tokenizer, texts: List[str], max_length: int) -> List[int]:
+    """Token count of each text (special tokens included, truncated like the encoder)"""
+    return [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]]
+
+def plan_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Group text indices into batches of similar length. Texts are sorted longest
+    first and a batch grows while (batch size x longest text) stays within the
+    token budget, so short sentences get large batches and long ones small batches.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches, current = [], []
+    for i in order:
+        # current[0] is the longest text in the batch
+        if current and (len(current) >= max_batch_size or lengths[current[0]] * (len(current) + 1) > token_budget):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+def padding_efficiency(lengths: List[int], batches: List[List[int]]) -> float:
+    """Share of computed token positions that are real tokens rather than padding"""
+    padded = sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+    return sum(lengths) / padded if padded else 1.0
+
+def bucketed_encode(encoder, texts: List[str], token_budget: int = 4096, max_batch_size: int = 64) -> np.ndarray:
+    """
+    Encode texts in length-bucketed batches under a token budget and return
+    the vectors in the original order. Encoders without a local tokenizer
+    (the embedding server client) are called directly.
+    """
+    tokenizer = getattr(encoder, "tokenizer", None)
+    if tokenizer is None or len(texts) <= 1:
+        return np.asarray(encoder.encode(texts, batch_size=max_batch_size), dtype=np.float32)
+
+    lengths = token_lengths(tokenizer, texts, encoder.max_length)
+    vectors = np.zeros((len(texts), encoder.dimension), dtype=np.float32)
+    for batch in plan_batches(lengths, token_budget, max_batch_size):
+        vectors[batch] = encoder.encode([texts[i] for i in batch], batch_size=len(batch))
+    return vectors
+
+def create_encoder(model_name: str, device: str = "cpu", backend: Optional[str] = None):
+    """
+    Build the sentence encoder selected by DPR_ENCODER_BACKEND
+    (torch, onnx, onnx-int8 or remote). ONNX backends fall back to PyTorch
+    when onnxruntime or the exported model is missing; remote falls back
+    when no embedding server listens on DPR_EMBEDDING_SOCKET.
+    """
+    backend = (backend or os.getenv("DPR_ENCODER_BACKEND", "torch")).lower()
+    if backend not in ENCODER_BACKENDS:
+        logger.warning(f"⚠️ Unknown encoder backend '{backend}', using torch")
+        backend = "torch"
+
+    if backend == "remote":
+        from embedding_server import DEFAULT_SOCKET_PATH, RemoteEncoder
+        socket_path = os.getenv("DPR_EMBEDDING_SOCKET", DEFAULT_SOCKET_PATH)
+        try:
+            encoder = RemoteEncoder(socket_path)
+            logger.info(f"✅ Using embedding server at {socket_path} ({encoder.name})")
+            return encoder
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding server at {socket_path} unavailable, loading {model_name} locally: {e}")
+            backend = "torch"
+
+    if backend != "torch":
+        if not ONNX_AVAILABLE:
+            logger.warning("⚠️ onnxruntime not available, using torch encoder. Install with: pip install onnxruntime")
+        else:
+            try:
+                threads = int(os.getenv("DPR_ONNX_THREADS", "0")) or None
+                encoder = OnnxEncoder(model_name, quantized=(backend == "onnx-int8"), num_threads=threads)
+                logger.info(f"✅ Loaded {encoder.name} encoder")
+                return encoder
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load {backend} encoder for {model_name}, using torch: {e}")
+
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        raise ImportError("sentence-transformers is required for the torch encoder backend")
+    return TorchEncoder(model_name, device=device)
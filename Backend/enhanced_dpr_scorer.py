@@ -6,17 +6,21 @@ Comprehensive version with all advanced NLP capabilities from DPR_score/score.ip
 import os
 import json
 import re
+import hashlib
 import logging
-from typing import Dict, List, Tuple, Any, Optional
-from dataclasses import dataclass
+import threading
+from typing import Dict, Iterable, List, Tuple, Any, Optional, Callable
+from dataclasses import dataclass, field, replace
+from collections import Counter
 from datetime import datetime
 import numpy as np
 
 # Core libraries
-import fitz  # PyMuPDF
 import torch
-from pypdf import PdfReader
-from pypdf.errors import PdfReadError
+
+from pdf_document import ExtractedDocument, extract_document, strip_page_boilerplate
+from encoder_backends import bucketed_encode, create_encoder
+from embedding_cache import create_embedding_cache, embedding_cache_dir, normalize_text
 
 # Advanced NLP libraries
 try:
@@ -35,21 +39,6 @@ except ImportError:
     SEMANTIC_AVAILABLE = False
     print("⚠️ SentenceTransformers not available. Install with: pip install sentence-transformers")
 
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
-    print("⚠️ pdfplumber not available. Install with: pip install pdfplumber")
-
-try:
-    import pytesseract
-    from pdf2image import convert_from_path
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
-    print("⚠️ OCR capabilities not available. Install with: pip install pytesseract pdf2image")
-
 # Google AI for compliance
 try:
     from google import genai
@@ -74,6 +63,129 @@ class ScoringResult:
     confidence: float = 0.0
     method_used: str = "keyword"
 
+class CriteriaMatrix:
+    """
+    Fused similarity engine for every criteria set.
+
+    All reference embeddings (section keypoints, impact examples, NDC
+    keywords, GatiShakti concept) are L2-normalized and stacked into one
+    matrix, with a row map of criteria key -> rows. A chunk of document
+    embeddings is then scored against everything with a single matmul, and
+    per-row / per-criterion maxima are reduced with vectorized ops instead of
+    one cos_sim call and Python loop per criteria set.
+    """
+
+    def __init__(self, embeddings: Dict[str, Any]):
+        self.keys = list(embeddings)
+        self.slices: Dict[str, slice] = {}
+        offset = 0
+        for key in self.keys:
+            self.slices[key] = slice(offset, offset + len(embeddings[key]))
+            offset += len(embeddings[key])
+        
+        self.matrix = torch.nn.functional.normalize(
+            torch.cat([embeddings[key].float() for key in self.keys]), dim=1
+        )
+        self.device = self.matrix.device
+        # Criteria index of every row, for per-criterion reductions
+        self.row_group = torch.cat([
+            torch.full((len(embeddings[key]),), index, dtype=torch.long) for index, key in enumerate(self.keys)
+        ]).to(self.device)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def normalize(self, embeddings) -> Any:
+        """L2-normalize embeddings on the matrix device"""
+        return torch.nn.functional.normalize(embeddings.float().to(self.device), dim=1)
+
+    def similarities(self, chunk_embeddings) -> Any:
+        """(n_rows, n_segments) cosine similarities of every criteria row against a chunk"""
+        return self.matrix @ self.normalize(chunk_embeddings).T
+
+    def group_max(self, row_values) -> Tuple[Any, Any]:
+        """Per-criterion max of row_values and the row that holds it"""
+        group_values = torch.full((len(self.keys),), float("-inf"), device=self.device)
+        group_values = group_values.scatter_reduce(0, self.row_group, row_values, reduce="amax")
+        rows = torch.arange(len(self), device=self.device)
+        # First row of each group reaching the group max
+        candidates = torch.where(row_values == group_values[self.row_group], rows, torch.full_like(rows, len(self)))
+        group_rows = torch.full((len(self.keys),), len(self), dtype=torch.long, device=self.device)
+        group_rows = group_rows.scatter_reduce(0, self.row_group, candidates, reduce="amin")
+        return group_values, group_rows
+
+    def group_columns_max(self, similarities) -> Any:
+        """(n_criteria, n_segments) max similarity of each criteria set against each segment"""
+        index = self.row_group[:, None].expand(-1, similarities.shape[1])
+        group_values = torch.full((len(self.keys), similarities.shape[1]), float("-inf"), device=self.device)
+        return group_values.scatter_reduce(0, index, similarities, reduce="amax")
+
+@dataclass
+class SemanticScan:
+    """
+    Similarity statistics of a whole document against every criteria set,
+    accumulated chunk by chunk so memory does not grow with document length
+    """
+    criteria: CriteriaMatrix
+    row_max: Any  # (n_rows,) best similarity of each criteria row over all segments
+    row_best: Any  # (n_rows,) index of that segment
+    gatishakti_pages: List[int]  # page of every segment above the GatiShakti threshold
+    gatishakti_similarity_sum: float
+    segment_count: int
+    # "document" and "section:<name>" mean embeddings, for the similar project index
+    project_vectors: Dict[str, Any] = field(default_factory=dict)
+    top_segments: Any = None  # (n_rows, k) indices of the k best segments per row, when requested
+    aggregates_model: Optional[str] = None  # Model behind the GatiShakti statistics and project vectors
+
+    def __post_init__(self):
+        self.criterion_max, best_rows = self.criteria.group_max(self.row_max)
+        self.criterion_best = self.row_best[best_rows]
+
+    def max_similarity(self, key: str):
+        """Best similarity of each row of a criteria set"""
+        return self.row_max[self.criteria.slices[key]]
+
+    def best_match(self, key: str) -> Tuple[float, int]:
+        """Best similarity of a criteria set over the document and the segment index"""
+        index = self.criteria.keys.index(key)
+        return self.criterion_max[index].item(), self.criterion_best[index].item()
+
+@dataclass
+class DocumentSegments:
+    """
+    Unique sentence segments of a document with their page numbers and semantic scan.
+    Repeated sentences are encoded once; occurrence_pages keeps every page they appear on.
+    """
+    texts: List[str]
+    pages: List[int]  # Page of the first occurrence
+    occurrence_pages: List[List[int]] = field(default_factory=list)
+    boilerplate_lines_removed: int = 0
+    candidate_pages: Optional[List[int]] = None  # Pages kept by coarse-to-fine retrieval; None when all pages were used
+    scan: Optional[SemanticScan] = None  # None without a semantic model
+    small_scan: Optional[SemanticScan] = None  # Small-model scan of every segment (scoring cascade / reduced tier)
+    tier: str = "full"  # Analysis tier the segments were scanned for: "full", "reduced" or "keyword"
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def occurrence_count(self) -> int:
+        """Segments in the document before de-duplication"""
+        return sum(len(pages) for pages in self.occurrence_pages)
+
+# Segment boundaries: line breaks, or sentence punctuation followed by whitespace
+# (so decimals and abbreviations like "Rs.5.2" stay intact)
+SEGMENT_BOUNDARY = re.compile(r'\n+|(?<=[.!?])\s+')
+
+# Amounts like "Rs. 12,50,000", "₹ 4.5 crore"
+INDIAN_CURRENCY = re.compile(r'(?:rs\.?|₹)\s*[\d,]+(?:\.\d+)?(?:\s*(?:crore|lakh|cr|lac))?')
+
+GATISHAKTI_CONCEPT = "PM GatiShakti National Master Plan multimodal infrastructure integration"
+GATISHAKTI_RELEVANCE_THRESHOLD = 0.3
+
+# Fallback model when e5-large cannot be loaded, and the middle tier of the scoring cascade
+SMALL_MODEL_NAME = 'all-MiniLM-L6-v2'
+
 @dataclass
 class ComprehensiveScore:
     """Comprehensive scoring result"""
@@ -83,6 +195,7 @@ class ComprehensiveScore:
     breakdown: Dict[str, ScoringResult]
     evidence_summary: Dict[str, List[str]]
     processing_info: Dict[str, Any]
+    project_vectors: Optional[Dict[str, Any]] = None
 
 class EnhancedDPRScorer:
     """
@@ -98,6 +211,21 @@ class EnhancedDPRScorer:
         self.semantic_threshold = 0.82
         self.fuzzy_threshold = 75
         self.section_score_threshold = 0.78
+        self.min_segment_chars = 10
+        self.encode_chunk_size = 256  # Segments embedded at a time while scanning a document
+        # Retrieval mode: "full" (every sentence), "coarse_to_fine" (sentences of top pages only),
+        # or "auto" (coarse_to_fine from coarse_min_pages pages)
+        self.retrieval_mode = os.getenv("DPR_RETRIEVAL_MODE", "full").lower()
+        self.coarse_min_pages = int(os.getenv("DPR_COARSE_MIN_PAGES", "200"))
+        self.coarse_top_pages = int(os.getenv("DPR_COARSE_TOP_PAGES", "5"))  # Candidate pages per criterion
+        self.coarse_chunk_chars = 1500  # Page text per coarse embedding (~350 tokens)
+        self.encode_token_budget = int(os.getenv("ENCODE_TOKEN_BUDGET", "4096"))  # Padded tokens per forward pass
+        self.max_encode_batch = 64
+        # Scoring cascade: keyword match, then the small model, and the large model only for
+        # requirements whose small-model similarity falls inside the uncertainty band
+        self.scoring_cascade = os.getenv("DPR_SCORING_CASCADE", "false").lower() == "true"
+        self.cascade_band = (float(os.getenv("DPR_CASCADE_LOW", "0.45")), float(os.getenv("DPR_CASCADE_HIGH", "0.70")))
+        self.cascade_candidates = 8  # Small-model top sentences per criteria row re-scored by the large model
         
         # Initialize models
         self._init_nlp_models()
@@ -226,6 +354,12 @@ class EnhancedDPRScorer:
         # Pre-compute embeddings if semantic model available
         self.section_embeddings_dict = {}
         self.impact_embeddings_dict = {}
+        self.ndc_embeddings = None
+        self.gatishakti_embedding = None
+        self.criteria_matrix = None
+        self.small_criteria_matrix = None
+        self._small_tier_lock = threading.Lock()
+        self._small_tier_attempted = False
         if SEMANTIC_AVAILABLE and hasattr(self, 'semantic_model'):
             self._precompute_embeddings()
 
@@ -243,18 +377,83 @@ class EnhancedDPRScorer:
                 nlp = None
         
         # Load semantic model
+        # (encoder backend chosen by DPR_ENCODER_BACKEND: torch, onnx or onnx-int8)
+        self.semantic_model_name = None
+        self.embedding_cache = None
         if SEMANTIC_AVAILABLE:
             try:
-                self.semantic_model = SentenceTransformer('intfloat/e5-large-v2', device=self.device)
+                self.semantic_model = create_encoder('intfloat/e5-large-v2', device=self.device)
+                self.semantic_model_name = self.semantic_model.name
                 if self.verbose:
                     logger.info("✅ Semantic model loaded successfully")
             except Exception as e:
                 logger.warning(f"⚠️ Failed to load e5-large-v2, falling back to MiniLM: {e}")
                 try:
-                    self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2', device=self.device)
+                    self.semantic_model = create_encoder(SMALL_MODEL_NAME, device=self.device)
+                    self.semantic_model_name = self.semantic_model.name
                 except Exception as e2:
                     logger.error(f"❌ Failed to load any semantic model: {e2}")
                     self.semantic_model = None
+            
+            if self.semantic_model is not None:
+                self.embedding_cache = create_embedding_cache(
+                    self.semantic_model_name, self.semantic_model.dimension
+                )
+        
+        # Small model of the scoring cascade and the reduced analysis tier
+        self.small_model = None
+        self.small_embedding_cache = None
+        if self.scoring_cascade:
+            self._load_small_model()
+
+    def _load_small_model(self) -> bool:
+        """Load all-MiniLM-L6-v2 next to the large model; False when it is unavailable"""
+        if self.small_model is not None:
+            return True
+        if getattr(self, 'semantic_model', None) is None:
+            return False
+        if self.semantic_model.model_name == SMALL_MODEL_NAME:
+            logger.warning("⚠️ The large model fell back to MiniLM; no separate small model is loaded")
+            return False
+        try:
+            # The embedding server holds the large model; the small one runs in-process
+            backend = "torch" if os.getenv("DPR_ENCODER_BACKEND", "torch").lower() == "remote" else None
+            self.small_model = create_encoder(SMALL_MODEL_NAME, device=self.device, backend=backend)
+            self.small_embedding_cache = create_embedding_cache(self.small_model.name, self.small_model.dimension)
+            if self.verbose:
+                logger.info("✅ Small model loaded successfully")
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load small model: {e}")
+            self.small_model = None
+        return self.small_model is not None
+
+    def prepare_reduced_tier(self) -> bool:
+        """
+        Load the small model and its criteria embeddings for the reduced tier.
+        Called lazily by the first reduced-tier job, so servers that never
+        shed load never hold MiniLM.
+        """
+        with self._small_tier_lock:
+            if self.small_criteria_matrix is None and not self._small_tier_attempted:
+                self._small_tier_attempted = True  # A failed load is not retried on every job
+                if self.criteria_matrix is not None and self._load_small_model():
+                    self.small_criteria_matrix = CriteriaMatrix(self._load_criteria_embeddings(self._criteria_texts(), small=True))
+        return self.small_criteria_matrix is not None
+
+    def get_cache_signature(self) -> Dict[str, Any]:
+        """Settings that change scoring output; used to key cached results"""
+        return {
+            "semantic_model": self.semantic_model_name,
+            "semantic_threshold": self.semantic_threshold,
+            "fuzzy_threshold": self.fuzzy_threshold,
+            "section_score_threshold": self.section_score_threshold,
+            "retrieval_mode": self.retrieval_mode,
+            "coarse_top_pages": self.coarse_top_pages,
+            "scoring_cascade": self.small_model.name if self._cascade_enabled() else None,
+            "cascade_band": list(self.cascade_band) if self._cascade_enabled() else None,
+            "nlp_available": NLP_AVAILABLE and nlp is not None,
+            "gemini_available": GEMINI_AVAILABLE and self.gemini_client is not None
+        }
 
     def _init_gemini_client(self, api_key: Optional[str]):
         """Initialize Gemini client for compliance checking"""
@@ -274,86 +473,316 @@ class EnhancedDPRScorer:
         else:
             self.gemini_client = None
 
-    def _precompute_embeddings(self):
-        """Pre-compute embeddings for faster processing"""
-        if not (SEMANTIC_AVAILABLE and hasattr(self, 'semantic_model') and self.semantic_model):
-            return
-            
-        logger.info("Pre-computing embeddings for criteria...")
-        
-        # Section embeddings
+    def _criteria_texts(self) -> Dict[str, List[str]]:
+        """Every fixed reference text compared against documents, by criteria key"""
+        criteria = {}
         for section, keypoints in self.mandatory_sections.items():
             long_keypoints = [kp for kp in keypoints if len(kp.split()) > 4]
             if long_keypoints:
-                self.section_embeddings_dict[section] = self.semantic_model.encode(
-                    long_keypoints, batch_size=self.batch_size, convert_to_tensor=True, device=self.device
-                )
-        
-        # Impact criteria embeddings
+                criteria[f"section:{section}"] = long_keypoints
         for criterion, examples in self.impact_criteria_semantics.items():
-            self.impact_embeddings_dict[criterion] = self.semantic_model.encode(
-                examples, batch_size=self.batch_size, convert_to_tensor=True, device=self.device
-            )
+            criteria[f"impact:{criterion}"] = examples
+        criteria["ndc"] = self.ndc_keywords
+        criteria["gatishakti"] = [GATISHAKTI_CONCEPT]
+        return criteria
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def _criteria_embeddings_path(self, criteria: Dict[str, List[str]], model_name: str) -> str:
+        """File for persisted criteria embeddings; the name changes with the model or texts"""
+        digest = hashlib.sha256(
+            json.dumps({"model": model_name, "criteria": criteria}, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        slug = (model_name or "model").replace("/", "__")
+        return os.path.join(embedding_cache_dir(), f"criteria_{slug}_{digest}.npz")
+
+    def _precompute_embeddings(self):
         """
-        Advanced text extraction with multiple fallback methods
+        Pre-compute embeddings for faster processing.
+        The stacked matrix is persisted, so restarted workers load it instead of running the model.
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        if not (SEMANTIC_AVAILABLE and hasattr(self, 'semantic_model') and self.semantic_model):
+            return
         
-        text = ""
+        criteria = self._criteria_texts()
+        embeddings = self._load_criteria_embeddings(criteria, small=False)
         
-        # Method 1: pdfplumber (best for structured text)
-        if PDFPLUMBER_AVAILABLE:
+        self.section_embeddings_dict = {key.split(":", 1)[1]: emb for key, emb in embeddings.items() if key.startswith("section:")}
+        self.impact_embeddings_dict = {key.split(":", 1)[1]: emb for key, emb in embeddings.items() if key.startswith("impact:")}
+        self.ndc_embeddings = embeddings["ndc"]
+        self.gatishakti_embedding = embeddings["gatishakti"]
+        self.criteria_matrix = CriteriaMatrix(embeddings)
+        
+        # Same criteria rows for the cascade small model
+        if self.small_model is not None:
+            self.small_criteria_matrix = CriteriaMatrix(self._load_criteria_embeddings(criteria, small=True))
+
+    def _load_criteria_embeddings(self, criteria: Dict[str, List[str]], small: bool = False) -> Dict[str, Any]:
+        """Criteria embeddings of the large (or cascade small) model by criteria key, from disk or the model"""
+        keys = list(criteria)
+        model_name = self.small_model.name if small else self.semantic_model_name
+        path = self._criteria_embeddings_path(criteria, model_name)
+        matrix = None
+        
+        if os.path.exists(path):
             try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                if text.strip():
-                    if self.verbose:
-                        logger.info(f"✅ Text extracted using pdfplumber: {len(text)} chars")
-                    return text
+                with np.load(path) as stored:
+                    if list(stored["keys"]) == keys:
+                        matrix = stored["matrix"]
+                        if self.verbose:
+                            logger.info(f"✅ Loaded criteria embeddings from {path}")
             except Exception as e:
-                logger.warning(f"⚠️ pdfplumber failed: {e}")
+                logger.warning(f"⚠️ Could not load criteria embeddings from {path}: {e}")
         
-        # Method 2: PyMuPDF (good fallback)
-        try:
-            with fitz.open(pdf_path) as doc:
-                for page in doc:
-                    page_text = page.get_text("text")
-                    if not page_text.strip() and OCR_AVAILABLE:
-                        # OCR fallback for image-based pages
-                        img = page.get_pixmap()
-                        from PIL import Image
-                        import io
-                        image = Image.open(io.BytesIO(img.tobytes("png")))
-                        page_text = pytesseract.image_to_string(image)
-                    text += page_text + "\n"
-            if text.strip():
-                if self.verbose:
-                    logger.info(f"✅ Text extracted using PyMuPDF: {len(text)} chars")
-                return text
-        except Exception as e:
-            logger.warning(f"⚠️ PyMuPDF failed: {e}")
+        if matrix is None:
+            logger.info(f"Pre-computing embeddings for criteria ({model_name})...")
+            matrix = self._encode([text for key in keys for text in criteria[key]], small=small).cpu().numpy()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, keys=np.array(keys), matrix=matrix)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not persist criteria embeddings: {e}")
         
-        # Method 3: pypdf (last resort)
-        try:
-            reader = PdfReader(pdf_path)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            if text.strip():
-                if self.verbose:
-                    logger.info(f"✅ Text extracted using pypdf: {len(text)} chars")
-                return text
-        except Exception as e:
-            logger.error(f"❌ All text extraction methods failed: {e}")
+        embeddings = {}
+        offset = 0
+        for key in keys:
+            count = len(criteria[key])
+            embeddings[key] = torch.from_numpy(matrix[offset:offset + count].astype(np.float32)).to(self.device)
+            offset += count
+        return embeddings
+
+    def _encode(self, texts: List[str], small: bool = False):
+        """
+        Single entry point to the semantic models; returns an embedding tensor.
+        Sentences already in the embedding cache are not re-encoded.
+        small selects the cascade small model instead of the large one.
+        """
+        model, cache = (self.small_model, self.small_embedding_cache) if small else (self.semantic_model, self.embedding_cache)
+        if cache is None:
+            encoded = self._encode_uncached(texts, model)
+            return torch.from_numpy(encoded).to(self.device)
         
-        return text
+        texts = [normalize_text(text) for text in texts]
+        vectors = cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self._encode_uncached(missing_texts, model)
+            cache.put_many(missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return torch.from_numpy(np.stack(vectors).astype(np.float32)).to(self.device)
+
+    def _encode_uncached(self, texts: List[str], model=None) -> np.ndarray:
+        """Run the model on length-bucketed batches (less padding than fixed batch_size)"""
+        return bucketed_encode(model or self.semantic_model, texts, self.encode_token_budget, self.max_encode_batch)
+
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics of the sentence embedding cache"""
+        if getattr(self, 'embedding_cache', None) is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.embedding_cache.stats()}
 
-    def validate_dpr_completeness(self, text: str) -> Tuple[Dict, float]:
+    def segment_document(self, pages: List[str], tier: str = "full") -> DocumentSegments:
+        """
+        Split pages into sentence segments shared by every semantic check and
+        scan all of them against the criteria embeddings.
+        
+        Running headers/footers and page-number lines are stripped first, and
+        repeated sentences are kept once with all their pages, so each distinct
+        sentence goes through the encoder a single time. In coarse-to-fine mode
+        only sentences of the candidate pages are segmented, and the document
+        gets no project vectors and no semantic GatiShakti statistics.
+        
+        The "reduced" tier scans with the small model only (keyword tier when
+        it is not loaded); the "keyword" tier runs no model at all.
+        """
+        pages, removed_lines = strip_page_boilerplate(pages)
+        semantic = SEMANTIC_AVAILABLE and getattr(self, 'semantic_model', None) is not None
+        if tier == "reduced" and not self.prepare_reduced_tier():
+            tier = "keyword"
+        
+        candidate_pages = None
+        if semantic and tier == "full" and self._use_coarse_retrieval(len(pages)):
+            candidate_pages = self._select_candidate_pages(pages)
+        
+        occurrences: Dict[str, List[int]] = {}
+        for page_number, page_text in enumerate(pages, start=1):
+            if candidate_pages is not None and page_number not in candidate_pages:
+                continue
+            for piece in SEGMENT_BOUNDARY.split(page_text or ""):
+                piece = normalize_text(piece)
+                if len(piece) > self.min_segment_chars:
+                    occurrences.setdefault(piece, []).append(page_number)
+        
+        texts = list(occurrences)
+        occurrence_pages = list(occurrences.values())
+        segments = DocumentSegments(texts, [found_on[0] for found_on in occurrence_pages],
+                                    occurrence_pages, removed_lines,
+                                    sorted(candidate_pages) if candidate_pages is not None else None, tier=tier)
+        if not (semantic and texts) or tier == "keyword":
+            return segments
+        if tier == "reduced":
+            segments.small_scan = self._scan_segments(segments, small=True)
+        elif self._cascade_enabled():
+            self._cascade_scan(segments)
+        else:
+            segments.scan = self._scan_segments(segments)
+        if candidate_pages is not None:
+            # The sentence scan saw only the candidate pages; keep the partial document out of the project index
+            segments.scan = replace(segments.scan, project_vectors={})
+        return segments
+
+    def _cascade_enabled(self) -> bool:
+        return self.scoring_cascade and getattr(self, 'small_criteria_matrix', None) is not None
+
+    @property
+    def project_vector_model(self) -> Optional[str]:
+        """Model whose embedding space the project vectors are in (the small model under the cascade)"""
+        return self.small_model.name if self._cascade_enabled() else self.semantic_model_name
+
+    def _cascade_scan(self, segments: DocumentSegments):
+        """
+        Scoring cascade: scan every segment with the small model, then re-score
+        with the large model only the small model's cascade_candidates best
+        segments of each row that still needs it - requirement rows inside the
+        uncertainty band, plus the impact and NDC rows whose thresholds are
+        calibrated on the large model.
+
+        GatiShakti is judged on whole-document aggregates (relevant sentences
+        and the average similarity), which a candidate subset cannot provide,
+        so they and the project vectors all come from the small model's pass
+        over every segment, as when e5-large is unavailable.
+        """
+        small_scan = self._scan_segments(segments, small=True, top_k=self.cascade_candidates)
+        segments.small_scan = small_scan
+        
+        low, high = self.cascade_band
+        criteria = self.small_criteria_matrix
+        rescore = torch.ones(len(criteria), dtype=torch.bool, device=criteria.device)
+        for key in criteria.keys:
+            if key.startswith("section:"):
+                rows = criteria.slices[key]
+                rescore[rows] = (small_scan.row_max[rows] >= low) & (small_scan.row_max[rows] < high)
+        rescore[criteria.slices["gatishakti"]] = False
+        candidates = sorted(set(small_scan.top_segments[rescore].flatten().tolist()))
+        
+        subset = DocumentSegments([segments.texts[i] for i in candidates], [segments.pages[i] for i in candidates],
+                                  [segments.occurrence_pages[i] for i in candidates])
+        scan = self._scan_segments(subset)
+        # Map segment indices of the subset back to the whole document
+        subset_index = torch.tensor(candidates, dtype=torch.long, device=scan.row_best.device)
+        segments.scan = replace(scan, row_best=subset_index[scan.row_best],
+                                gatishakti_pages=small_scan.gatishakti_pages,
+                                gatishakti_similarity_sum=small_scan.gatishakti_similarity_sum,
+                                segment_count=small_scan.segment_count,
+                                project_vectors=small_scan.project_vectors,
+                                aggregates_model=small_scan.aggregates_model)
+
+    def _use_coarse_retrieval(self, page_count: int) -> bool:
+        if self.retrieval_mode == "coarse_to_fine":
+            return True
+        return self.retrieval_mode == "auto" and page_count >= self.coarse_min_pages
+
+    def _select_candidate_pages(self, pages: List[str]) -> set:
+        """
+        Coarse stage: embed each page in coarse_chunk_chars pieces, score every
+        criteria set against each page, and keep the coarse_top_pages best pages
+        per criterion for sentence-level matching
+        """
+        chunks, chunk_pages = [], []
+        for page_number, page_text in enumerate(pages, start=1):
+            page_text = normalize_text(page_text or "")
+            for start in range(0, len(page_text), self.coarse_chunk_chars):
+                piece = page_text[start:start + self.coarse_chunk_chars]
+                if len(piece) > self.min_segment_chars:
+                    chunks.append(piece)
+                    chunk_pages.append(page_number)
+        if not chunks:
+            return set()
+        
+        criteria = self.criteria_matrix
+        page_scores = torch.full((len(criteria.keys), len(pages) + 1), float("-inf"), device=criteria.device)
+        for start in range(0, len(chunks), self.encode_chunk_size):
+            similarities = criteria.similarities(self._encode(chunks[start:start + self.encode_chunk_size]))
+            chunk_scores = criteria.group_columns_max(similarities)
+            page_index = torch.tensor(chunk_pages[start:start + self.encode_chunk_size], device=criteria.device)
+            page_scores = page_scores.scatter_reduce(
+                1, page_index[None, :].expand(len(criteria.keys), -1), chunk_scores, reduce="amax"
+            )
+        
+        top_k = min(self.coarse_top_pages, len(pages))
+        top_pages = page_scores[:, 1:].topk(top_k, dim=1).indices + 1
+        has_text = page_scores.max(dim=0)[0] > float("-inf")
+        return {page for page in top_pages.flatten().tolist() if has_text[page]}
+
+    def _scan_segments(self, segments: DocumentSegments, small: bool = False, top_k: int = 0) -> SemanticScan:
+        """
+        Encode the document in chunks of encode_chunk_size segments, keeping a
+        running max (and its segment) per criteria embedding. Only one chunk of
+        embeddings is held at a time. With top_k, the top_k best segments of
+        every row are kept as well.
+        """
+        criteria = self.small_criteria_matrix if small else self.criteria_matrix
+        row_max = torch.full((len(criteria),), -1.0, device=criteria.device)
+        row_best = torch.zeros(len(criteria), dtype=torch.long, device=criteria.device)
+        top_values = torch.empty((len(criteria), 0), device=criteria.device)
+        top_segments = torch.empty((len(criteria), 0), dtype=torch.long, device=criteria.device)
+        gatishakti_row = criteria.slices["gatishakti"].start
+        gatishakti_pages = []
+        gatishakti_similarity_sum = 0.0
+        section_keys = [key for key in criteria.keys if key.startswith("section:")]
+        document_sum = torch.zeros(criteria.matrix.shape[1], device=criteria.device)
+        section_sums = torch.zeros((len(section_keys), criteria.matrix.shape[1]), device=criteria.device)
+        
+        for start in range(0, len(segments), self.encode_chunk_size):
+            chunk_embeddings = criteria.normalize(self._encode(segments.texts[start:start + self.encode_chunk_size], small=small))
+            # Weight each unique segment by how often it occurs, so averages match the full document
+            weights = torch.tensor([len(pages) for pages in segments.occurrence_pages[start:start + len(chunk_embeddings)]],
+                                   dtype=torch.float32, device=criteria.device)
+            similarities = criteria.similarities(chunk_embeddings)
+            chunk_max, chunk_best = similarities.max(dim=1)
+            improved = chunk_max > row_max
+            row_max = torch.where(improved, chunk_max, row_max)
+            row_best = torch.where(improved, chunk_best + start, row_best)
+            if top_k:
+                values = torch.cat([top_values, similarities], dim=1)
+                indices = torch.cat([top_segments, (torch.arange(similarities.shape[1], device=criteria.device) + start)
+                                     .expand(len(criteria), -1)], dim=1)
+                kept = values.topk(min(top_k, values.shape[1]), dim=1).indices
+                top_values, top_segments = values.gather(1, kept), indices.gather(1, kept)
+            
+            gatishakti = similarities[gatishakti_row]
+            gatishakti_similarity_sum += (gatishakti * weights).sum().item()
+            relevant = torch.nonzero(gatishakti > GATISHAKTI_RELEVANCE_THRESHOLD).flatten().tolist()
+            for i in relevant:
+                gatishakti_pages.extend(segments.occurrence_pages[start + i])
+            
+            # Document vector: mean of all segments; section vector: mean of segments matching the section
+            weighted_embeddings = chunk_embeddings * weights[:, None]
+            document_sum += weighted_embeddings.sum(dim=0)
+            for i, key in enumerate(section_keys):
+                matches = similarities[criteria.slices[key]].max(dim=0)[0] > self.section_score_threshold
+                section_sums[i] += weighted_embeddings[matches].sum(dim=0)
+        
+        project_vectors = {"document": document_sum.cpu().numpy()}
+        for i, key in enumerate(section_keys):
+            if section_sums[i].abs().sum() > 0:
+                project_vectors[key] = section_sums[i].cpu().numpy()
+        
+        return SemanticScan(criteria, row_max, row_best, gatishakti_pages,
+                            gatishakti_similarity_sum, segments.occurrence_count, project_vectors,
+                            top_segments if top_k else None,
+                            self.small_model.name if small else self.semantic_model_name)
+
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """
+        Advanced text extraction with multiple fallback methods
+        """
+        return extract_document(pdf_path, verbose=self.verbose).text
+
+    def validate_dpr_completeness(self, text: str, segments: Optional[DocumentSegments] = None) -> Tuple[Dict, float]:
         """
         Advanced DPR completeness validation using semantic matching
         """
@@ -364,71 +793,77 @@ class EnhancedDPRScorer:
         total_marks = 0
         max_marks = sum(self.marks_distribution.values())
         
-        sentences = [s.strip() for s in text.split('\n') if len(s.strip()) > 5]
+        if segments is None:
+            segments = self.segment_document([text])
         
-        if SEMANTIC_AVAILABLE and self.semantic_model and sentences:
-            # Semantic approach
-            sentence_embeddings = self.semantic_model.encode(
-                sentences[:100], batch_size=self.batch_size, convert_to_tensor=True, device=self.device
-            )
+        for section, requirements in self.mandatory_sections.items():
+            section_marks = self.marks_distribution.get(section, 0)
+            scanned = segments.scan is not None or segments.small_scan is not None
+            requirement_rows = self._requirement_rows(section) if scanned else {}
             
-            for section, requirements in self.mandatory_sections.items():
-                section_marks = self.marks_distribution.get(section, 0)
-                found_requirements = 0
-                
-                if section in self.section_embeddings_dict and len(self.section_embeddings_dict[section]) > 0:
-                    # Use semantic similarity
-                    similarities = util.cos_sim(self.section_embeddings_dict[section], sentence_embeddings)
-                    max_similarities = similarities.max(dim=1)[0]
-                    
-                    for i, req in enumerate(requirements):
-                        if i < len(max_similarities) and max_similarities[i] > self.semantic_threshold:
-                            found_requirements += 1
-                        elif self._check_requirement_in_text_advanced(req, text):
-                            found_requirements += 1
-                else:
-                    # Fallback to keyword matching
-                    for requirement in requirements:
-                        if self._check_requirement_in_text_advanced(requirement, text):
-                            found_requirements += 1
-                
-                section_score = (found_requirements / len(requirements)) * section_marks
-                total_marks += section_score
-                
-                results[section] = {
-                    "found": found_requirements,
-                    "total": len(requirements),
-                    "score": section_score,
-                    "max_score": section_marks,
-                    "method": "semantic" if section in self.section_embeddings_dict else "keyword"
-                }
-        else:
-            # Fallback to keyword matching
-            for section, requirements in self.mandatory_sections.items():
-                section_marks = self.marks_distribution.get(section, 0)
-                found_requirements = 0
-                
-                for requirement in requirements:
-                    if self._check_requirement_in_text_advanced(requirement, text):
-                        found_requirements += 1
-                
-                section_score = (found_requirements / len(requirements)) * section_marks
-                total_marks += section_score
-                
-                results[section] = {
-                    "found": found_requirements,
-                    "total": len(requirements),
-                    "score": section_score,
-                    "max_score": section_marks,
-                    "method": "keyword"
-                }
+            decisions = []
+            for i, requirement in enumerate(requirements):
+                found, tier, similarity = self._resolve_requirement(requirement, text, requirement_rows.get(i), segments)
+                decision = {"requirement": requirement, "found": found, "tier": tier}
+                if similarity is not None:
+                    decision["similarity"] = round(similarity, 3)
+                decisions.append(decision)
+            found_requirements = sum(1 for decision in decisions if decision["found"])
+            
+            section_score = (found_requirements / len(requirements)) * section_marks
+            total_marks += section_score
+            
+            results[section] = {
+                "found": found_requirements,
+                "total": len(requirements),
+                "score": section_score,
+                "max_score": section_marks,
+                "method": "semantic" if requirement_rows else "keyword",
+                "requirements": decisions
+            }
         
         # Check for Non-Duplication Certificate
-        ndc_score = self._check_non_duplication_certificate(text)
+        ndc_score = self._check_non_duplication_certificate(text, segments)
         total_marks += ndc_score
         
         return results, total_marks
 
+    def _requirement_rows(self, section: str) -> Dict[int, int]:
+        """Criteria matrix row of each requirement of a section that is matched semantically (more than 4 words)"""
+        key = f"section:{section}"
+        if self.criteria_matrix is None or key not in self.criteria_matrix.slices:
+            return {}
+        first_row = self.criteria_matrix.slices[key].start
+        semantic = [i for i, requirement in enumerate(self.mandatory_sections[section]) if len(requirement.split()) > 4]
+        return {i: first_row + n for n, i in enumerate(semantic)}
+
+    def _resolve_requirement(self, requirement: str, text: str, row: Optional[int],
+                             segments: DocumentSegments) -> Tuple[bool, str, Optional[float]]:
+        """
+        Decide whether a requirement is present, cheapest tier first:
+        keyword (exact / key-term match), small model outside the cascade
+        uncertainty band, then the large model. Without a large-model scan
+        (reduced analysis tier) the small model decides at the band midpoint.
+        Returns (found, tier, similarity).
+        """
+        if self._check_requirement_in_text_advanced(requirement, text):
+            return True, "keyword", None
+        if row is None:
+            return False, "keyword", None
+        
+        if segments.small_scan is not None:
+            low, high = self.cascade_band
+            small_similarity = segments.small_scan.row_max[row].item()
+            if small_similarity >= high:
+                return True, "small_model", small_similarity
+            if small_similarity < low:
+                return False, "small_model", small_similarity
+            if segments.scan is None:
+                return small_similarity >= (low + high) / 2, "small_model", small_similarity
+        
+        similarity = segments.scan.row_max[row].item()
+        return similarity > self.semantic_threshold, "large_model", similarity
+
     def _check_requirement_in_text_advanced(self, requirement: str, text: str) -> bool:
         """
         Advanced requirement checking with fuzzy matching
@@ -450,7 +885,7 @@ class EnhancedDPRScorer:
         # Require 60% of key terms to be present
         return found_terms >= len(key_terms) * 0.6
 
-    def _check_non_duplication_certificate(self, text: str) -> float:
+    def _check_non_duplication_certificate(self, text: str, segments: Optional[DocumentSegments] = None) -> float:
         """
         Check for Non-Duplication Certificate evidence
         """
@@ -458,15 +893,12 @@ class EnhancedDPRScorer:
             return 0.0
         
         text_lower = text.lower()
-        sentences = [s.strip() for s in text.split("\n") if len(s.strip()) > 20]
+        if segments is None:
+            segments = self.segment_document([text])
         
-        if SEMANTIC_AVAILABLE and self.semantic_model and sentences:
+        if segments.scan is not None:
             # Semantic approach
-            ndc_embeddings = self.semantic_model.encode(self.ndc_keywords, convert_to_tensor=True)
-            sentence_embeddings = self.semantic_model.encode(sentences[:50], convert_to_tensor=True)
-            
-            similarities = util.cos_sim(ndc_embeddings, sentence_embeddings)
-            max_similarity = similarities.max().item()
+            max_similarity, _ = segments.scan.best_match("ndc")
             
             if max_similarity > 0.75:
                 return 5  # NDC marks from notebook
@@ -478,9 +910,12 @@ class EnhancedDPRScorer:
         
         return 0
 
-    def get_technical_quality_score(self, text: str) -> ScoringResult:
+    def get_technical_quality_score(self, text: str, pages: Optional[Iterable[str]] = None) -> ScoringResult:
         """
         Advanced technical quality scoring with NLP
+        
+        Pass the document's pages to run spaCy one page at a time instead of
+        on a single Doc of the whole text.
         """
         evidence = []
         score = 0
@@ -490,33 +925,19 @@ class EnhancedDPRScorer:
             return ScoringResult(0, max_score, 0, ["No text provided"], method_used="none")
         
         if NLP_AVAILABLE and nlp:
-            # Use spaCy for NLP analysis
-            doc = nlp(text[:1000000])  # Limit text length
-            
-            # Extract entities
-            money_entities = [ent.text for ent in doc.ents if ent.label_ == 'MONEY']
-            orgs = [ent.text for ent in doc.ents if ent.label_ == 'ORG']
-            
-            # Find technical and cost sentences
-            tech_sentences = []
-            cost_sentences = []
-            
-            for sent in doc.sents:
-                sent_lower = sent.text.lower()
-                if any(word in sent_lower for word in ['specification', 'design', 'technical', 'engineering', 'construction']):
-                    tech_sentences.append(sent.text)
-                if any(word in sent_lower for word in ['cost', 'budget', 'estimate', 'expenditure']):
-                    cost_sentences.append(sent.text)
-            
-            # Indian currency pattern matching
-            indian_currency = re.findall(r'(?:rs\.?|₹)\s*[\d,]+(?:\.\d+)?(?:\s*(?:crore|lakh|cr|lac))?', text.lower())
+            counts = self._count_technical_entities(pages if pages is not None else [text])
+            money_entities = counts["money_entities"]
+            orgs = counts["orgs"]
+            tech_sentences = counts["tech_sentences"]
+            cost_sentences = counts["cost_sentences"]
+            indian_currency = counts["indian_currency"]
             
             # Scoring logic from notebook
-            total_financial = len(money_entities) + len(indian_currency)
+            total_financial = money_entities + indian_currency
             
             if total_financial >= 15:
                 score += 4
-                evidence.append(f"Excellent financial data - {len(money_entities)} money entities, {len(indian_currency)} Indian currency")
+                evidence.append(f"Excellent financial data - {money_entities} money entities, {indian_currency} Indian currency")
             elif total_financial >= 8:
                 score += 3
                 evidence.append(f"Good financial data - {total_financial} financial figures")
@@ -527,26 +948,26 @@ class EnhancedDPRScorer:
                 score += 1
             
             # Cost analysis scoring
-            if len(cost_sentences) >= 5:
+            if cost_sentences >= 5:
                 score += 3
-                evidence.append(f"Detailed cost analysis - {len(cost_sentences)} cost-related sentences")
-            elif len(cost_sentences) >= 3:
+                evidence.append(f"Detailed cost analysis - {cost_sentences} cost-related sentences")
+            elif cost_sentences >= 3:
                 score += 2
-                evidence.append(f"Good cost analysis - {len(cost_sentences)} sentences")
-            elif len(cost_sentences) >= 1:
+                evidence.append(f"Good cost analysis - {cost_sentences} sentences")
+            elif cost_sentences >= 1:
                 score += 1
             
             # Technical content scoring
-            if len(tech_sentences) >= 5:
+            if tech_sentences >= 5:
                 score += 2
-                evidence.append(f"Strong technical content - {len(tech_sentences)} technical sentences")
-            elif len(tech_sentences) >= 2:
+                evidence.append(f"Strong technical content - {tech_sentences} technical sentences")
+            elif tech_sentences >= 2:
                 score += 1
             
             # Organizations mentioned
-            if len(set(orgs)) >= 3:
+            if len(orgs) >= 3:
                 score += 1
-                evidence.append(f"Multiple organizations identified: {len(set(orgs))}")
+                evidence.append(f"Multiple organizations identified: {len(orgs)}")
             
             score = min(score, max_score)
             method = "spacy_nlp"
@@ -560,6 +981,40 @@ class EnhancedDPRScorer:
         percentage = (score / max_score) * 100
         return ScoringResult(score, max_score, percentage, evidence, method_used=method)
 
+    def _count_technical_entities(self, pages: Iterable[str], max_chars: int = 1000000) -> Dict[str, Any]:
+        """
+        Money entities, distinct organizations and technical / cost sentences
+        over the first max_chars characters, and Indian currency amounts over
+        all pages. Pages go through spaCy one at a time and only counts are
+        kept, so memory does not grow with the document.
+        """
+        counts = {"money_entities": 0, "orgs": set(), "tech_sentences": 0, "cost_sentences": 0, "indian_currency": 0}
+        
+        def nlp_pages():
+            remaining = max_chars
+            for page_text in pages:
+                page_text = page_text or ""
+                counts["indian_currency"] += len(INDIAN_CURRENCY.findall(page_text.lower()))
+                if remaining > 0 and page_text:
+                    yield page_text[:remaining]
+                    remaining -= len(page_text)
+        
+        for doc in nlp.pipe(nlp_pages(), batch_size=8):
+            for ent in doc.ents:
+                if ent.label_ == 'MONEY':
+                    counts["money_entities"] += 1
+                elif ent.label_ == 'ORG':
+                    counts["orgs"].add(ent.text)
+            
+            # Find technical and cost sentences
+            for sent in doc.sents:
+                sent_lower = sent.text.lower()
+                if any(word in sent_lower for word in ['specification', 'design', 'technical', 'engineering', 'construction']):
+                    counts["tech_sentences"] += 1
+                if any(word in sent_lower for word in ['cost', 'budget', 'estimate', 'expenditure']):
+                    counts["cost_sentences"] += 1
+        return counts
+
     def _fallback_technical_score(self, text: str) -> float:
         """Fallback technical scoring"""
         text_lower = text.lower()
@@ -573,7 +1028,7 @@ class EnhancedDPRScorer:
         found_keywords = sum(1 for keyword in tech_keywords if keyword in text_lower)
         return min(25, found_keywords * 3)
 
-    def get_gatishakti_score(self, text: str) -> ScoringResult:
+    def get_gatishakti_score(self, text: str, segments: Optional[DocumentSegments] = None) -> ScoringResult:
         """
         GatiShakti alignment scoring with semantic analysis
         """
@@ -586,33 +1041,31 @@ class EnhancedDPRScorer:
         
         text_lower = text.lower()
         gatishakti_mentioned = bool(re.search(r'gati\s*shakti', text_lower))
+        coarse = segments is not None and segments.candidate_pages is not None
         
-        if SEMANTIC_AVAILABLE and self.semantic_model:
+        if SEMANTIC_AVAILABLE and self.semantic_model and not coarse and (segments is None or segments.tier == "full"):
             # Semantic analysis approach
-            gatishakti_concept = "PM GatiShakti National Master Plan multimodal infrastructure integration"
-            sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 20][:100]
+            if segments is None:
+                segments = self.segment_document([text])
             
-            if sentences:
+            if segments.scan is not None:
                 try:
-                    concept_embedding = self.semantic_model.encode([gatishakti_concept])
-                    sentence_embeddings = self.semantic_model.encode(sentences)
-                    
-                    # Calculate cosine similarities
-                    similarities = util.cos_sim(concept_embedding, sentence_embeddings)[0]
-                    high_similarity = [s for s, sim in zip(sentences, similarities) if sim > 0.3]
-                    avg_similarity = similarities.mean().item()
+                    scan = segments.scan
+                    relevant_pages = scan.gatishakti_pages
+                    avg_similarity = scan.gatishakti_similarity_sum / scan.segment_count
                     
                     # Scoring based on semantic understanding
                     if gatishakti_mentioned:
                         score = 5
                         evidence.append("GatiShakti explicitly mentioned")
-                    elif len(high_similarity) >= 5 or avg_similarity > 0.25:
+                    elif len(relevant_pages) >= 5 or avg_similarity > 0.25:
                         score = 4
-                        evidence.append(f"Strong alignment - {len(high_similarity)} relevant sentences (similarity: {avg_similarity:.2f})")
-                    elif len(high_similarity) >= 2 or avg_similarity > 0.20:
+                        evidence.append(f"Strong alignment - {len(relevant_pages)} relevant sentences "
+                                        f"on pages {sorted(set(relevant_pages))} (similarity: {avg_similarity:.2f})")
+                    elif len(relevant_pages) >= 2 or avg_similarity > 0.20:
                         score = 3
                         evidence.append("Good alignment - integration concepts present")
-                    elif len(high_similarity) >= 1 or avg_similarity > 0.15:
+                    elif len(relevant_pages) >= 1 or avg_similarity > 0.15:
                         score = 2
                         evidence.append("Moderate alignment with GatiShakti principles")
                     else:
@@ -630,6 +1083,16 @@ class EnhancedDPRScorer:
                 score = 0
                 evidence = ["No meaningful sentences found"]
                 method = "no_content"
+        elif coarse:
+            # Coarse-to-fine scans sentences of the candidate pages only, which cannot give the
+            # whole-document statistics above; judge the text itself, the same in every mode
+            if gatishakti_mentioned:
+                score = 5
+                evidence.append("GatiShakti explicitly mentioned")
+            else:
+                score = self._fallback_gatishakti_score(text_lower)
+                evidence.append(f"Keyword-based scoring (coarse-to-fine retrieval): {score}/{max_score}")
+            method = "keyword_coarse_to_fine"
         else:
             # Fallback approach
             score = self._fallback_gatishakti_score(text_lower)
@@ -654,7 +1117,7 @@ class EnhancedDPRScorer:
         else:
             return 0
 
-    def get_impact_sustainability_score(self, text: str) -> ScoringResult:
+    def get_impact_sustainability_score(self, text: str, segments: Optional[DocumentSegments] = None) -> ScoringResult:
         """
         Advanced Impact & Sustainability scoring
         """
@@ -672,33 +1135,29 @@ class EnhancedDPRScorer:
             "Output-outcome framework with KPIs": 5,
         }
         
-        if SEMANTIC_AVAILABLE and self.semantic_model:
-            sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 20][:100]
+        if SEMANTIC_AVAILABLE and self.semantic_model and (segments is None or segments.tier == "full"):
+            if segments is None:
+                segments = self.segment_document([text])
             
-            if sentences:
-                sentence_embeddings = self.semantic_model.encode(sentences, convert_to_tensor=True)
-                
+            if segments.scan is not None:
                 for criterion, weight in score_weights.items():
                     if criterion in self.impact_embeddings_dict:
                         # Semantic matching
-                        similarities = util.cos_sim(
-                            self.impact_embeddings_dict[criterion], 
-                            sentence_embeddings
-                        )
-                        max_similarity = similarities.max().item()
+                        max_similarity, best_segment = segments.scan.best_match(f"impact:{criterion}")
+                        best_page = segments.pages[best_segment]
                         
                         if max_similarity > 0.8:
                             criterion_score = weight
-                            evidence.append(f"{criterion}: Excellent match (similarity: {max_similarity:.2f})")
+                            evidence.append(f"{criterion}: Excellent match (similarity: {max_similarity:.2f}, page {best_page})")
                         elif max_similarity > 0.6:
                             criterion_score = weight * 0.8
-                            evidence.append(f"{criterion}: Good match (similarity: {max_similarity:.2f})")
+                            evidence.append(f"{criterion}: Good match (similarity: {max_similarity:.2f}, page {best_page})")
                         elif max_similarity > 0.4:
                             criterion_score = weight * 0.6
-                            evidence.append(f"{criterion}: Moderate match (similarity: {max_similarity:.2f})")
+                            evidence.append(f"{criterion}: Moderate match (similarity: {max_similarity:.2f}, page {best_page})")
                         else:
                             criterion_score = weight * 0.2
-                            evidence.append(f"{criterion}: Weak match (similarity: {max_similarity:.2f})")
+                            evidence.append(f"{criterion}: Weak match (similarity: {max_similarity:.2f}, page {best_page})")
                         
                         total_score += criterion_score
                 
@@ -728,9 +1187,9 @@ class EnhancedDPRScorer:
         found_keywords = sum(1 for keyword in sustainability_keywords if keyword in text_lower)
         return min(20, found_keywords * 2)
 
-    def get_compliance_score(self, text: str) -> ScoringResult:
+    def get_compliance_score(self, text: str, use_gemini: bool = True) -> ScoringResult:
         """
-        Compliance scoring with Gemini-powered Q&A
+        Compliance scoring with Gemini-powered Q&A (keyword scoring when use_gemini is False)
         """
         evidence = []
         score = 0
@@ -739,7 +1198,7 @@ class EnhancedDPRScorer:
         if not text:
             return ScoringResult(0, max_score, 0, ["No text provided"], method_used="none")
         
-        if GEMINI_AVAILABLE and self.gemini_client:
+        if GEMINI_AVAILABLE and self.gemini_client and use_gemini:
             try:
                 # Use the fixed question from notebook
                 question = "What is the total budget and is it between 20 crore and 500 crore?"
@@ -798,22 +1257,56 @@ class EnhancedDPRScorer:
         found_keywords = sum(1 for keyword in compliance_keywords if keyword in text_lower)
         return min(10, found_keywords * 1.5)
 
-    def calculate_comprehensive_score(self, pdf_path: str) -> ComprehensiveScore:
+    def calculate_comprehensive_score(self, pdf_path: str, document: Optional[ExtractedDocument] = None,
+                                      progress_callback: Optional[Callable[[str, Dict], None]] = None,
+                                      tier: str = "full") -> ComprehensiveScore:
         """
         Calculate comprehensive DPR score with all components
+        
+        Pass an already extracted document to avoid parsing the PDF again.
+        progress_callback(stage, partial_result) is called as each component finishes.
+        tier "reduced" (small model only) or "keyword" (no models) trades accuracy
+        for speed under load; neither calls Gemini.
         """
+        def report(stage: str, result: ScoringResult):
+            if progress_callback:
+                progress_callback(stage, {
+                    "score": round(result.score, 2),
+                    "max_score": round(result.max_score, 2),
+                    "percentage": round(result.percentage, 2),
+                    "method": result.method_used
+                })
+        
         try:
             # Extract text
-            text = self.extract_text_from_pdf(pdf_path)
+            if document is None:
+                document = extract_document(pdf_path, verbose=self.verbose)
+            text = document.text
             if not text.strip():
                 raise ValueError("No text could be extracted from PDF")
             
+            # Segment and embed the document once for all semantic checks
+            segments = self.segment_document(document.pages, tier=tier)
+            
             # Get all component scores
-            completeness_results, completeness_score = self.validate_dpr_completeness(text)
-            technical_result = self.get_technical_quality_score(text)
-            gatishakti_result = self.get_gatishakti_score(text)
-            sustainability_result = self.get_impact_sustainability_score(text)
-            compliance_result = self.get_compliance_score(text)
+            completeness_max = sum(self.marks_distribution.values()) + 5  # Completeness + NDC
+            completeness_results, completeness_score = self.validate_dpr_completeness(text, segments)
+            completeness_result = ScoringResult(
+                completeness_score,
+                completeness_max,
+                (completeness_score / completeness_max) * 100,
+                [f"Section breakdown: {completeness_results}"],
+                method_used="semantic_keyword_hybrid"
+            )
+            report("completeness", completeness_result)
+            technical_result = self.get_technical_quality_score(text, pages=document.pages)
+            report("technical", technical_result)
+            gatishakti_result = self.get_gatishakti_score(text, segments)
+            report("gatishakti", gatishakti_result)
+            sustainability_result = self.get_impact_sustainability_score(text, segments)
+            report("impact", sustainability_result)
+            compliance_result = self.get_compliance_score(text, use_gemini=(tier == "full"))
+            report("compliance", compliance_result)
             
             # Calculate total
             total_score = (
@@ -825,7 +1318,7 @@ class EnhancedDPRScorer:
             )
             
             max_total_score = (
-                sum(self.marks_distribution.values()) + 5 +  # Completeness + NDC
+                completeness_max +
                 technical_result.max_score +
                 gatishakti_result.max_score +
                 sustainability_result.max_score +
@@ -836,13 +1329,7 @@ class EnhancedDPRScorer:
             
             # Build comprehensive result
             breakdown = {
-                "completeness": ScoringResult(
-                    completeness_score, 
-                    sum(self.marks_distribution.values()) + 5,
-                    (completeness_score / (sum(self.marks_distribution.values()) + 5)) * 100,
-                    [f"Section breakdown: {completeness_results}"],
-                    method_used="semantic_keyword_hybrid"
-                ),
+                "completeness": completeness_result,
                 "technical_quality": technical_result,
                 "gatishakti_alignment": gatishakti_result,
                 "impact_sustainability": sustainability_result,
@@ -855,6 +1342,19 @@ class EnhancedDPRScorer:
             
             processing_info = {
                 "text_length": len(text),
+                "page_count": document.page_count,
+                "extractor": document.extractor,
+                "extraction": document.timing_breakdown(),
+                "segment_count": segments.occurrence_count,
+                "unique_segment_count": len(segments),
+                "boilerplate_lines_removed": segments.boilerplate_lines_removed,
+                "retrieval_mode": "coarse_to_fine" if segments.candidate_pages is not None else "full",
+                "candidate_pages": segments.candidate_pages,
+                "analysis_tier": segments.tier,
+                "scoring_cascade": segments.small_scan is not None and segments.scan is not None,
+                "document_aggregates_model": segments.scan.aggregates_model if segments.scan is not None else None,
+                "requirement_tiers": dict(Counter(decision["tier"] for section in completeness_results.values()
+                                                  for decision in section["requirements"])),
                 "nlp_available": NLP_AVAILABLE and nlp is not None,
                 "semantic_available": SEMANTIC_AVAILABLE and hasattr(self, 'semantic_model') and self.semantic_model is not None,
                 "gemini_available": GEMINI_AVAILABLE and self.gemini_client is not None,
@@ -868,7 +1368,8 @@ class EnhancedDPRScorer:
                 percentage=round(percentage, 2),
                 breakdown=breakdown,
                 evidence_summary=evidence_summary,
-                processing_info=processing_info
+                processing_info=processing_info,
+                project_vectors=segments.scan.project_vectors if segments.scan is not None else None
             )
             
         except Exception as e:
@@ -940,7 +1441,8 @@ class EnhancedDPRScorer:
         
         return "\n".join(report)
 
-    def analyze_dpr_pdf(self, pdf_path: str, verbose: bool = None) -> Dict:
+    def analyze_dpr_pdf(self, pdf_path: str, verbose: bool = None, document: Optional[ExtractedDocument] = None,
+                        progress_callback: Optional[Callable[[str, Dict], None]] = None, tier: str = "full") -> Dict:
         """
         Main analysis function - comprehensive DPR analysis
         """
@@ -948,13 +1450,14 @@ class EnhancedDPRScorer:
             verbose = self.verbose
         
         try:
-            result = self.calculate_comprehensive_score(pdf_path)
+            result = self.calculate_comprehensive_score(pdf_path, document=document,
+                                                        progress_callback=progress_callback, tier=tier)
             
             if verbose:
                 print(self.generate_detailed_report(result))
             
             # Return JSON-compatible result
-            return {
+            output = {
                 "total_score": result.total_score,
                 "max_score": result.max_total_score,
                 "percentage": result.percentage,
@@ -970,6 +1473,10 @@ class EnhancedDPRScorer:
                 "processing_info": result.processing_info,
                 "timestamp": datetime.now().isoformat()
             }
+            if result.project_vectors:
+                # Numpy vectors for the similar project index; removed before results are stored
+                output["_project_vectors"] = result.project_vectors
+            return output
             
         except Exception as e:
             error_result = {
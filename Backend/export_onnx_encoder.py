@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+ONNX Encoder Export Script
+Exports the sentence encoder to ONNX, quantizes it to int8 and validates both
+against fp32 PyTorch similarity scores
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from encoder_backends import (
+    ONNX_MODEL_FILE, ONNX_INT8_MODEL_FILE, OnnxEncoder, TorchEncoder, default_onnx_dir
+)
+
+SAMPLE_SENTENCES = [
+    "Detailed Project Report for construction of a two-lane road in Kohima district",
+    "The total project cost is estimated at Rs. 45.6 crore including contingencies",
+    "Expected beneficiaries include 12,000 households across 35 villages",
+    "The project aligns with the PM GatiShakti National Master Plan for multimodal connectivity",
+    "Operation and maintenance will be funded by the state for five years after completion",
+    "Non-duplication certificate: this project has not been sanctioned under any other scheme",
+    "Environmental clearance has been obtained from the State Pollution Control Board",
+    "Key performance indicators include travel time reduction and freight volume",
+    "Geo-coordinates of the project site: 25.6751 N, 94.1086 E",
+    "Implementation timeline of 24 months with quarterly physical milestones",
+]
+
+def export_onnx(model_name: str, output_dir: str, opset: int = 14):
+    """Export the transformer (last hidden state) with dynamic batch and sequence axes"""
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[name] for name in input_names), model_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True
+        )
+    print(f"Exported {model_path}")
+    return model_path
+
+def quantize(model_path: str, output_dir: str):
+    """Dynamic int8 quantization of the weights (activations stay fp32)"""
+    quantized_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    print(f"Quantized {quantized_path}")
+    return quantized_path
+
+def load_sentences(pdf_path: str = None):
+    if not pdf_path:
+        return SAMPLE_SENTENCES
+    from pdf_document import extract_document
+    document = extract_document(pdf_path)
+    pieces = [piece.strip() for page in document.pages for piece in re.split(r'\n+|(?<=[.!?])\s+', page)]
+    return [piece for piece in pieces if len(piece) > 10][:500]
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def benchmark(encoder, sentences, batch_size):
+    encoder.encode(sentences[:batch_size], batch_size=batch_size)  # Warm up
+    start = time.perf_counter()
+    vectors = encoder.encode(sentences, batch_size=batch_size)
+    return normalize(np.asarray(vectors, dtype=np.float32)), len(sentences) / (time.perf_counter() - start)
+
+def validate(model_name: str, output_dir: str, sentences, batch_size: int, tolerance: float) -> bool:
+    """Compare similarity matrices of each ONNX variant with fp32 PyTorch"""
+    reference, reference_rate = benchmark(TorchEncoder(model_name), sentences, batch_size)
+    reference_similarity = reference @ reference.T
+    print(f"\n{'backend':<12}{'sentences/s':>14}{'speedup':>10}{'min cos':>10}{'max sim drift':>16}")
+    print(f"{'torch':<12}{reference_rate:>14.1f}{1.0:>10.2f}{1.0:>10.4f}{0.0:>16.4f}")
+
+    passed = True
+    for quantized in (False, True):
+        encoder = OnnxEncoder(model_name, model_dir=output_dir, quantized=quantized)
+        vectors, rate = benchmark(encoder, sentences, batch_size)
+        min_cosine = float(np.min(np.sum(vectors * reference, axis=1)))
+        drift = float(np.max(np.abs(vectors @ vectors.T - reference_similarity)))
+        passed = passed and drift <= tolerance
+        print(f"{encoder.backend:<12}{rate:>14.1f}{rate / reference_rate:>10.2f}{min_cosine:>10.4f}{drift:>16.4f}")
+
+    print(f"\nValidation {'passed' if passed else 'FAILED'} (max similarity drift tolerance {tolerance})")
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="intfloat/e5-large-v2")
+    parser.add_argument("--output", help="Output directory (default: DPR_ONNX_MODEL_DIR/<model>)")
+    parser.add_argument("--pdf", help="Validate on sentences from this DPR instead of built-in samples")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Max allowed cosine similarity drift")
+    parser.add_argument("--skip-export", action="store_true", help="Only validate an existing export")
+    args = parser.parse_args()
+
+    output_dir = args.output or default_onnx_dir(args.model)
+    if not args.skip_export:
+        model_path = export_onnx(args.model, output_dir)
+        quantize(model_path, output_dir)
+
+    sentences = load_sentences(args.pdf)
+    sys.exit(0 if validate(args.model, output_dir, sentences, args.batch_size, args.tolerance) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,9 @@ Updates the existing Flask app to use the enhanced scorer
 
 import os
 import sys
+import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -20,37 +21,74 @@ except ImportError as e:
     ENHANCED_AVAILABLE = False
     from dpr_scorer import DPRScorer
 
+from pdf_document import ExtractedDocument
+from scoring_pool import ScoringWorkerPool
+from project_index import create_project_index
+from load_policy import create_load_policy
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever scoring logic changes so stored results are not reused across versions
+ANALYZER_VERSION = "2.0"
+
 class IntegratedDPRAnalysis:
     """
     Integrated DPR Analysis that uses enhanced scorer when available
     """
     
-    def __init__(self, api_key: Optional[str] = None, use_enhanced: bool = True):
+    def __init__(self, api_key: Optional[str] = None, use_enhanced: bool = True,
+                 execution_mode: str = "inline", pool_workers: int = 2):
         self.api_key = api_key or os.getenv("GEMINI_KEY_STRING")
         self.use_enhanced = use_enhanced and ENHANCED_AVAILABLE
+        self.execution_mode = "inline"
+        self.worker_pool = None
+        self.project_index = None
+        self.similar_projects_k = int(os.getenv("SIMILAR_PROJECTS_K", "5"))
+        self.duplicate_threshold = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.95"))
+        self.load_policy = create_load_policy()
         
         if self.use_enhanced:
             logger.info("🚀 Initializing Enhanced DPR Scorer...")
             self.scorer = EnhancedDPRScorer(api_key=self.api_key, verbose=False)
             self.analysis_type = "enhanced"
+            self.project_index = create_project_index(getattr(self.scorer, 'project_vector_model', None))
+            
+            if execution_mode == "process_pool":
+                # Models are loaded above, once; workers inherit them via fork
+                try:
+                    self.worker_pool = ScoringWorkerPool(self.scorer, num_workers=pool_workers).start()
+                    self.execution_mode = "process_pool"
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not start scoring worker pool, scoring inline: {e}")
         else:
             logger.info("📊 Using Basic DPR Scorer...")
             self.scorer = DPRScorer()
             self.analysis_type = "basic"
 
-    def analyze_dpr(self, pdf_path: str, include_display: bool = False) -> Dict[str, Any]:
+    def analyze_dpr(self, pdf_path: str, include_display: bool = False,
+                    document: Optional[ExtractedDocument] = None,
+                    progress_callback: Optional[Callable[[str, Dict], None]] = None,
+                    upload_id: Optional[str] = None, tier: str = "full") -> Dict[str, Any]:
         """
         Analyze DPR with automatic fallback
+        
+        An already extracted document can be passed to skip PDF parsing.
+        progress_callback(stage, partial_result) receives per-component progress
+        from the enhanced scorer. With an upload_id the document is added to the
+        similar project index after the lookup. tier is the analysis tier picked
+        by choose_tier(); full-tier scoring times feed the load policy.
         """
         try:
             if self.use_enhanced:
-                return self._analyze_enhanced(pdf_path, include_display)
+                start_time = time.time()
+                result = self._analyze_enhanced(pdf_path, include_display, document, progress_callback, upload_id, tier)
+                if tier == "full" and "error" not in result:
+                    self.load_policy.record_latency(time.time() - start_time)
+                return result
             else:
-                return self._analyze_basic(pdf_path)
+                return self._analyze_basic(pdf_path, document)
         except Exception as e:
             logger.error(f"Analysis failed: {e}")
             if self.use_enhanced:
@@ -58,20 +96,31 @@ class IntegratedDPRAnalysis:
                 logger.info("🔄 Falling back to basic analysis...")
                 try:
                     basic_scorer = DPRScorer()
-                    return self._analyze_basic_with_scorer(basic_scorer, pdf_path)
+                    return self._analyze_basic_with_scorer(basic_scorer, pdf_path, document)
                 except Exception as e2:
                     logger.error(f"Fallback analysis also failed: {e2}")
                     return self._get_error_result(pdf_path, str(e2))
             else:
                 return self._get_error_result(pdf_path, str(e))
 
-    def _analyze_enhanced(self, pdf_path: str, include_display: bool) -> Dict[str, Any]:
+    def _analyze_enhanced(self, pdf_path: str, include_display: bool,
+                          document: Optional[ExtractedDocument] = None,
+                          progress_callback: Optional[Callable[[str, Dict], None]] = None,
+                          upload_id: Optional[str] = None, tier: str = "full") -> Dict[str, Any]:
         """Enhanced analysis with comprehensive scoring"""
-        result = self.scorer.analyze_dpr_pdf(pdf_path, verbose=include_display)
+        # Score inline if the worker pool's supervisor has died
+        runner = self.worker_pool if self.worker_pool and self.worker_pool.healthy else self.scorer
+        result = runner.analyze_dpr_pdf(pdf_path, verbose=include_display, document=document,
+                                        progress_callback=progress_callback, tier=tier)
         
-        # Add metadata
+        project_vectors = result.pop("_project_vectors", None)
+        if self.project_index and project_vectors:
+            result["similar_projects"] = self._find_similar_projects(project_vectors, upload_id)
+        
+        # Add metadata; degraded tiers are recorded as e.g. "enhanced-reduced"
+        used_tier = result.get("processing_info", {}).get("analysis_tier", "full")
         result.update({
-            "analysis_type": "enhanced",
+            "analysis_type": "enhanced" if used_tier == "full" else f"enhanced-{used_tier}",
             "capabilities": {
                 "nlp_available": result.get("processing_info", {}).get("nlp_available", False),
                 "semantic_available": result.get("processing_info", {}).get("semantic_available", False),
@@ -81,13 +130,44 @@ class IntegratedDPRAnalysis:
         
         return result
 
-    def _analyze_basic(self, pdf_path: str) -> Dict[str, Any]:
+    def _find_similar_projects(self, project_vectors: Dict[str, Any], upload_id: Optional[str]) -> Dict[str, Any]:
+        """Look up previously analyzed DPRs similar to this one, then index it"""
+        try:
+            matches = self.project_index.search(project_vectors, k=self.similar_projects_k,
+                                                exclude_upload_id=upload_id)
+            if upload_id:
+                self.project_index.add(upload_id, project_vectors)
+        except Exception as e:
+            logger.warning(f"⚠️ Similar project lookup failed: {e}")
+            return {"error": str(e), "matches": []}
+        
+        for match in matches:
+            match["possible_duplicate"] = match["similarity"] >= self.duplicate_threshold
+        return {
+            "matches": matches,
+            "possible_duplicate": any(match["possible_duplicate"] for match in matches),
+            "threshold": self.duplicate_threshold
+        }
+
+    def choose_tier(self, queue_depth: int) -> str:
+        """Analysis tier for a new job under the current load; the basic scorer has only one"""
+        if not self.use_enhanced:
+            return "full"
+        return self.load_policy.choose_tier(queue_depth)
+
+    def remove_from_project_index(self, upload_id: str):
+        """Forget a deleted upload in the similar project index"""
+        if self.project_index:
+            self.project_index.remove(upload_id)
+
+    def _analyze_basic(self, pdf_path: str, document: Optional[ExtractedDocument] = None) -> Dict[str, Any]:
         """Basic analysis using original scorer"""
-        return self._analyze_basic_with_scorer(self.scorer, pdf_path)
+        return self._analyze_basic_with_scorer(self.scorer, pdf_path, document)
 
-    def _analyze_basic_with_scorer(self, scorer, pdf_path: str) -> Dict[str, Any]:
+    def _analyze_basic_with_scorer(self, scorer, pdf_path: str,
+                                   document: Optional[ExtractedDocument] = None) -> Dict[str, Any]:
         """Helper for basic analysis"""
-        result = scorer.calculate_total_score(pdf_path)
+        result = scorer.calculate_total_score(pdf_path, document=document)
         
         # Standardize format
         standardized_result = {
@@ -117,11 +197,21 @@ class IntegratedDPRAnalysis:
             "analysis_type": self.analysis_type
         }
 
+    def get_version(self) -> str:
+        """Identifier of the analyzer producing results, e.g. 'enhanced-2.0'"""
+        return f"{self.analysis_type}-{ANALYZER_VERSION}"
+
+    def get_cache_signature(self) -> Dict[str, Any]:
+        """Analyzer version plus scorer settings; used to key cached results"""
+        return {"version": self.get_version(), **self.scorer.get_cache_signature()}
+
     def get_capabilities(self) -> Dict[str, Any]:
         """Get analysis capabilities"""
         if self.use_enhanced:
             return {
                 "analysis_type": "enhanced",
+                "execution_mode": self.execution_mode,
+                "embedding_cache": self.scorer.get_embedding_cache_stats(),
                 "features": [
                     "Advanced NLP with spaCy",
                     "Semantic similarity analysis",
@@ -145,11 +235,19 @@ class IntegratedDPRAnalysis:
             }
 
 # Factory function for easy integration
-def create_dpr_analyzer(api_key: Optional[str] = None, prefer_enhanced: bool = True) -> IntegratedDPRAnalysis:
+def create_dpr_analyzer(api_key: Optional[str] = None, prefer_enhanced: bool = True,
+                        execution_mode: Optional[str] = None,
+                        pool_workers: Optional[int] = None) -> IntegratedDPRAnalysis:
     """
     Factory function to create the best available DPR analyzer
+    
+    execution_mode is 'inline' (default) or 'process_pool'; both default from the
+    DPR_SCORER_MODE and DPR_SCORER_WORKERS environment variables.
     """
-    return IntegratedDPRAnalysis(api_key=api_key, use_enhanced=prefer_enhanced)
+    execution_mode = execution_mode or os.getenv("DPR_SCORER_MODE", "inline")
+    pool_workers = pool_workers or int(os.getenv("DPR_SCORER_WORKERS", "2"))
+    return IntegratedDPRAnalysis(api_key=api_key, use_enhanced=prefer_enhanced,
+                                 execution_mode=execution_mode, pool_workers=pool_workers)
 
 # Example usage function
 def example_usage():
@@ -0,0 +1,62 @@
+"""
+Background job queue for DPR analysis
+Runs analysis jobs on a worker pool so upload requests return immediately
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AnalysisJobQueue:
+    """
+    Thread pool that executes analysis jobs inside the Flask application context.
+
+    Job state itself lives in the AnalysisResult.status column
+    ('pending' -> 'processing' -> 'completed' / 'error'); this class only
+    schedules the work and tracks how many jobs are queued or running.
+    """
+
+    def __init__(self, app, max_workers: int = 2):
+        self.app = app
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dpr-analysis')
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._running = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Queue a job; returns a Future for the job's return value"""
+        with self._lock:
+            self._outstanding += 1
+        return self.executor.submit(self._run, func, args, kwargs)
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            with self.app.app_context():
+                return func(*args, **kwargs)
+        except Exception as e:
+            print(f"Background analysis job failed: {e}")
+            print(traceback.format_exc())
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._outstanding -= 1
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs that are queued or currently running"""
+        with self._lock:
+            return self._outstanding
+    
+    @property
+    def backlog(self) -> int:
+        """Number of jobs waiting for a worker, not counting running ones"""
+        with self._lock:
+            return self._outstanding - self._running
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,114 @@
+"""
+Load-Adaptive Analysis Policy
+Picks a cheaper analysis tier while the upload queue is backed up or scoring
+latency is high, and re-runs degraded results in full once the system is idle
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+
+# Cheapest last: full = e5-large + Gemini, reduced = keyword + MiniLM, keyword = no models
+ANALYSIS_TIERS = ("full", "reduced", "keyword")
+
+class LoadPolicy:
+    """
+    Maps current load to an analysis tier.
+
+    Load is the larger of queue_depth / max_queue_depth and
+    p95 latency / max_p95_seconds, where the p95 is taken over full-tier
+    scoring times of the last latency_window_seconds. Below 1 jobs get the
+    full tier, from 1 the reduced tier and from 2 the keyword tier. A limit
+    of 0 disables that signal.
+    """
+
+    def __init__(self, max_queue_depth: int = 10, max_p95_seconds: float = 600.0,
+                 latency_window_seconds: float = 900.0, max_samples: int = 200):
+        self.max_queue_depth = max_queue_depth
+        self.max_p95_seconds = max_p95_seconds
+        self.latency_window_seconds = latency_window_seconds
+        self._latencies = deque(maxlen=max_samples)  # (finished_at, seconds)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_queue_depth > 0 or self.max_p95_seconds > 0
+
+    def record_latency(self, seconds: float):
+        """Record the scoring time of a full-tier job"""
+        with self._lock:
+            self._latencies.append((time.time(), seconds))
+
+    def p95_latency(self) -> Optional[float]:
+        """95th percentile of recent full-tier scoring times, None without samples"""
+        cutoff = time.time() - self.latency_window_seconds
+        with self._lock:
+            samples = sorted(seconds for finished_at, seconds in self._latencies if finished_at >= cutoff)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def load(self, queue_depth: int) -> float:
+        """Current load relative to the configured limits (1.0 = at the limit)"""
+        load = 0.0
+        if self.max_queue_depth > 0:
+            load = max(load, queue_depth / self.max_queue_depth)
+        p95 = self.p95_latency()
+        if self.max_p95_seconds > 0 and p95 is not None:
+            load = max(load, p95 / self.max_p95_seconds)
+        return load
+
+    def choose_tier(self, queue_depth: int) -> str:
+        """Analysis tier for a job starting now"""
+        if not self.enabled:
+            return "full"
+        return ANALYSIS_TIERS[min(int(self.load(queue_depth)), len(ANALYSIS_TIERS) - 1)]
+
+    def status(self, queue_depth: int) -> Dict[str, Any]:
+        p95 = self.p95_latency()
+        return {
+            "enabled": self.enabled,
+            "tier": self.choose_tier(queue_depth),
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "p95_seconds": round(p95, 2) if p95 is not None else None,
+            "max_p95_seconds": self.max_p95_seconds
+        }
+
+class IdleRunner:
+    """
+    Daemon thread that calls task() every poll_seconds while is_idle() is true.
+    Used to re-queue degraded results for full analysis when nothing else runs.
+    """
+
+    def __init__(self, is_idle: Callable[[], bool], task: Callable[[], None], poll_seconds: float = 30.0):
+        self.is_idle = is_idle
+        self.task = task
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="idle-runner", daemon=True)
+
+    def start(self) -> "IdleRunner":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                if self.is_idle():
+                    self.task()
+            except Exception as e:
+                print(f"Idle task failed: {e}")
+
+    def stop(self):
+        self._stopped.set()
+
+def create_load_policy() -> LoadPolicy:
+    """Load policy configured from DEGRADE_QUEUE_DEPTH and DEGRADE_P95_SECONDS"""
+    return LoadPolicy(
+        max_queue_depth=int(os.getenv("DEGRADE_QUEUE_DEPTH", "10")),
+        max_p95_seconds=float(os.getenv("DEGRADE_P95_SECONDS", "600")),
+        latency_window_seconds=float(os.getenv("DEGRADE_LATENCY_WINDOW_SECONDS", "900"))
+    )
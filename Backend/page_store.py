@@ -0,0 +1,256 @@
+"""
+Persistent Page Store
+Compressed, memory-mapped per-page text of extracted PDFs keyed by file
+SHA-256 and extractor version, so re-analysis skips parsing and OCR
+"""
+
+import os
+import json
+import mmap
+import zlib
+import time
+import struct
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"DPRPAGES2\n"
+_LENGTH = struct.Struct("!I")
+
+@dataclass
+class StoredPages:
+    """Per-page text and extraction flags of one stored document"""
+    pages: List[str]
+    extractor: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    ocr: List[bool] = field(default_factory=list)  # Page text came from OCR
+    page_extractors: List[str] = field(default_factory=list)  # Extractor of each page
+
+class PageFile:
+    """
+    Read-only view of one page file. The file is memory-mapped and pages are
+    decompressed on access, so a single page can be read without loading the
+    rest of the document.
+
+    Layout: magic, the zlib-compressed page texts, then a JSON footer
+    (document fields and per-page offset / length / flags) and its 4-byte
+    length, so files can be written one page at a time.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(_MAGIC)] != _MAGIC or len(self._mmap) < len(_MAGIC) + _LENGTH.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a page store file")
+        footer_end = len(self._mmap) - _LENGTH.size
+        footer_length = _LENGTH.unpack(self._mmap[footer_end:])[0]
+        self.header = json.loads(self._mmap[footer_end - footer_length:footer_end])
+        self._data_start = len(_MAGIC)
+
+    def __len__(self) -> int:
+        return len(self.header["pages"])
+
+    @property
+    def extractor(self) -> str:
+        return self.header["extractor"]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header.get("metadata", {})
+
+    def entry(self, index: int) -> Dict[str, Any]:
+        """Offset, length, OCR flag and extractor of one page"""
+        return self.header["pages"][index]
+
+    def page(self, index: int) -> str:
+        entry = self.entry(index)
+        start = self._data_start + entry["offset"]
+        return zlib.decompress(self._mmap[start:start + entry["length"]]).decode("utf-8")
+
+    def read(self, max_pages: Optional[int] = None) -> StoredPages:
+        entries = self.header["pages"][:max_pages]
+        return StoredPages(
+            pages=[self.page(i) for i in range(len(entries))],
+            extractor=self.extractor,
+            metadata=self.metadata,
+            ocr=[entry["ocr"] for entry in entries],
+            page_extractors=[entry["extractor"] for entry in entries]
+        )
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self) -> "PageFile":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class PageFileWriter:
+    """
+    Writes a page file one page at a time, so a document can be stored while
+    it is being extracted without holding its pages. Nothing appears at path
+    until commit(); abort() discards the partial file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(_MAGIC)
+        self._entries: List[Dict[str, Any]] = []
+        self._offset = 0
+
+    @property
+    def page_count(self) -> int:
+        return len(self._entries)
+
+    def add(self, text: str, extractor: str, ocr: bool = False):
+        blob = zlib.compress((text or "").encode("utf-8"), 6)
+        self._file.write(blob)
+        self._entries.append({"offset": self._offset, "length": len(blob), "ocr": bool(ocr), "extractor": extractor})
+        self._offset += len(blob)
+
+    def commit(self, extractor: str, metadata: Dict[str, Any]):
+        """Write the footer and move the file into place atomically"""
+        footer = json.dumps({"extractor": extractor, "metadata": metadata,
+                             "pages": self._entries}, default=str).encode("utf-8")
+        self._file.write(footer + _LENGTH.pack(len(footer)))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+class PageStore:
+    """
+    Size-capped store of page files, one per (file SHA-256, extractor version).
+
+    An SQLite index tracks each file's size and last use; when a write takes
+    the store over max_bytes, least recently used documents are evicted.
+    """
+
+    def __init__(self, store_dir: str, max_bytes: int):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        os.makedirs(store_dir, exist_ok=True)
+        self.index_path = os.path.join(store_dir, "index.sqlite")
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    key TEXT PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # Short-lived connections: used from request threads and forked workers
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    @staticmethod
+    def _key(file_hash: str, extractor_version: str) -> str:
+        return f"{file_hash}:{extractor_version}"
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.store_dir, file_name)
+
+    def _file_name(self, file_hash: str, extractor_version: str) -> str:
+        return f"{file_hash}_{zlib.crc32(extractor_version.encode('utf-8')):08x}.pages"
+
+    def open(self, file_hash: str, extractor_version: str) -> Optional[PageFile]:
+        """Memory-mapped page file of a stored document (caller closes it), or None on a miss"""
+        key = self._key(file_hash, extractor_version)
+        with self._connect() as conn:
+            row = conn.execute("SELECT file_name FROM documents WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE documents SET last_used = ? WHERE key = ?", (time.time(), key))
+        try:
+            return PageFile(self._path(row[0]))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Dropping unreadable page store entry {row[0]}: {e}")
+            self._remove(key, row[0])
+            return None
+
+    def get(self, file_hash: str, extractor_version: str, max_pages: Optional[int] = None) -> Optional[StoredPages]:
+        """Stored pages of a document (the first max_pages), or None on a miss"""
+        page_file = self.open(file_hash, extractor_version)
+        if page_file is None:
+            return None
+        with page_file:
+            return page_file.read(max_pages)
+
+    def writer(self, file_hash: str, extractor_version: str) -> PageFileWriter:
+        """Writer for a document extracted page by page; finish with commit()"""
+        return PageFileWriter(self._path(self._file_name(file_hash, extractor_version)))
+
+    def commit(self, file_hash: str, extractor_version: str, writer: PageFileWriter,
+               extractor: str, metadata: Dict[str, Any]):
+        """Move a completely written document into the store, then evict down to max_bytes"""
+        writer.commit(extractor, metadata)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (key, file_name, size, page_count, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self._key(file_hash, extractor_version), os.path.basename(writer.path),
+                 os.path.getsize(writer.path), writer.page_count, time.time())
+            )
+        self._evict()
+
+    def put(self, file_hash: str, extractor_version: str, stored: StoredPages):
+        """Store a complete document, then evict down to max_bytes"""
+        writer = self.writer(file_hash, extractor_version)
+        try:
+            for i, text in enumerate(stored.pages):
+                writer.add(text,
+                           stored.page_extractors[i] if i < len(stored.page_extractors) else stored.extractor,
+                           ocr=stored.ocr[i] if i < len(stored.ocr) else False)
+        except BaseException:
+            writer.abort()
+            raise
+        self.commit(file_hash, extractor_version, writer, stored.extractor, stored.metadata)
+
+    def _remove(self, key: str, file_name: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+        try:
+            os.remove(self._path(file_name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, file_name, size FROM documents ORDER BY last_used DESC").fetchall()
+        total = 0
+        for key, file_name, size in rows:
+            total += size
+            if total > self.max_bytes:
+                self._remove(key, file_name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            documents, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents").fetchone()
+        return {"documents": documents, "bytes": size, "max_bytes": self.max_bytes}
+
+def create_page_store() -> Optional[PageStore]:
+    """Page store in PAGE_STORE_DIR capped at PAGE_STORE_MAX_MB (default 1024; 0 disables)"""
+    max_mb = float(os.getenv("PAGE_STORE_MAX_MB", "1024"))
+    if max_mb <= 0:
+        return None
+    store_dir = os.getenv("PAGE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_store"))
+    try:
+        return PageStore(store_dir, int(max_mb * 1024 * 1024))
+    except Exception as e:
+        logger.warning(f"⚠️ Page store unavailable: {e}")
+        return None
@@ -0,0 +1,795 @@
+"""
+Shared PDF Extraction Module
+Extracts a DPR once per upload so every analyzer works from the same pages
+"""
+
+import os
+import re
+import math
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+import multiprocessing as mp
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Set, Tuple
+
+from pypdf import PdfReader
+
+from page_store import StoredPages, create_page_store
+
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+    print("⚠️ pdfplumber not available. Install with: pip install pdfplumber")
+
+try:
+    import pytesseract
+    from PIL import Image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+    print("⚠️ OCR capabilities not available. Install with: pip install pytesseract Pillow")
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ExtractedDocument:
+    """Per-page text and metadata of a PDF, shared by all analyzers"""
+    pdf_path: str
+    pages: List[str]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    extractor: str = "none"
+    page_seconds: List[float] = field(default_factory=list)  # Extraction time of each page
+    page_extractors: List[str] = field(default_factory=list)  # Extractor whose text each page kept
+    extraction_seconds: float = 0.0  # Wall-clock time of the successful extractor
+    workers: int = 1  # Processes the pages were extracted by
+    ocr_pages: List[int] = field(default_factory=list)  # Image-only pages (1-based) whose text came from OCR
+    from_store: bool = False  # Loaded from the page store instead of parsing the PDF
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def timing_breakdown(self, slowest: int = 5) -> Dict[str, Any]:
+        """Per-page extraction timing summary: totals and the slowest pages"""
+        ranked = sorted(range(len(self.page_seconds)), key=lambda i: self.page_seconds[i], reverse=True)
+        return {
+            "extractor": self.extractor,
+            "workers": self.workers,
+            "wall_seconds": round(self.extraction_seconds, 3),
+            "page_seconds_total": round(sum(self.page_seconds), 3),
+            "slowest_pages": [{"page": i + 1, "seconds": round(self.page_seconds[i], 3)} for i in ranked[:slowest]],
+            "page_extractors": dict(Counter(self.page_extractors)),
+            "ocr_pages": self.ocr_pages,
+            "from_store": self.from_store
+        }
+
+    @cached_property
+    def text(self) -> str:
+        """Full document text with pages separated by newlines"""
+        return "".join(page + "\n" for page in self.pages if page)
+
+@dataclass
+class Page:
+    """One page yielded by iter_pages"""
+    number: int  # 1-based
+    text: str
+    extractor: str
+    seconds: float = 0.0  # Extraction and OCR time; 0 for stored pages
+    ocr: bool = False  # Text came from OCR
+
+class PageTermScanner:
+    """
+    Finds which of a fixed set of terms occur in a document, one page at a
+    time. Terms are matched lowercase as substrings; since no term spans a
+    newline, a term occurs in the joined document text exactly when it
+    occurs on some page.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.pending: Set[str] = {term.lower() for term in terms}
+        self.found: Set[str] = set()
+        self.characters = 0
+
+    def add(self, page_text: str):
+        self.characters += len(page_text or "")
+        if not self.pending or not page_text:
+            return
+        page_lower = page_text.lower()
+        hits = {term for term in self.pending if term in page_lower}
+        self.found |= hits
+        self.pending -= hits
+
+    def __contains__(self, term: str) -> bool:
+        return term.lower() in self.found
+
+# Page furniture like "12", "- 12 -", "Page 3 of 45", "3/45"
+MAX_HEADER_LINE_CHARS = 120
+_PAGE_NUMBER_LINE = re.compile(r'^[\W_]*(?:page|pg\.?)?[\W_]*\d*[\W_]*(?:(?:of|/)[\W_]*\d+)?[\W_]*$', re.IGNORECASE)
+
+def _line_signature(line: str) -> str:
+    """Compare lines ignoring case, spacing and numbers (so "Vol 2, Page 3" matches "Vol 2, Page 4")"""
+    return re.sub(r'\d+', '#', " ".join(line.lower().split()))
+
+def strip_page_boilerplate(pages: List[str], min_page_fraction: float = 0.3,
+                           min_pages: int = 3) -> Tuple[List[str], int]:
+    """
+    Remove running headers/footers and page-number lines from per-page text.
+
+    A line is boilerplate when a line with the same signature appears on at
+    least min_page_fraction of the pages (and at least min_pages pages), or
+    when it holds nothing but a page number. Returns the cleaned pages and
+    the number of lines removed.
+    """
+    page_lines = [(page or "").split("\n") for page in pages]
+    pages_with_line = Counter()
+    for lines in page_lines:
+        pages_with_line.update({_line_signature(line) for line in lines
+                                if line.strip() and len(line.strip()) <= MAX_HEADER_LINE_CHARS})
+
+    repeat_threshold = max(min_pages, int(len(pages) * min_page_fraction))
+    repeated = {signature for signature, count in pages_with_line.items() if count >= repeat_threshold}
+
+    cleaned, removed = [], 0
+    for lines in page_lines:
+        kept = []
+        for line in lines:
+            stripped = line.strip()
+            if stripped and (_PAGE_NUMBER_LINE.match(stripped) or _line_signature(line) in repeated):
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+    return cleaned, removed
+
+def _read_metadata(pdf_path: str) -> Dict[str, Any]:
+    """Read the PDF info dictionary, ignoring unreadable metadata"""
+    try:
+        if FITZ_AVAILABLE:
+            with fitz.open(pdf_path) as doc:
+                return {k: v for k, v in (doc.metadata or {}).items() if v}
+        reader = PdfReader(pdf_path)
+        return {str(k).lstrip('/'): str(v) for k, v in (reader.metadata or {}).items()}
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read PDF metadata: {e}")
+        return {}
+
+# Page-parallel extraction: documents of at least PARALLEL_MIN_PAGES pages are
+# split into page ranges extracted by PDF_EXTRACT_WORKERS processes
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+MIN_SHARD_PAGES = 8
+
+def extraction_workers() -> int:
+    """Worker processes for page-parallel extraction (PDF_EXTRACT_WORKERS, default min(4, CPUs))"""
+    return max(1, int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
+def _iter_pdfplumber(pdf_path: str, start: int, end: int) -> Iterator[Tuple[str, float, str]]:
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:end]:
+            page_start = time.perf_counter()
+            page_text = page.extract_text() or ""
+            seconds = time.perf_counter() - page_start
+            page.close()  # Free the page's cached layout objects
+            yield page_text, seconds, "pdfplumber"
+
+def _iter_fitz(pdf_path: str, start: int, end: int) -> Iterator[Tuple[str, float, str]]:
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, min(end, len(doc))):
+            page_start = time.perf_counter()
+            page_text = doc.load_page(page_num).get_text("text")
+            yield page_text, time.perf_counter() - page_start, "pymupdf"
+
+def _iter_pypdf(pdf_path: str, start: int, end: int) -> Iterator[Tuple[str, float, str]]:
+    for page in PdfReader(pdf_path).pages[start:end]:
+        page_start = time.perf_counter()
+        page_text = page.extract_text() or ""
+        yield page_text, time.perf_counter() - page_start, "pypdf"
+
+# Fast path: PyMuPDF is several times faster than pdfplumber, so every page
+# is extracted with it first and only pages whose text fails these checks
+# are escalated. Pages with no real text layer are left to OCR.
+QUALITY_MAX_GARBAGE_RATIO = float(os.getenv("PDF_QUALITY_MAX_GARBAGE", "0.05"))
+QUALITY_MIN_WORDS = int(os.getenv("PDF_QUALITY_MIN_WORDS", "20"))
+QUALITY_MAX_COLUMN_SWITCHES = int(os.getenv("PDF_QUALITY_MAX_COLUMN_SWITCHES", "3"))
+
+# Replacement, C0 control (except tab / newlines) and private-use characters,
+# and "(cid:N)" codes of glyphs without a Unicode mapping
+_GARBAGE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffd\ue000-\uf8ff]|\(cid:\d+\)')
+_WORD = re.compile(r'[^\W\d_]{2,}')
+_WHITESPACE = re.compile(r'\s+')
+
+def page_text_quality(page_text: str) -> Tuple[float, int]:
+    """Garbage ratio (share of non-space characters that are garbage) and word count of a page"""
+    characters = len(_WHITESPACE.sub("", page_text or ""))
+    if not characters:
+        return 0.0, 0
+    garbage = sum(len(match) for match in _GARBAGE.findall(page_text))
+    return garbage / characters, len(_WORD.findall(page_text))
+
+def _quality_key(page_text: str) -> Tuple[bool, float, int]:
+    """Orders candidate texts of one page: passing the checks, then less garbage, then more words"""
+    garbage_ratio, words = page_text_quality(page_text)
+    return (garbage_ratio <= QUALITY_MAX_GARBAGE_RATIO and words >= QUALITY_MIN_WORDS), -garbage_ratio, words
+
+def _column_switches(blocks, page_width: float) -> int:
+    """
+    How often consecutive text blocks jump between the left and right half
+    of the page. Two columns read in order switch once (or once per
+    section); text interleaved line by line across columns switches on
+    nearly every block. Blocks spanning the middle are not counted.
+    """
+    middle = page_width / 2
+    sides = [x1 <= middle for x0, y0, x1, y1, text, block_no, block_type in blocks
+             if block_type == 0 and text.strip() and (x1 <= middle or x0 >= middle)]
+    return sum(1 for left, right in zip(sides, sides[1:]) if left != right)
+
+def _column_order_text(blocks, page_width: float) -> str:
+    """
+    Page text rebuilt from its blocks in reading order: top to bottom, and
+    within each run of column blocks (between full-width blocks) the whole
+    left column before the right one
+    """
+    middle = page_width / 2
+    text_blocks = sorted((block for block in blocks if block[6] == 0 and block[4].strip()),
+                         key=lambda block: (block[1], block[0]))
+    ordered, band = [], []
+    for block in text_blocks:
+        if block[0] < middle < block[2]:
+            ordered.extend(sorted(band, key=lambda b: (b[0] >= middle, b[1])))
+            band = []
+            ordered.append(block)
+        else:
+            band.append(block)
+    ordered.extend(sorted(band, key=lambda b: (b[0] >= middle, b[1])))
+    return "".join(block[4] if block[4].endswith("\n") else block[4] + "\n" for block in ordered)
+
+def _iter_fast_path(pdf_path: str, start: int, end: int) -> Iterator[Tuple[str, float, str]]:
+    """
+    PyMuPDF for every page. Pages whose blocks interleave two columns are
+    rebuilt in column order from the same blocks; pages that still fail the
+    garbage / word checks are re-extracted with pdfplumber, whose text is
+    kept when it scores better.
+    """
+    plumber = None
+    try:
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(start, min(end, len(doc))):
+                page_start = time.perf_counter()
+                page = doc.load_page(page_num)
+                page_text = page.get_text("text")
+                extractor = "pymupdf"
+                if len(page_text.strip()) > OCR_MAX_TEXT_CHARS:
+                    blocks = page.get_text("blocks")
+                    if _column_switches(blocks, page.rect.width) > QUALITY_MAX_COLUMN_SWITCHES:
+                        page_text, extractor = _column_order_text(blocks, page.rect.width), "pymupdf-columns"
+                    quality = _quality_key(page_text)
+                    if not quality[0] and PDFPLUMBER_AVAILABLE:
+                        try:
+                            if plumber is None:
+                                plumber = pdfplumber.open(pdf_path)
+                            plumber_page = plumber.pages[page_num]
+                            escalated = plumber_page.extract_text() or ""
+                            plumber_page.close()
+                            if _quality_key(escalated) > quality:
+                                page_text, extractor = escalated, "pdfplumber"
+                        except Exception as e:
+                            logger.warning(f"⚠️ pdfplumber failed on page {page_num + 1}: {e}")
+                yield page_text, time.perf_counter() - page_start, extractor
+    finally:
+        if plumber is not None:
+            plumber.close()
+
+# Each extractor yields (text, seconds, extractor used) for pages [start, end), one page at a time
+_EXTRACTORS = {
+    "pymupdf+pdfplumber": _iter_fast_path,
+    "pdfplumber": _iter_pdfplumber,
+    "pymupdf": _iter_fitz,
+    "pypdf": _iter_pypdf,
+}
+
+def available_extractors() -> List[str]:
+    """Installed extractors, including the PyMuPDF fast path"""
+    extractors = []
+    if FITZ_AVAILABLE:
+        extractors += ["pymupdf+pdfplumber", "pymupdf"]
+    if PDFPLUMBER_AVAILABLE:
+        extractors.append("pdfplumber")
+    extractors.append("pypdf")
+    return extractors
+
+def _extractor_order() -> List[str]:
+    """Extractors to try in turn: the fast path, then pdfplumber and pypdf if it cannot open the file"""
+    return [name for name in available_extractors() if name != "pymupdf"]
+
+def _extract_page_range(extractor: str, pdf_path: str, start: int, end: int) -> List[Tuple[str, float, str]]:
+    """Text, extraction seconds and extractor of pages [start, end); runs in a worker process with its own file handle"""
+    return list(_EXTRACTORS[extractor](pdf_path, start, end))
+
+def extract_pages(pdf_path: str, extractor: str, max_pages: Optional[int] = None) -> List[Tuple[str, float, str]]:
+    """Pages extracted serially with one named extractor, without OCR or the page store (for benchmarks)"""
+    page_count = _page_count(pdf_path)
+    return _extract_page_range(extractor, pdf_path, 0, min(page_count, max_pages) if max_pages else page_count)
+
+def _page_count(pdf_path: str) -> int:
+    if FITZ_AVAILABLE:
+        try:
+            with fitz.open(pdf_path) as doc:
+                return len(doc)
+        except Exception as e:
+            logger.warning(f"⚠️ PyMuPDF could not open {pdf_path}: {e}")
+    try:
+        return len(PdfReader(pdf_path).pages)
+    except Exception:
+        if not PDFPLUMBER_AVAILABLE:
+            raise
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+# Selective OCR: only pages with (almost) no text layer that are mostly covered
+# by images are rendered and sent to tesseract
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng+hin")
+OCR_MAX_TEXT_CHARS = 50  # A page with more text-layer characters is not image-only
+OCR_MIN_IMAGE_COVERAGE = 0.3  # Fraction of the page area covered by images
+
+def _classify_page(doc, page_num: int, page_text: str) -> str:
+    if len((page_text or "").strip()) > OCR_MAX_TEXT_CHARS:
+        return "text"
+    page = doc.load_page(page_num)
+    page_area = abs(page.rect) or 1.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return "image_only" if covered / page_area >= OCR_MIN_IMAGE_COVERAGE else "blank"
+
+def classify_pages(pdf_path: str, pages: List[str]) -> List[str]:
+    """
+    Classify each page as "text", "image_only" or "blank" from the length of
+    its extracted text layer and the share of the page covered by images
+    (image placements from fitz; nothing is rendered or decoded)
+    """
+    with fitz.open(pdf_path) as doc:
+        return [_classify_page(doc, page_num, page_text) for page_num, page_text in enumerate(pages)]
+
+_installed_languages = None
+
+def _ocr_languages(requested: str) -> str:
+    """Requested tesseract languages that are installed (falls back to eng)"""
+    global _installed_languages
+    if _installed_languages is None:
+        try:
+            _installed_languages = set(pytesseract.get_languages(config=""))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not list tesseract languages: {e}")
+            _installed_languages = set()
+    available = [lang for lang in requested.split("+") if not _installed_languages or lang in _installed_languages]
+    missing = set(requested.split("+")) - set(available)
+    if missing:
+        logger.warning(f"⚠️ Tesseract language packs not installed: {', '.join(sorted(missing))}")
+    return "+".join(available) or "eng"
+
+def _ocr_page(pdf_path: str, page_num: int, dpi: int, languages: str) -> Tuple[str, float]:
+    """Render one page and OCR it; runs in an extraction worker process"""
+    page_start = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        pixmap = doc.load_page(page_num).get_pixmap(dpi=dpi)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return pytesseract.image_to_string(image, lang=languages), time.perf_counter() - page_start
+
+def _file_sha256(pdf_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+class OcrPageCache:
+    """
+    OCR text per (file SHA-256, page, DPI, languages) in SQLite, zlib-compressed,
+    so re-analyzing a scanned DPR skips tesseract
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_pages (
+                    key TEXT PRIMARY KEY,
+                    text BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # Short-lived connections: the cache is used from request threads and forked workers
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(file_hash: str, page_num: int, dpi: int, languages: str) -> str:
+        return f"{file_hash}:{page_num}:{dpi}:{languages}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT key, text FROM ocr_pages WHERE key IN ({','.join('?' * len(keys))})",
+                                keys).fetchall()
+        return {key: zlib.decompress(text).decode("utf-8") for key, text in rows}
+
+    def put(self, key: str, text: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO ocr_pages (key, text, created_at) VALUES (?, ?, ?)",
+                         (key, zlib.compress(text.encode("utf-8")), time.time()))
+
+_ocr_cache = None
+
+def ocr_page_cache() -> Optional[OcrPageCache]:
+    """OCR cache in OCR_CACHE_DIR (default Backend/ocr_cache/); None if it cannot be opened"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        cache_dir = os.getenv("OCR_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_cache"))
+        try:
+            _ocr_cache = OcrPageCache(os.path.join(cache_dir, "ocr_pages.sqlite"))
+        except Exception as e:
+            logger.warning(f"⚠️ OCR cache unavailable: {e}")
+            return None
+    return _ocr_cache
+
+def _ocr_image_pages(pdf_path: str, pages: List[str], page_seconds: List[float],
+                     workers: int, file_hash: Optional[str] = None) -> List[int]:
+    """
+    OCR the image-only pages in place (pages / page_seconds) on the extraction
+    pool; cached pages are not OCRed again. Returns the 0-based indexes of OCRed pages.
+    """
+    image_pages = [i for i, kind in enumerate(classify_pages(pdf_path, pages)) if kind == "image_only"]
+    if not image_pages:
+        return []
+
+    languages = _ocr_languages(OCR_LANGUAGES)
+    cache = ocr_page_cache()
+    if cache and not file_hash:
+        file_hash = _file_sha256(pdf_path)
+    keys = {i: OcrPageCache.key(file_hash, i, OCR_DPI, languages) for i in image_pages} if cache else {}
+    cached = cache.get_many(list(keys.values())) if cache else {}
+
+    todo = [i for i in image_pages if keys.get(i) not in cached]
+    for i in image_pages:
+        if i not in todo:
+            pages[i] = cached[keys[i]]
+
+    pool = _extraction_pool() if not mp.current_process().daemon else None
+    if workers > 1 and len(todo) > 1 and pool is not None:
+        futures = {i: pool.submit(_ocr_page, pdf_path, i, OCR_DPI, languages) for i in todo}
+        run = lambda i: futures[i].result()
+    else:
+        run = lambda i: _ocr_page(pdf_path, i, OCR_DPI, languages)
+
+    ocr_pages = [i for i in image_pages if i not in todo]
+    for i in todo:
+        try:
+            text, seconds = run(i)
+        except BrokenProcessPool:
+            _discard_extraction_pool()
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ OCR failed for page {i + 1}: {e}")
+            continue
+        pages[i] = text
+        page_seconds[i] += seconds
+        ocr_pages.append(i)
+        if cache:
+            cache.put(keys[i], text)
+    return sorted(ocr_pages)
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _init_extraction_worker():
+    # One tesseract thread per worker; parallelism comes from the pool
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def start_extraction_pool(workers: Optional[int] = None) -> bool:
+    """
+    Fork the shared pool of extraction processes. Call once from the server's
+    main thread at startup, before any other thread exists: a child forked
+    while another thread holds a lock (logging, sqlite, torch) can block on it
+    forever. Workers are forked rather than spawned, since spawn would
+    re-import the app's main module in every worker. Without a started pool,
+    extraction and OCR run serially. Returns whether the pool is running.
+    """
+    global _pool, _pool_workers
+    workers = extraction_workers() if workers is None else workers
+    if workers <= 1 or "fork" not in mp.get_all_start_methods():
+        return False
+    with _pool_lock:
+        if _pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"),
+                                       initializer=_init_extraction_worker)
+            # With fork, the first task makes the executor start every worker, here and now
+            pool.submit(os.getpid).result()
+            _pool, _pool_workers = pool, workers
+    return True
+
+def _extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """The pool started by start_extraction_pool; None when extraction runs serially"""
+    with _pool_lock:
+        return _pool
+
+def _discard_extraction_pool():
+    """Drop a broken pool for good; it is never re-forked from a worker thread"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            logger.warning("⚠️ An extraction worker crashed; extracting serially from now on")
+        _pool = None
+
+def _run_extractor(extractor: str, pdf_path: str, page_count: int, workers: int) -> Tuple[List[Tuple[str, float, str]], int]:
+    """
+    Extract pages [0, page_count) in order, sharded over worker processes for
+    long documents. Shards are smaller than page_count / workers so workers
+    that finish early pick up more. Returns per-page results and the worker count used.
+    Raises when a worker crashes, so extract_document moves on to the next extractor.
+    """
+    # Scoring pool workers inherit the server's pool object but not its processes
+    pool = _extraction_pool() if not mp.current_process().daemon else None
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES or pool is None:
+        return _extract_page_range(extractor, pdf_path, 0, page_count), 1
+
+    workers = min(workers, _pool_workers)
+    shard_size = max(MIN_SHARD_PAGES, math.ceil(page_count / (workers * 4)))
+    shards = [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+    try:
+        futures = [pool.submit(_extract_page_range, extractor, pdf_path, start, end) for start, end in shards]
+        return [page for future in futures for page in future.result()], min(workers, len(shards))
+    except BrokenProcessPool:
+        # A worker died (e.g. a crashing page); don't retry the same pages in this process
+        _discard_extraction_pool()
+        raise
+
+# Bump when extraction output changes so stored pages are not reused
+EXTRACTOR_VERSION = "2"
+
+def extractor_version() -> str:
+    """Identifies everything that shapes extracted pages: code version and OCR settings"""
+    return f"{EXTRACTOR_VERSION}:ocr={OCR_AVAILABLE and FITZ_AVAILABLE}:{OCR_DPI}:{OCR_LANGUAGES}"
+
+_page_store = None
+_page_store_opened = False
+
+def page_store():
+    """Shared page store (None when disabled or unavailable)"""
+    global _page_store, _page_store_opened
+    if not _page_store_opened:
+        _page_store = create_page_store()
+        _page_store_opened = True
+    return _page_store
+
+def _load_stored_document(pdf_path: str, file_hash: str, max_pages: Optional[int]) -> Optional[ExtractedDocument]:
+    store = page_store()
+    try:
+        stored = store.get(file_hash, extractor_version(), max_pages) if store else None
+    except Exception as e:
+        logger.warning(f"⚠️ Page store read failed: {e}")
+        return None
+    if stored is None:
+        return None
+    return ExtractedDocument(pdf_path, stored.pages, stored.metadata, stored.extractor,
+                             page_seconds=[0.0] * len(stored.pages),
+                             page_extractors=stored.page_extractors,
+                             ocr_pages=[i + 1 for i, ocr in enumerate(stored.ocr) if ocr],
+                             from_store=True)
+
+def _store_document(document: ExtractedDocument, file_hash: str):
+    store = page_store()
+    if not store:
+        return
+    ocr = set(document.ocr_pages)
+    try:
+        store.put(file_hash, extractor_version(), StoredPages(
+            document.pages, document.extractor, document.metadata,
+            ocr=[page in ocr for page in range(1, document.page_count + 1)],
+            page_extractors=document.page_extractors
+        ))
+    except Exception as e:
+        logger.warning(f"⚠️ Page store write failed: {e}")
+
+def extract_document(pdf_path: str, max_pages: Optional[int] = None, verbose: bool = False,
+                     workers: Optional[int] = None) -> ExtractedDocument:
+    """
+    Extract per-page text with the PyMuPDF fast path (pages failing the
+    text quality checks escalated to pdfplumber), falling back to
+    pdfplumber, then pypdf, when PyMuPDF cannot read the file.
+    max_pages limits extraction to the first N pages. Long documents are
+    extracted page-parallel by workers processes (default extraction_workers()).
+    Image-only pages (scanned annexures) are then OCRed on the same pool.
+    
+    Complete extractions are kept in the page store by file SHA-256, so later
+    analyses of the same file (scoring, risk analysis, re-scoring) skip
+    parsing and OCR.
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+    file_hash = _file_sha256(pdf_path) if page_store() else None
+    if file_hash:
+        start = time.perf_counter()
+        document = _load_stored_document(pdf_path, file_hash, max_pages)
+        if document is not None:
+            document.extraction_seconds = time.perf_counter() - start
+            if verbose:
+                logger.info(f"✅ Loaded {document.page_count} stored pages in {document.extraction_seconds:.3f}s")
+            return document
+
+    extractors = _extractor_order()
+    workers = extraction_workers() if workers is None else workers
+    try:
+        total_pages = _page_count(pdf_path)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not count PDF pages: {e}")
+        total_pages = 0
+    page_count = min(total_pages, max_pages) if max_pages else total_pages
+
+    pages: List[str] = []
+    for name in extractors:
+        start = time.perf_counter()
+        try:
+            results, used_workers = _run_extractor(name, pdf_path, page_count, workers)
+        except Exception as e:
+            logger.warning(f"⚠️ {name} failed: {e}")
+            continue
+        pages = [text for text, _, _ in results]
+        page_seconds = [seconds for _, seconds, _ in results]
+        ocr_pages = []
+        if FITZ_AVAILABLE and OCR_AVAILABLE:
+            try:
+                ocr_pages = _ocr_image_pages(pdf_path, pages, page_seconds, workers, file_hash)
+            except Exception as e:
+                logger.warning(f"⚠️ OCR of image-only pages failed: {e}")
+        if any(page.strip() for page in pages):
+            document = ExtractedDocument(pdf_path, pages, _read_metadata(pdf_path), name,
+                                         page_seconds=page_seconds,
+                                         page_extractors=[page_extractor for _, _, page_extractor in results],
+                                         extraction_seconds=time.perf_counter() - start,
+                                         workers=used_workers,
+                                         ocr_pages=[i + 1 for i in ocr_pages])
+            if file_hash and document.page_count == total_pages:
+                # Only complete documents are stored; max_pages reads are served from them
+                _store_document(document, file_hash)
+            if verbose:
+                logger.info(f"✅ Text extracted using {name}: {len(document.text)} chars from {document.page_count} pages "
+                            f"in {document.extraction_seconds:.2f}s ({used_workers} workers)")
+            return document
+
+    logger.error(f"❌ All text extraction methods failed for {pdf_path}")
+    return ExtractedDocument(pdf_path, pages, _read_metadata(pdf_path), "none")
+
+def _ocr_streamed_page(pdf_path: str, page_num: int, file_hash: Optional[str]) -> Optional[Tuple[str, float]]:
+    """OCR text and seconds of one image-only page, from the OCR cache when possible"""
+    languages = _ocr_languages(OCR_LANGUAGES)
+    cache = ocr_page_cache()
+    key = None
+    if cache:
+        key = OcrPageCache.key(file_hash or _file_sha256(pdf_path), page_num, OCR_DPI, languages)
+        cached = cache.get_many([key])
+        if key in cached:
+            return cached[key], 0.0
+    try:
+        text, seconds = _ocr_page(pdf_path, page_num, OCR_DPI, languages)
+    except Exception as e:
+        logger.warning(f"⚠️ OCR failed for page {page_num + 1}: {e}")
+        return None
+    if cache:
+        cache.put(key, text)
+    return text, seconds
+
+def _iter_extracted_pages(pdf_path: str, max_pages: Optional[int], file_hash: Optional[str]) -> Iterator[Page]:
+    try:
+        total_pages = _page_count(pdf_path)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not count PDF pages: {e}")
+        total_pages = 0
+    page_count = min(total_pages, max_pages) if max_pages else total_pages
+
+    # Complete passes are written to the page store page by page
+    store = page_store() if file_hash and page_count == total_pages else None
+    writer = None
+    if store:
+        try:
+            writer = store.writer(file_hash, extractor_version())
+        except Exception as e:
+            logger.warning(f"⚠️ Page store write failed: {e}")
+
+    ocr_doc = None
+    if FITZ_AVAILABLE and OCR_AVAILABLE:
+        try:
+            ocr_doc = fitz.open(pdf_path)  # Kept open to classify pages as they are extracted
+        except Exception as e:
+            logger.warning(f"⚠️ OCR of image-only pages failed: {e}")
+    page_num, first_extractor, has_text = 0, None, False
+    try:
+        for name in _extractor_order():
+            try:
+                # After a failure the next extractor resumes at the failing page
+                for text, seconds, page_extractor in _EXTRACTORS[name](pdf_path, page_num, page_count):
+                    ocr = False
+                    if ocr_doc is not None and _classify_page(ocr_doc, page_num, text) == "image_only":
+                        result = _ocr_streamed_page(pdf_path, page_num, file_hash)
+                        if result is not None:
+                            text, seconds, ocr = result[0], seconds + result[1], True
+                    if writer:
+                        try:
+                            writer.add(text, page_extractor, ocr=ocr)
+                        except Exception as e:
+                            logger.warning(f"⚠️ Page store write failed: {e}")
+                            writer.abort()
+                            writer = None
+                    first_extractor = first_extractor or name
+                    has_text = has_text or bool(text.strip())
+                    page_num += 1
+                    yield Page(page_num, text, page_extractor, seconds, ocr)
+            except Exception as e:
+                logger.warning(f"⚠️ {name} failed at page {page_num + 1}: {e}")
+                continue
+            break
+    finally:
+        if ocr_doc is not None:
+            ocr_doc.close()
+        if writer:
+            if page_num == page_count and has_text:
+                try:
+                    store.commit(file_hash, extractor_version(), writer, first_extractor, _read_metadata(pdf_path))
+                except Exception as e:
+                    logger.warning(f"⚠️ Page store write failed: {e}")
+            else:
+                # Stopped early, or nothing usable to store
+                writer.abort()
+    if page_num < page_count:
+        logger.error(f"❌ All text extraction methods failed for {pdf_path} at page {page_num + 1}")
+
+def iter_pages(pdf_path: str, max_pages: Optional[int] = None) -> Iterator[Page]:
+    """
+    Yield a document's pages one at a time, so a consumer holds one page
+    instead of the whole document.
+
+    Stored documents are read page by page from the memory-mapped page file.
+    Otherwise the PDF is parsed in this process with the first extractor that
+    works (the next one takes over from a failing page), image-only pages
+    are OCRed as they come, and a complete pass is written to the page store
+    as it goes. Use extract_document when every page is needed at once: it
+    extracts and OCRs long documents in parallel.
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+    store = page_store()
+    file_hash = _file_sha256(pdf_path) if store else None
+    page_file = None
+    if file_hash:
+        try:
+            page_file = store.open(file_hash, extractor_version())
+        except Exception as e:
+            logger.warning(f"⚠️ Page store read failed: {e}")
+    if page_file is None:
+        yield from _iter_extracted_pages(pdf_path, max_pages, file_hash)
+        return
+
+    with page_file:
+        for i in range(len(page_file) if not max_pages else min(len(page_file), max_pages)):
+            entry = page_file.entry(i)
+            yield Page(i + 1, page_file.page(i), entry["extractor"], ocr=entry["ocr"])
@@ -0,0 +1,96 @@
+"""
+Analysis Progress Events
+In-process publish/subscribe of per-upload analysis stages, streamed to the
+Dashboard as server-sent events (SSE)
+"""
+
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+
+# Stages emitted for every analysis, in pipeline order
+ANALYSIS_STAGES = [
+    "extracted", "completeness", "technical", "gatishakti",
+    "impact", "compliance", "risk", "stored"
+]
+TERMINAL_STAGES = {"stored", "error"}
+
+class ProgressBroker:
+    """
+    Keeps a short event log per upload and wakes up subscribers on publish.
+
+    Events live in process memory, so producers and SSE subscribers must be
+    served by the same process. Logs of finished uploads are dropped after
+    retention_seconds.
+    """
+
+    def __init__(self, retention_seconds: float = 600.0, heartbeat_seconds: float = 15.0):
+        self.retention_seconds = retention_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._events: Dict[str, List[Dict[str, Any]]] = {}
+        self._finished_at: Dict[str, float] = {}
+        self._condition = threading.Condition()
+
+    def publish(self, upload_id: str, stage: str, data: Optional[Dict[str, Any]] = None):
+        """Record a stage event for an upload and notify subscribers"""
+        with self._condition:
+            self._prune()
+            events = self._events.setdefault(upload_id, [])
+            if stage not in TERMINAL_STAGES and upload_id in self._finished_at:
+                # A re-analysis of a finished upload starts a fresh log
+                events.clear()
+                del self._finished_at[upload_id]
+            events.append({
+                "id": len(events) + 1,
+                "stage": stage,
+                "data": data or {},
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            if stage in TERMINAL_STAGES:
+                self._finished_at[upload_id] = time.time()
+            self._condition.notify_all()
+
+    def callback_for(self, upload_id: str):
+        """Return a progress_callback(stage, data) bound to an upload"""
+        return lambda stage, data=None: self.publish(upload_id, stage, data)
+
+    def has_events(self, upload_id: str) -> bool:
+        with self._condition:
+            return bool(self._events.get(upload_id))
+
+    def subscribe(self, upload_id: str, last_event_id: int = 0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events after last_event_id until a terminal stage is reached.
+        Yields None when heartbeat_seconds pass without a new event.
+        """
+        while True:
+            with self._condition:
+                pending = [e for e in self._events.get(upload_id, []) if e["id"] > last_event_id]
+                if not pending:
+                    self._condition.wait(timeout=self.heartbeat_seconds)
+                    pending = [e for e in self._events.get(upload_id, []) if e["id"] > last_event_id]
+
+            if not pending:
+                yield None
+                continue
+
+            for event in pending:
+                last_event_id = event["id"]
+                yield event
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for upload_id, finished_at in list(self._finished_at.items()):
+            if finished_at < cutoff:
+                self._events.pop(upload_id, None)
+                del self._finished_at[upload_id]
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Serialize an event (or a heartbeat for None) in text/event-stream format"""
+    if event is None:
+        return ": heartbeat\n\n"
+    return f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,183 @@
+"""
+Similar Project Index
+Flat vector index over document- and section-level embeddings of every
+analyzed upload, used to flag DPRs that duplicate an existing project
+"""
+
+import os
+import json
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class ProjectIndex:
+    """
+    Exact (flat) cosine-similarity index persisted to disk.
+
+    Each upload contributes one row per vector kind: "document" plus one
+    "section:<name>" row per DPR section with matching text. Vectors are
+    L2-normalized and stored as float16 in vectors.npy with a parallel
+    entries.json of (upload_id, kind). A lookup is a single matrix-vector
+    product, which stays in the millisecond range for tens of thousands of rows.
+
+    Several processes (WSGI workers) share one index directory. Each used to
+    rewrite both files from its own in-memory copy, so the last writer
+    silently dropped the uploads the others had added. Every write now holds
+    an exclusive lock on index.lock and re-reads the files before applying
+    its change; reads take a shared lock and reload when the files changed.
+    """
+
+    def __init__(self, index_dir: str, model_name: str):
+        self.model_name = model_name
+        slug = model_name.replace("/", "__")
+        self.index_dir = os.path.join(index_dir, slug)
+        self.vectors_path = os.path.join(self.index_dir, "vectors.npy")
+        self.entries_path = os.path.join(self.index_dir, "entries.json")
+        self.lock_path = os.path.join(self.index_dir, "index.lock")
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[List[str]] = []  # [upload_id, kind] per row
+        self._loaded_stamp = None  # (mtime_ns, size) of entries.json when last read
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._load()
+        if self._entries:
+            logger.info(f"✅ Loaded project index with {len(self.upload_ids())} projects")
+
+    @contextmanager
+    def _file_lock(self, mode: int):
+        """Cross-process lock on the index directory (shared for reads, exclusive for writes)"""
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _disk_stamp(self):
+        try:
+            stat = os.stat(self.entries_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        """Re-read the index from disk if another process has rewritten it; caller holds both locks"""
+        stamp = self._disk_stamp()
+        if stamp is None or stamp == self._loaded_stamp:
+            return
+        try:
+            vectors = np.load(self.vectors_path)
+            with open(self.entries_path, "r") as f:
+                entries = json.load(f)
+            if len(entries) != len(vectors):
+                raise ValueError("vectors and entries are out of sync")
+            self._vectors, self._entries = vectors, entries
+            self._loaded_stamp = stamp
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load project index, keeping the in-memory copy: {e}")
+
+    def _save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_vectors = f"{self.vectors_path}.tmp.npy"
+        tmp_entries = f"{self.entries_path}.tmp"
+        np.save(tmp_vectors, self._vectors)
+        with open(tmp_entries, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_entries, self.entries_path)
+        self._loaded_stamp = self._disk_stamp()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def upload_ids(self) -> set:
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._load()
+        return {upload_id for upload_id, _ in self._entries}
+
+    def add(self, upload_id: str, vectors: Dict[str, Any]):
+        """Index an upload's vectors, replacing any previous entry for it"""
+        rows = [(kind, self._normalize(vector)) for kind, vector in vectors.items()]
+        if not rows:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._load()  # Merge into what other processes have written since
+            self._remove_rows(upload_id)
+            new_vectors = np.stack([vector for _, vector in rows]).astype(np.float16)
+            self._vectors = new_vectors if self._vectors is None else np.vstack([self._vectors, new_vectors])
+            self._entries.extend([upload_id, kind] for kind, _ in rows)
+            self._save()
+
+    def remove(self, upload_id: str):
+        """Drop an upload from the index"""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._load()
+            if self._remove_rows(upload_id):
+                self._save()
+
+    def _remove_rows(self, upload_id: str) -> bool:
+        keep = [i for i, (entry_id, _) in enumerate(self._entries) if entry_id != upload_id]
+        if self._vectors is None or len(keep) == len(self._entries):
+            return False
+        self._vectors = self._vectors[keep]
+        self._entries = [self._entries[i] for i in keep]
+        return True
+
+    def search(self, vectors: Dict[str, Any], k: int = 5, exclude_upload_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k most similar indexed uploads by document-level cosine similarity,
+        with per-section similarities for sections both documents contain
+        """
+        if "document" not in vectors:
+            return []
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._load()
+            if self._vectors is None or not len(self._entries):
+                return []
+            matrix, entries = self._vectors, list(self._entries)
+
+        kinds = np.array([kind for _, kind in entries])
+        upload_ids = np.array([upload_id for upload_id, _ in entries])
+        document_rows = np.flatnonzero((kinds == "document") & (upload_ids != exclude_upload_id))
+        if not len(document_rows):
+            return []
+
+        scores = matrix[document_rows].astype(np.float32) @ self._normalize(vectors["document"])
+        top = np.argsort(-scores)[:k]
+
+        results = []
+        for position in top:
+            upload_id = upload_ids[document_rows[position]]
+            section_similarity = {}
+            for row in np.flatnonzero(upload_ids == upload_id):
+                kind = kinds[row]
+                if kind != "document" and kind in vectors:
+                    section = kind.split(":", 1)[1]
+                    section_similarity[section] = round(float(matrix[row].astype(np.float32) @ self._normalize(vectors[kind])), 4)
+            results.append({
+                "upload_id": str(upload_id),
+                "similarity": round(float(scores[position]), 4),
+                "section_similarity": section_similarity
+            })
+        return results
+
+def create_project_index(model_name: Optional[str]) -> Optional[ProjectIndex]:
+    """Build the index under PROJECT_INDEX_DIR (default Backend/project_index); None if unusable"""
+    if not model_name:
+        return None
+    index_dir = os.getenv("PROJECT_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "project_index"))
+    try:
+        return ProjectIndex(index_dir, model_name)
+    except Exception as e:
+        logger.warning(f"⚠️ Similar project index disabled: {e}")
+        return None
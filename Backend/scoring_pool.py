@@ -0,0 +1,269 @@
+"""
+Pre-forked Scoring Worker Pool
+Loads the NLP models once in the parent process and forks scoring workers
+that share the weights copy-on-write
+"""
+
+import gc
+import os
+import itertools
+import logging
+import threading
+import traceback
+import multiprocessing as mp
+from concurrent.futures import Future
+from queue import Empty
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Scorer handed to forked children; set in the parent right before forking
+_worker_scorer = None
+
+def _worker_main(task_queue, result_queue, current_task, torch_threads: Optional[int]):
+    """Worker loop: take (task_id, pdf_path, document, wants_progress, tier) tasks and post results"""
+    # Parent called gc.freeze() before forking; re-enable collection for new objects only
+    gc.enable()
+
+    scorer = _worker_scorer
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    # HTTP clients must not be shared across fork; give each worker its own
+    scorer._init_gemini_client(getattr(scorer, 'gemini_api_key', None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        task_id, pdf_path, document, wants_progress, tier = task
+        # Shared memory, so the parent knows which task was lost if we crash
+        current_task.value = task_id
+        progress_callback = None
+        if wants_progress:
+            # Callbacks can't cross the process boundary; forward stages as messages
+            progress_callback = lambda stage, data=None, task_id=task_id: result_queue.put(("progress", task_id, (stage, data)))
+        try:
+            result = scorer.analyze_dpr_pdf(pdf_path, verbose=False, document=document,
+                                            progress_callback=progress_callback, tier=tier)
+            result_queue.put(("done", task_id, result))
+        except Exception as e:
+            result_queue.put(("error", task_id, f"{e}\n{traceback.format_exc()}"))
+        current_task.value = 0
+
+    # Flush queued results before the process exits
+    result_queue.close()
+    result_queue.join_thread()
+
+def _supervisor_main(task_queue, result_queue, lost_queue, stopping, num_workers: int,
+                     torch_threads: Optional[int]):
+    """
+    Forks the scoring workers and replaces any that die. The supervisor is
+    forked once by start() and stays single-threaded, so replacement workers
+    are never forked from the API process, whose other threads may hold
+    locks (logging, torch, sqlite) that a child would inherit held.
+    Tasks that die with a worker are reported on lost_queue, a SimpleQueue
+    (no feeder thread).
+    """
+    ctx = mp.get_context("fork")
+    workers = {}  # pid -> shared id of the task the worker is running
+
+    def spawn():
+        current_task = ctx.Value("q", 0, lock=False)
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _worker_main(task_queue, result_queue, current_task, torch_threads)
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        workers[pid] = current_task
+
+    for _ in range(num_workers):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        current_task = workers.pop(pid, None)
+        if current_task is None:
+            continue
+        exit_code = os.waitstatus_to_exitcode(status)
+        if current_task.value:
+            lost_queue.put((current_task.value, pid, exit_code))
+        if not stopping.value:
+            logger.error(f"❌ Scoring worker {pid} exited with code {exit_code}; restarting")
+            spawn()
+
+class ScoringWorkerPool:
+    """
+    Process pool of forked EnhancedDPRScorer workers.
+
+    The parent owns the fully initialized scorer (SentenceTransformer, spaCy and
+    precomputed criteria embeddings). Workers are forked from it, so model
+    weights are shared copy-on-write instead of being loaded once per process.
+    Tasks are sent over a multiprocessing queue; results come back on another
+    queue and resolve the Future returned by submit().
+
+    Workers are children of a single-threaded supervisor process, which
+    replaces crashed workers. If the supervisor itself dies the pool is
+    marked unhealthy, pending tasks fail and callers score inline instead.
+    """
+
+    def __init__(self, scorer, num_workers: int = 2, torch_threads: Optional[int] = None):
+        if "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("Process-pool scoring requires the 'fork' start method (Linux/macOS)")
+
+        self.scorer = scorer
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // num_workers)
+
+        self._ctx = mp.get_context("fork")
+        self._task_queue = self._ctx.Queue()
+        self._result_queue = self._ctx.Queue()
+        self._lost_queue = self._ctx.SimpleQueue()  # (task id, worker pid, exit code) of crashed workers
+        self._stopping = self._ctx.Value("b", 0, lock=False)
+        self._supervisor = None
+        self._futures: Dict[int, Future] = {}
+        self._progress_callbacks: Dict[int, Callable] = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count(1)
+        self._closed = False
+        self._collector = None
+
+    def start(self) -> "ScoringWorkerPool":
+        """Fork the workers and start collecting their results"""
+        global _worker_scorer
+        _worker_scorer = self.scorer
+
+        # Move everything allocated so far (models included) into the permanent
+        # GC generation so collections in the children don't dirty shared pages
+        gc.collect()
+        gc.freeze()
+
+        self._supervisor = self._ctx.Process(
+            target=_supervisor_main,
+            args=(self._task_queue, self._result_queue, self._lost_queue, self._stopping,
+                  self.num_workers, self.torch_threads),
+            name="dpr-scoring-supervisor",
+            daemon=True
+        )
+        self._supervisor.start()
+
+        self._collector = threading.Thread(target=self._collect_results, name="scoring-pool-collector", daemon=True)
+        self._collector.start()
+
+        logger.info(f"✅ Scoring worker pool started with {self.num_workers} workers "
+                    f"({self.torch_threads} torch threads each)")
+        return self
+
+    def submit(self, pdf_path: str, document=None, progress_callback: Optional[Callable] = None,
+               tier: str = "full") -> Future:
+        """Queue a scoring task; the Future resolves to the analyze_dpr_pdf result"""
+        if self._closed:
+            raise RuntimeError("Scoring worker pool has been shut down")
+        if not self.healthy:
+            raise RuntimeError("Scoring worker pool supervisor is not running")
+
+        future = Future()
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._futures[task_id] = future
+            if progress_callback:
+                self._progress_callbacks[task_id] = progress_callback
+        self._task_queue.put((task_id, pdf_path, document, progress_callback is not None, tier))
+        return future
+
+    def analyze_dpr_pdf(self, pdf_path: str, verbose: bool = False, document=None,
+                        progress_callback: Optional[Callable] = None, tier: str = "full") -> Dict[str, Any]:
+        """Blocking call with the same signature as EnhancedDPRScorer.analyze_dpr_pdf"""
+        return self.submit(pdf_path, document, progress_callback, tier).result()
+
+    def _collect_results(self):
+        while not self._closed:
+            self._fail_lost_tasks()
+            try:
+                kind, task_id, payload = self._result_queue.get(timeout=1.0)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "progress":
+                with self._lock:
+                    callback = self._progress_callbacks.get(task_id)
+                if callback:
+                    try:
+                        callback(*payload)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Progress callback failed: {e}")
+                continue
+
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+                self._progress_callbacks.pop(task_id, None)
+
+            if future is None:
+                continue
+            if kind == "done":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"Scoring worker failed: {payload}"))
+
+    @property
+    def healthy(self) -> bool:
+        """False once the supervisor has died; workers are then no longer replaced"""
+        return self._supervisor is not None and self._supervisor.is_alive()
+
+    def _fail_lost_tasks(self):
+        """Fail tasks owned by crashed workers; fail everything if the supervisor is gone"""
+        while not self._lost_queue.empty():
+            task_id, pid, exit_code = self._lost_queue.get()
+            self._fail_task(task_id, f"Scoring worker {pid} died during analysis (exit code {exit_code})")
+
+        if not self._closed and self._supervisor is not None and not self._supervisor.is_alive():
+            logger.error(f"❌ Scoring supervisor exited with code {self._supervisor.exitcode}; "
+                         f"pool disabled, scoring inline")
+            with self._lock:
+                task_ids = list(self._futures)
+            for task_id in task_ids:
+                self._fail_task(task_id, "Scoring worker pool supervisor died")
+
+    def _fail_task(self, task_id: int, message: str):
+        with self._lock:
+            future = self._futures.pop(task_id, None)
+            self._progress_callbacks.pop(task_id, None)
+        if future is not None:
+            future.set_exception(RuntimeError(message))
+
+    @property
+    def depth(self) -> int:
+        """Number of tasks queued or running in the pool"""
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop all workers"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.value = 1
+        for _ in range(self.num_workers):
+            self._task_queue.put(None)
+        if self._supervisor is not None:
+            # The supervisor exits once all workers have finished
+            self._supervisor.join(timeout)
+            if self._supervisor.is_alive():
+                self._supervisor.terminate()
+        with self._lock:
+            for future in self._futures.values():
+                future.set_exception(RuntimeError("Scoring worker pool shut down"))
+            self._futures.clear()
+            self._progress_callbacks.clear()
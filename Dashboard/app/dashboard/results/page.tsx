@@ -174,14 +174,14 @@ export default function ResultsPage() {
     console.log('Capabilities from API:', scoreAnalysis.capabilities)
     
     // Check if this is enhanced analysis
-    if (scoreAnalysis.analysis_type !== 'enhanced' || !scoreAnalysis.breakdown) return null
+    if (!scoreAnalysis.analysis_type?.startsWith('enhanced') || !scoreAnalysis.breakdown) return null
 
     return {
       total_score: scoreAnalysis.total_score,
       max_score: scoreAnalysis.max_score || 100.0,
       percentage: scoreAnalysis.percentage,
       breakdown: scoreAnalysis.breakdown,
-      analysis_type: "enhanced",
+      analysis_type: scoreAnalysis.analysis_type,
       capabilities: scoreAnalysis.capabilities || {
         nlp_available: true,
         semantic_available: true,
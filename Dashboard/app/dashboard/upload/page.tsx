@@ -11,7 +11,7 @@ import { Label } from "@/components/ui/label"
 import { Progress } from "@/components/ui/progress"
 import { useApp } from "@/providers/app-provider"
 import * as api from "@/lib/api"
-import type { LanguageOption } from "@/lib/types"
+import type { AnalysisStage, LanguageOption, ProcessingResult } from "@/lib/types"
 
 const steps = [
   "Document Processing (OCR + NLP)",
@@ -22,6 +22,18 @@ const steps = [
   "Results Ready",
 ] as const
 
+// Backend analysis stage -> [pipeline step, progress %]
+const stageProgress: Partial<Record<AnalysisStage, [number, number]>> = {
+  extracted: [0, 20],
+  completeness: [1, 35],
+  technical: [2, 50],
+  gatishakti: [2, 60],
+  risk: [3, 75],
+  impact: [4, 85],
+  compliance: [4, 90],
+  stored: [5, 100],
+}
+
 export default function UploadPage() {
   const { addDpr, setResult, defaultLanguage } = useApp()
   const [file, setFile] = useState<File | null>(null)
@@ -30,6 +42,7 @@ export default function UploadPage() {
   const [currentStep, setCurrentStep] = useState<number>(0)
   const [progress, setProgress] = useState(0)
   const [busy, setBusy] = useState(false)
+  const [error, setError] = useState<string | null>(null)
   const router = useRouter()
 
   const canSubmit = useMemo(() => !!file && !busy, [file, busy])
@@ -37,21 +50,46 @@ export default function UploadPage() {
   async function handleUpload() {
     if (!file) return
     setBusy(true)
+    setError(null)
     setCurrentStep(0)
     setProgress(10)
 
     const { uploadId, dpr } = await api.uploadFile(file, language)
     addDpr({ ...dpr, status: "processing" })
 
-    // Simulate step progression matching the mermaid flow
-    await tick(0, 20) // Document Processing
-    await tick(1, 40) // Component Validation
-    await tick(2, 60) // Scoring & Eligibility
-    await tick(3, 75) // Consistency & Risk
-    await tick(4, 90) // Impact & Final Score
+    // Follow the backend pipeline stages as they complete
+    const outcome = await api.waitForAnalysis(uploadId, (event) => {
+      const step = stageProgress[event.stage]
+      if (!step) return
+      setCurrentStep((prev) => Math.max(prev, step[0]))
+      setProgress((prev) => Math.max(prev, step[1]))
+    })
+
+    let result: ProcessingResult
+    if (outcome.status === "completed") {
+      const stored = await api.getResults(uploadId)
+      if (!stored) {
+        setError("Analysis finished but its results could not be loaded.")
+        setBusy(false)
+        return
+      }
+      result = stored
+    } else if (outcome.status === "error") {
+      // Real analysis failure: report it instead of showing simulated scores
+      setError(`Analysis failed: ${outcome.error}`)
+      setBusy(false)
+      return
+    } else {
+      // Backend unavailable: simulate step progression matching the mermaid flow
+      await tick(0, 20) // Document Processing
+      await tick(1, 40) // Component Validation
+      await tick(2, 60) // Scoring & Eligibility
+      await tick(3, 75) // Consistency & Risk
+      await tick(4, 90) // Impact & Final Score
+      result = await api.processDocument({ uploadId, language })
+    }
 
     // Get final results
-    const result = await api.processDocument({ uploadId, language })
     setResult(uploadId, result)
     await tick(5, 100) // Results Ready
 
@@ -134,6 +172,12 @@ export default function UploadPage() {
             Upload & Analyze
           </Button>
 
+          {error && (
+            <p className="text-sm text-destructive" role="alert">
+              {error}
+            </p>
+          )}
+
           {busy && (
             <div className="grid gap-2 p-4 bg-muted rounded-lg" role="status" aria-live="polite">
               <div className="flex items-center justify-between text-sm">
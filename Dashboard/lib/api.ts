@@ -8,6 +8,8 @@ import type {
   Eligibility,
   ConsistencyFlags,
   RiskPrediction,
+  AnalysisProgressEvent,
+  AnalysisOutcome,
 } from "./types"
 
 let dprs: DPRFile[] = []
@@ -60,6 +62,49 @@ export async function uploadFile(file: File, language: LanguageOption): Promise<
   }
 }
 
+const ANALYSIS_STAGES = [
+  "extracted",
+  "completeness",
+  "technical",
+  "gatishakti",
+  "impact",
+  "compliance",
+  "risk",
+  "stored",
+  "error",
+] as const
+
+// Follow backend analysis stages over server-sent events instead of polling.
+// Resolves "completed" once results are stored, "error" when the backend reports
+// a failed analysis, and "unreachable" when the event stream cannot be used.
+export function waitForAnalysis(
+  uploadId: string,
+  onEvent?: (event: AnalysisProgressEvent) => void,
+): Promise<AnalysisOutcome> {
+  return new Promise((resolve) => {
+    if (typeof EventSource === "undefined") {
+      resolve({ status: "unreachable" })
+      return
+    }
+
+    const source = new EventSource(`${API_BASE_URL}/api/progress/${uploadId}`)
+    const finish = (outcome: AnalysisOutcome) => {
+      source.close()
+      resolve(outcome)
+    }
+
+    ANALYSIS_STAGES.forEach((stage) => {
+      source.addEventListener(stage, (e) => {
+        const event = JSON.parse((e as MessageEvent).data) as AnalysisProgressEvent
+        onEvent?.(event)
+        if (stage === "stored") finish({ status: "completed" })
+        if (stage === "error") finish({ status: "error", error: event.data?.error || "Analysis failed" })
+      })
+    })
+    source.onerror = () => finish({ status: "unreachable" })
+  })
+}
+
 export async function processDocument(params: {
   uploadId: string
   language: LanguageOption
@@ -22,6 +22,31 @@ export interface DPRFile {
   totalScore?: number
 }
 
+export type AnalysisStage =
+  | "extracted"
+  | "completeness"
+  | "technical"
+  | "gatishakti"
+  | "impact"
+  | "compliance"
+  | "risk"
+  | "stored"
+  | "error"
+
+export interface AnalysisProgressEvent {
+  id: number
+  stage: AnalysisStage
+  data: Record<string, any>
+  timestamp: string
+}
+
+// How waitForAnalysis ended: results stored, the backend reported a failed
+// analysis, or the backend could not be reached
+export type AnalysisOutcome =
+  | { status: "completed" }
+  | { status: "error"; error: string }
+  | { status: "unreachable" }
+
 export interface ArchivedFile {
   id: number
   uploadId: string
@@ -108,18 +133,35 @@ export interface EnhancedAnalysisBreakdown {
   compliance: EnhancedScoringResult
 }
 
+export interface SimilarProjectMatch {
+  upload_id: string
+  similarity: number
+  section_similarity: Record<string, number>
+  possible_duplicate: boolean
+}
+
+export interface SimilarProjects {
+  matches: SimilarProjectMatch[]
+  possible_duplicate?: boolean
+  threshold?: number
+  error?: string
+}
+
 export interface EnhancedProcessingResult {
   total_score: number
   max_score: number
   percentage: number
   breakdown: EnhancedAnalysisBreakdown
-  analysis_type: "enhanced" | "basic"
+  // "enhanced-reduced" / "enhanced-keyword": cheaper tiers used while the queue was backed up
+  analysis_type: "enhanced" | "enhanced-reduced" | "enhanced-keyword" | "basic"
   capabilities: EnhancedCapabilities
   processing_info?: {
     text_length?: number
     processing_timestamp?: string
     pdf_path?: string
+    analysis_tier?: "full" | "reduced" | "keyword"
   }
+  similar_projects?: SimilarProjects
   timestamp: string
 }
 